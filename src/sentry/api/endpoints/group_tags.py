@@ -6,6 +6,7 @@ from sentry import tagstore
 from sentry.api.bases.group import GroupEndpoint
 from sentry.api.helpers.environments import get_environments
 from sentry.api.serializers import serialize
+from sentry.utils.snuba import get_request_deadline
 
 
 class GroupTagsEndpoint(GroupEndpoint):
@@ -26,7 +27,12 @@ class GroupTagsEndpoint(GroupEndpoint):
         environment_ids = [e.id for e in get_environments(request, group.project.organization)]
 
         tag_keys = tagstore.get_group_tag_keys_and_top_values(
-            group.project_id, group.id, environment_ids, keys=keys, value_limit=value_limit
+            group.project_id,
+            group.id,
+            environment_ids,
+            keys=keys,
+            value_limit=value_limit,
+            deadline=get_request_deadline(request),
         )
 
         return Response(serialize(tag_keys, request.user))
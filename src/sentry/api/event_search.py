@@ -24,11 +24,13 @@ from sentry.search.utils import (
     InvalidQuery,
 )
 from sentry.snuba.dataset import Dataset
+from sentry.utils import metrics
 from sentry.utils.dates import to_timestamp
 from sentry.utils.snuba import DATASETS, get_json_type
 from sentry.utils.compat import map
 from sentry.utils.compat import zip
 from sentry.utils.compat import filter
+from sentry.utils.compat import functools
 
 WILDCARD_CHARS = re.compile(r"[\*]")
 
@@ -274,6 +276,8 @@ class SearchVisitor(NodeVisitor):
 
     unwrapped_exceptions = (InvalidSearchQuery,)
 
+    has_relative_dates = False
+
     @cached_property
     def key_mappings_lookup(self):
         lookup = {}
@@ -500,6 +504,12 @@ class SearchVisitor(NodeVisitor):
     def visit_date_format(self, node, children):
         return node.text
 
+    def visit_rel_date_format(self, node, children):
+        # Relative dates are resolved against the current time, so the result
+        # of this visitor must not be reused later on.
+        self.has_relative_dates = True
+        return node
+
     def is_negated(self, node):
         # Because negations are always optional, parsimonious returns a list of nodes
         # containing one node when a negation exists, and a single node when it doesn't.
@@ -621,7 +631,52 @@ class SearchVisitor(NodeVisitor):
         return children or node
 
 
-def parse_search_query(query):
+# Matches the `key:value` and `!key:value` terms which can only be parsed as
+# a basic filter by the grammar: the value must not start with a character
+# that could begin a date, duration, numeric or operator value.
+FAST_TERM_PATTERN = re.compile(r"^(!?)([a-zA-Z0-9_\.-]+):([^()\s\"0-9\.\+\-<>=!][^()\s\"]*)$")
+FAST_PATH_EXCLUDED_KEYS = frozenset(["has", "is"])
+
+QUERY_PLAN_CACHE_SIZE = 1000
+
+
+def parse_search_query_fast(query, visitor):
+    """
+    Parses queries consisting only of plain `key:value` terms separated by
+    single spaces without the grammar. Returns `None` if the query contains
+    anything else, in which case it has to be parsed by the grammar.
+    """
+    if not query:
+        return None
+
+    terms = []
+    for token in query.split(" "):
+        match = FAST_TERM_PATTERN.match(token)
+        if match is None:
+            return None
+        negation, key, value = match.groups()
+        if key in FAST_PATH_EXCLUDED_KEYS:
+            return None
+        search_key = SearchKey(visitor.key_mappings_lookup.get(key, key))
+        operator = "!=" if negation else "="
+        terms.append(visitor._handle_basic_filter(search_key, operator, SearchValue(value)))
+    return terms
+
+
+@functools.lru_cache(maxsize=QUERY_PLAN_CACHE_SIZE)
+def _get_query_plan(query):
+    """
+    Parses a search query into the plan that is cached for it: the list of
+    parsed terms, or for queries with relative dates the parse tree, which is
+    visited again on every use so that the dates are resolved against the
+    current time.
+    """
+    metrics.incr("event_search.plan_cache.miss", skip_internal=True)
+    visitor = SearchVisitor()
+    terms = parse_search_query_fast(query, visitor)
+    if terms is not None:
+        return terms
+
     try:
         tree = event_search_grammar.parse(query)
     except IncompleteParseError as e:
@@ -634,7 +689,15 @@ def parse_search_query(query):
                 "This is commonly caused by unmatched parentheses. Enclose any text in double quotes.",
             )
         )
-    return SearchVisitor().visit(tree)
+    terms = visitor.visit(tree)
+    return tree if visitor.has_relative_dates else terms
+
+
+def parse_search_query(query):
+    plan = _get_query_plan(query)
+    if isinstance(plan, list):
+        return list(plan)
+    return SearchVisitor().visit(plan)
 
 
 def convert_search_boolean_to_snuba_query(search_boolean):
@@ -43,6 +43,7 @@ from sentry.models import (
 )
 from sentry.tsdb.snuba import SnubaTSDB
 from sentry.utils.db import attach_foreignkey
+from sentry.utils.snuba import get_request_deadline
 from sentry.utils.safe import safe_execute
 from sentry.utils.compat import map, zip
 
@@ -608,24 +609,24 @@ class SharedGroupSerializer(GroupSerializer):
 
 
 class GroupSerializerSnuba(GroupSerializerBase):
-    def __init__(self, environment_ids=None, start=None, end=None):
+    def __init__(self, environment_ids=None, start=None, end=None, deadline=None):
         self.environment_ids = environment_ids
         self.start = start
         self.end = end
+        self.deadline = deadline
 
     def _get_seen_stats(self, item_list, user):
         project_ids = list(set([item.project_id for item in item_list]))
         group_ids = [item.id for item in item_list]
-        user_counts = tagstore.get_groups_user_counts(
+        # Groups whose stats are not ready by the deadline are shown as unseen,
+        # and flagged with `statsTimedOut` so that they aren't taken for real zeros.
+        seen_data, user_counts, timed_out = tagstore.get_groups_seen_stats(
             project_ids,
             group_ids,
-            environment_ids=self.environment_ids,
+            self.environment_ids,
             start=self.start,
             end=self.end,
-        )
-
-        seen_data = tagstore.get_group_seen_values_for_environments(
-            project_ids, group_ids, self.environment_ids, start=self.start, end=self.end
+            deadline=self.deadline if self.deadline is not None else get_request_deadline(),
         )
         last_seen = {item_id: value["last_seen"] for item_id, value in seen_data.items()}
         if not self.environment_ids:
@@ -650,10 +651,17 @@ class GroupSerializerSnuba(GroupSerializerBase):
                 "first_seen": first_seen.get(item.id),
                 "last_seen": last_seen.get(item.id),
                 "user_count": user_counts.get(item.id, 0),
+                "stats_timed_out": timed_out,
             }
 
         return attrs
 
+    def serialize(self, obj, attrs, user):
+        result = super(GroupSerializerSnuba, self).serialize(obj, attrs, user)
+        if attrs.get("stats_timed_out"):
+            result["statsTimedOut"] = True
+        return result
+
 
 class StreamGroupSerializerSnuba(GroupSerializerSnuba, GroupStatsMixin):
     def __init__(self, environment_ids=None, stats_period=None, matching_event_id=None):
@@ -81,6 +81,8 @@ class PendingBuffer(object):
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
+    # How often the flush of a key is attempted before it is dropped.
+    max_process_attempts = 3
 
     def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
@@ -271,14 +273,19 @@ class RedisBuffer(Buffer):
 
         try:
             keycount = 0
+            oldest_pending = None
             with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
+                results = conn.zrange(pending_key, 0, -1, withscores=True)
 
             with self.cluster.all() as conn:
-                for host_id, keys in six.iteritems(results.value):
-                    if not keys:
+                for host_id, items in six.iteritems(results.value):
+                    if not items:
                         continue
+                    keys = [key for key, _ in items]
                     keycount += len(keys)
+                    # Keys are sorted by the time they were last incremented.
+                    if oldest_pending is None or items[0][1] < oldest_pending:
+                        oldest_pending = items[0][1]
                     for key in keys:
                         pending_buffer.append(key)
                         if pending_buffer.full():
@@ -290,6 +297,8 @@ class RedisBuffer(Buffer):
                 process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
 
             metrics.timing("buffer.pending-size", keycount)
+            if oldest_pending is not None:
+                metrics.timing("buffer.pending-lag", time() - oldest_pending)
         finally:
             client.delete(lock_key)
 
@@ -300,56 +309,114 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
-        for key in batch_keys:
-            self._process_single_incr(key)
+        self._process_batch_incr(batch_keys)
 
-    def _process_single_incr(self, key):
-        client = self.cluster.get_routing_client()
-        lock_key = self._make_lock_key(key)
+    def _process_batch_incr(self, keys):
         # prevent a stampede due to the way we use celery etas + duplicate
         # tasks
-        if not client.set(lock_key, "1", nx=True, ex=10):
-            metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
-            self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
-            return
+        with self.cluster.map() as conn:
+            locks = [(key, conn.set(self._make_lock_key(key), "1", nx=True, ex=10)) for key in keys]
 
-        pending_key = self._make_pending_key_from_key(key)
+        locked_keys = []
+        for key, lock in locks:
+            if lock.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
 
         try:
-            conn = self.cluster.get_local_client_for_key(key)
-            pipe = conn.pipeline()
-            pipe.hgetall(key)
-            pipe.zrem(pending_key, key)
-            pipe.delete(key)
-            values = pipe.execute()[0]
-
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
-
-            model = import_string(values.pop("m"))
-            if values["f"].startswith("{"):
-                filters = self._load_values(json.loads(values.pop("f")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in six.iteritems(values):
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith("["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            super(RedisBuffer, self).process(model, incr_values, filters, extra_values, signal_only)
+            # Fetch and clear all keys with one pipeline per Redis host. The
+            # pending set lives on the same host as the key, see `incr`.
+            router = self.cluster.get_router()
+            keys_by_host = {}
+            for key in locked_keys:
+                keys_by_host.setdefault(router.get_host_for_key(key), []).append(key)
+
+            values_by_key = {}
+            for host_id, host_keys in six.iteritems(keys_by_host):
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+                for i, key in enumerate(host_keys):
+                    values_by_key[key] = results[i * 3]
+
+            metrics.timing("buffer.process-batch-size", len(values_by_key))
+
+            for key in locked_keys:
+                values = values_by_key.get(key)
+                if not values:
+                    metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+                    self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                    continue
+                try:
+                    model, incr_values, filters, extra_values, signal_only = self._load_incr(
+                        dict(values)
+                    )
+                    super(RedisBuffer, self).process(
+                        model, incr_values, filters, extra_values, signal_only
+                    )
+                except Exception:
+                    self._handle_process_error(key, values)
         finally:
-            client.delete(lock_key)
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
+
+    def _handle_process_error(self, key, values):
+        """
+        Puts the fetched hashmap of a key that failed to flush back into the
+        buffer, merging it with any increments buffered in the meantime. Keys
+        that keep failing are dropped after `max_process_attempts`.
+        """
+        attempts = int(values.get("a") or 0) + 1
+        if attempts >= self.max_process_attempts:
+            metrics.incr("buffer.revoked", tags={"reason": "failed"}, skip_internal=False)
+            self.logger.exception(
+                "buffer.revoked.failed", extra={"redis_key": key, "attempts": attempts}
+            )
+            return
+
+        self.logger.exception(
+            "buffer.process.failed", extra={"redis_key": key, "attempts": attempts}
+        )
+        conn = self.cluster.get_local_client_for_key(key)
+        pipe = conn.pipeline()
+        for field, value in six.iteritems(values):
+            if field.startswith("i+"):
+                pipe.hincrby(key, field, int(value))
+            elif field != "a":
+                # Newer values written since the fetch win.
+                pipe.hsetnx(key, field, value)
+        pipe.hincrby(key, "a", attempts)
+        pipe.expire(key, self.key_expire)
+        pipe.zadd(self._make_pending_key_from_key(key), time(), key)
+        pipe.execute()
+
+    def _load_incr(self, values):
+        model = import_string(values.pop("m"))
+        if values["f"].startswith("{"):
+            filters = self._load_values(json.loads(values.pop("f")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in six.iteritems(values):
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith("["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
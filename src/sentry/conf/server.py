@@ -1018,6 +1018,34 @@ SENTRY_ALLOW_ORIGIN = None
 # Enable scraping of javascript context for source code
 SENTRY_SCRAPE_JAVASCRIPT_CONTEXT = True
 
+# Size in bytes (of the raw sourcemaps) of the per-process cache of parsed
+# sourcemaps that is shared between events. ``0`` disables it.
+SENTRY_SOURCEMAP_VIEW_CACHE_SIZE = 0
+
+# Number of processed stacktrace frames kept in a per-process cache in front
+# of the shared frame cache. ``0`` disables it.
+SENTRY_STACKTRACE_FRAME_CACHE_LOCAL_SIZE = 0
+
+# Number of model instances kept in a per-process cache in front of the shared
+# cache used by ``get_from_cache``. ``0`` disables it. Entries are kept for
+# ``SENTRY_MODEL_CACHE_LOCAL_TTL`` seconds, and invalidations are broadcast
+# through the given redis cluster.
+SENTRY_MODEL_CACHE_LOCAL_SIZE = 0
+SENTRY_MODEL_CACHE_LOCAL_TTL = 10
+SENTRY_MODEL_CACHE_INVALIDATION_CLUSTER = "default"
+
+# Number of shards the child relations of a project or organization are
+# split into when it is deleted.
+SENTRY_DELETIONS_NUM_SHARDS = 4
+
+# Global budget of rows deleted per second by project and organization
+# deletions. ``None`` disables the budget.
+SENTRY_DELETIONS_MAX_ROWS_PER_SECOND = None
+
+# Project and organization deletions pause while the replicas lag behind the
+# primary by more than this many seconds. ``None`` disables the check.
+SENTRY_DELETIONS_MAX_REPLICATION_LAG = None
+
 # Buffer backend
 SENTRY_BUFFER = "sentry.buffer.Buffer"
 SENTRY_BUFFER_OPTIONS = {}
@@ -1063,10 +1091,27 @@ SENTRY_DEFAULT_MAX_EVENTS_PER_MINUTE = "90%"
 # Snuba configuration
 SENTRY_SNUBA = os.environ.get("SNUBA", "http://127.0.0.1:1218")
 
+# The number of queries sent to Snuba at the same time by every process.
+SENTRY_SNUBA_MAX_CONCURRENT_QUERIES = 10
+
+# Whether the results of Snuba queries with a cache policy are cached, see
+# `sentry.utils.snuba.ResultCachePolicy`.
+SENTRY_SNUBA_RESULT_CACHE = False
+
+# API requests stop waiting for Snuba queries that support partial results
+# after this many seconds, see `sentry.utils.snuba.get_request_deadline`.
+SENTRY_SNUBA_REQUEST_TIMEOUT = 20
+
 # Node storage backend
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Size in bytes of the per-process cache of node data that sits in front of
+# the ``nodedata`` cache. ``0`` disables it.
+SENTRY_NODESTORE_LOCAL_CACHE_SIZE = 0
+# How many seconds node data is kept in the per-process cache.
+SENTRY_NODESTORE_LOCAL_CACHE_TTL = 60
+
 # Tag storage backend
 SENTRY_TAGSTORE = os.environ.get("SENTRY_TAGSTORE", "sentry.tagstore.snuba.SnubaTagStorage")
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -5,11 +5,15 @@ from datetime import timedelta
 from enum import Enum
 
 SNUBA_MAX_RESULTS = 1000
+MAX_CONCURRENT_PAGES = 4
 DEFAULT_EXPIRATION = timedelta(weeks=4)
+EXPORT_PROGRESS_TIMEOUT = 60 * 60 * 24
 
 
 class ExportError(Exception):
-    pass
+    def __init__(self, message, recoverable=False):
+        super(ExportError, self).__init__(message)
+        self.recoverable = recoverable
 
 
 class ExportStatus(six.text_type, Enum):
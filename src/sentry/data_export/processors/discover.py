@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+
+import six
+
+from sentry.api.event_search import get_function_alias, InvalidSearchQuery
+from sentry.api.utils import get_date_range_from_params, InvalidParams
+from sentry.models import Environment, Project
+from sentry.snuba import discover
+
+from ..base import ExportError, SNUBA_MAX_RESULTS
+
+
+class DiscoverProcessor(object):
+    """
+    Processor for exports of discover data based on a provided query
+    """
+
+    def __init__(self, organization_id, discover_query, start=None, end=None):
+        self.fields = discover_query.get("field") or []
+        if isinstance(self.fields, six.string_types):
+            self.fields = [self.fields]
+        if not self.fields:
+            raise ExportError("Requested query has no fields")
+
+        self.query = discover_query.get("query")
+        self.sort = discover_query.get("sort")
+        self.projects = self.get_projects(organization_id, discover_query)
+        self.environments = self.get_environments(organization_id, discover_query)
+        if start is None or end is None:
+            start, end = self.get_date_range(discover_query)
+        self.params = {
+            "organization_id": organization_id,
+            "project_id": [project.id for project in self.projects],
+            "start": start,
+            "end": end,
+        }
+        if self.environments:
+            self.params["environment"] = [env.name for env in self.environments]
+        self.header_fields = [get_function_alias(field) for field in self.fields]
+
+    @staticmethod
+    def get_projects(organization_id, query):
+        project_ids = query.get("project") or []
+        if not isinstance(project_ids, list):
+            project_ids = [project_ids]
+        projects = list(Project.objects.filter(id__in=project_ids, organization_id=organization_id))
+        if not projects:
+            raise ExportError("Requested project does not exist")
+        return projects
+
+    @staticmethod
+    def get_environments(organization_id, query):
+        requested = query.get("environment") or []
+        if not isinstance(requested, list):
+            requested = [requested]
+        environments = list(
+            Environment.objects.filter(organization_id=organization_id, name__in=requested)
+        )
+        if len(environments) != len(set(requested)):
+            raise ExportError("Requested environment does not exist")
+        return environments
+
+    @staticmethod
+    def get_date_range(query):
+        try:
+            return get_date_range_from_params(query)
+        except InvalidParams as error:
+            raise ExportError(six.text_type(error))
+
+    def fetch_page(self, offset=0):
+        """
+        Returns a list of result rows. Resolving the query may run database
+        queries, see `fetch_page_in_worker` for calling this from a thread.
+        """
+        try:
+            result = discover.query(
+                selected_columns=list(self.fields),
+                query=self.query,
+                params=self.params,
+                orderby=self.sort,
+                offset=offset,
+                limit=SNUBA_MAX_RESULTS,
+                referrer="data_export.tasks.discover",
+                auto_fields=True,
+                use_aggregate_conditions=True,
+            )
+        except InvalidSearchQuery as error:
+            raise ExportError(six.text_type(error))
+        return result["data"]
+
+    def serialize_page(self, rows):
+        return [{field: row.get(field) for field in self.header_fields} for row in rows]
+
+    def get_raw_data(self, offset=0):
+        """
+        Returns list of result rows
+        """
+        return self.fetch_page(offset)
+
+    def get_serialized_data(self, offset=0):
+        """
+        Returns list of serialized result rows
+        """
+        return self.serialize_page(self.fetch_page(offset))
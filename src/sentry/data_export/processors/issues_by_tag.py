@@ -94,22 +94,35 @@ class IssuesByTagProcessor(object):
             result["ip_address"] = euser.ip_address if euser else ""
         return result
 
-    def get_raw_data(self, offset=0):
+    def fetch_page(self, offset=0):
         """
-        Returns list of GroupTagValues
+        Returns list of GroupTagValues without running the callbacks. Only
+        talks to Snuba, so it is safe to call from a worker thread.
         """
         return tagstore.get_group_tag_value_iter(
             project_id=self.group.project_id,
             group_id=self.group.id,
             environment_id=self.environment_id,
             key=self.lookup_key,
-            callbacks=self.callbacks,
             offset=offset,
         )
 
+    def run_callbacks(self, items):
+        for callback in self.callbacks:
+            callback(items)
+        return items
+
+    def serialize_page(self, items):
+        return [self.serialize_row(item, self.key) for item in self.run_callbacks(items)]
+
+    def get_raw_data(self, offset=0):
+        """
+        Returns list of GroupTagValues
+        """
+        return self.run_callbacks(self.fetch_page(offset))
+
     def get_serialized_data(self, offset=0):
         """
         Returns list of serialized GroupTagValue dictionaries
         """
-        raw_data = self.get_raw_data(offset)
-        return [self.serialize_row(item, self.key) for item in raw_data]
+        return self.serialize_page(self.fetch_page(offset))
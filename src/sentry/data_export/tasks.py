@@ -3,24 +3,40 @@ from __future__ import absolute_import
 import csv
 import logging
 import six
-import tempfile
-from django.db import transaction, IntegrityError
+from functools import partial
+from celery.exceptions import SoftTimeLimitExceeded
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connections, transaction, IntegrityError
 
 from sentry.models import File
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
+from sentry.utils.cache import default_cache
 from sentry.utils.sdk import capture_exception
 
-from .base import ExportError, ExportQueryType, SNUBA_MAX_RESULTS
+from .base import (
+    ExportError,
+    ExportQueryType,
+    EXPORT_PROGRESS_TIMEOUT,
+    MAX_CONCURRENT_PAGES,
+    SNUBA_MAX_RESULTS,
+)
 from .models import ExportedData
 from .utils import convert_to_utf8, snuba_error_handler
+from .processors.discover import DiscoverProcessor
 from .processors.issues_by_tag import IssuesByTagProcessor
+from .writer import ExportFileWriter
 
 
 logger = logging.getLogger(__name__)
 
 
-@instrumented_task(name="sentry.data_export.tasks.assemble_download", queue="data_export")
+@instrumented_task(
+    name="sentry.data_export.tasks.assemble_download",
+    queue="data_export",
+    default_retry_delay=60,
+    max_retries=3,
+)
 def assemble_download(data_export_id, limit=None, environment_id=None):
     # Get the ExportedData object
     try:
@@ -32,45 +48,41 @@ def assemble_download(data_export_id, limit=None, environment_id=None):
         capture_exception(error)
         return
 
-    # Create a temporary file
+    progress = get_progress(data_export)
     try:
-        with tempfile.TemporaryFile() as tf:
-            # Process the query based on its type
-            if data_export.query_type == ExportQueryType.ISSUES_BY_TAG:
-                process_issues_by_tag(
-                    data_export=data_export, file=tf, limit=limit, environment_id=environment_id
-                )
-            elif data_export.query_type == ExportQueryType.DISCOVER:
-                process_discover(
-                    data_export=data_export, file=tf, limit=limit, environment_id=environment_id
-                )
-            # Create a new File object and attach it to the ExportedData
-            tf.seek(0)
-            try:
-                with transaction.atomic():
-                    file = File.objects.create(
-                        name=data_export.file_name,
-                        type="export.csv",
-                        headers={"Content-Type": "text/csv"},
-                    )
-                    file.putfile(tf, logger=logger)
-                    data_export.finalize_upload(file=file)
-                    logger.info("dataexport.end", extra={"data_export_id": data_export_id})
-                    metrics.incr("dataexport.end", sample_rate=1.0)
-            except IntegrityError as error:
-                metrics.incr(
-                    "dataexport.error", tags={"error": six.text_type(error)}, sample_rate=1.0
-                )
-                logger.info(
-                    "dataexport.error: {}".format(six.text_type(error)),
-                    extra={"query": data_export.payload, "org": data_export.organization_id},
-                )
-                capture_exception(error)
-                raise ExportError("Failed to save the assembled file")
+        # Process the query based on its type
+        processor = get_processor(data_export, environment_id, progress)
+        file = export_csv(data_export, processor, progress, limit=limit)
+        try:
+            with transaction.atomic():
+                data_export.finalize_upload(file=file)
+                logger.info("dataexport.end", extra={"data_export_id": data_export_id})
+                metrics.incr("dataexport.end", sample_rate=1.0)
+        except IntegrityError as error:
+            metrics.incr("dataexport.error", tags={"error": six.text_type(error)}, sample_rate=1.0)
+            logger.info(
+                "dataexport.error: {}".format(six.text_type(error)),
+                extra={"query": data_export.payload, "org": data_export.organization_id},
+            )
+            capture_exception(error)
+            raise ExportError("Failed to save the assembled file")
+        clear_progress(data_export)
+        return
     except ExportError as error:
-        return data_export.email_failure(message=six.text_type(error))
-    except NotImplementedError as error:
-        return data_export.email_failure(message=six.text_type(error))
+        if error.recoverable and assemble_download.request.retries < assemble_download.max_retries:
+            retry_error = error
+        else:
+            discard_progress(data_export, progress)
+            return data_export.email_failure(message=six.text_type(error))
+    except SoftTimeLimitExceeded as error:
+        # The progress of the last finished batch of pages has been saved, so
+        # a retry continues from there instead of starting over.
+        metrics.incr("dataexport.timeout", sample_rate=1.0)
+        if assemble_download.request.retries < assemble_download.max_retries:
+            retry_error = error
+        else:
+            discard_progress(data_export, progress)
+            return data_export.email_failure(message="Export timed out")
     except BaseException as error:
         metrics.incr("dataexport.error", tags={"error": six.text_type(error)}, sample_rate=1.0)
         logger.info(
@@ -78,55 +90,136 @@ def assemble_download(data_export_id, limit=None, environment_id=None):
             extra={"query": data_export.payload, "org": data_export.organization_id},
         )
         capture_exception(error)
+        discard_progress(data_export, progress)
         return data_export.email_failure(message="Internal processing failure")
 
+    # The export continues where it left off, as the progress is kept.
+    metrics.incr("dataexport.retry", sample_rate=1.0)
+    raise assemble_download.retry(exc=retry_error)
+
+
+def get_progress_key(data_export):
+    return u"data-export:progress:{}".format(data_export.id)
+
 
-def process_issues_by_tag(data_export, file, limit, environment_id):
+def get_progress(data_export):
     """
-    Convert the tag query to a CSV, writing it to the provided file.
+    Returns the progress of a previous attempt to assemble the download, or
+    an empty dict.
     """
+    return default_cache.get(get_progress_key(data_export)) or {}
+
+
+def save_progress(data_export, progress):
+    default_cache.set(get_progress_key(data_export), progress, EXPORT_PROGRESS_TIMEOUT)
+
+
+def clear_progress(data_export):
+    default_cache.delete(get_progress_key(data_export))
+
+
+def discard_progress(data_export, progress):
+    """
+    Removes the partially assembled file of a failed export.
+    """
+    clear_progress(data_export)
+    file_id = progress.get("file_id")
+    if file_id is not None:
+        File.objects.filter(id=file_id).delete()
+
+
+def get_processor(data_export, environment_id, progress):
     payload = data_export.query_info
     try:
-        processor = IssuesByTagProcessor(
-            project_id=payload["project_id"],
-            group_id=payload["group_id"],
-            key=payload["key"],
-            environment_id=environment_id,
-        )
+        if data_export.query_type == ExportQueryType.ISSUES_BY_TAG:
+            return IssuesByTagProcessor(
+                project_id=payload["project_id"],
+                group_id=payload["group_id"],
+                key=payload["key"],
+                environment_id=environment_id,
+            )
+        elif data_export.query_type == ExportQueryType.DISCOVER:
+            # Relative date ranges are resolved once, so that all attempts
+            # export the same data.
+            processor = DiscoverProcessor(
+                organization_id=data_export.organization_id,
+                discover_query=payload,
+                start=progress.get("start"),
+                end=progress.get("end"),
+            )
+            progress.update(start=processor.params["start"], end=processor.params["end"])
+            return processor
     except ExportError as error:
         metrics.incr("dataexport.error", tags={"error": six.text_type(error)}, sample_rate=1.0)
         logger.info("dataexport.error: {}".format(six.text_type(error)))
         capture_exception(error)
         raise error
+    raise ExportError("Unknown export type")
+
+
+def fetch_page_in_worker(processor, offset):
+    """
+    Fetches a page on a worker thread. Resolving the query can hit the
+    database (e.g. for ``project:`` or ``issue:`` terms), and the connections
+    Django opens for the thread are closed again once the page is fetched.
+    """
+    try:
+        return processor.fetch_page(offset)
+    finally:
+        connections.close_all()
+
+
+def export_csv(data_export, processor, progress, limit=None):
+    """
+    Streams the results of the processor into a CSV file, fetching several
+    pages at once. The progress is saved after every batch of pages, so a
+    later attempt can continue where this one stopped.
+    """
+    file = None
+    if progress.get("file_id") is not None:
+        file = File.objects.filter(id=progress["file_id"]).first()
+    if file is None:
+        file = File.objects.create(
+            name=data_export.file_name, type="export.csv", headers={"Content-Type": "text/csv"}
+        )
+        progress.update(file_id=file.id, offset=0, bytes=0)
+        save_progress(data_export, progress)
+
+    writer = ExportFileWriter(file, offset=progress["bytes"], logger=logger)
+    csv_writer = csv.DictWriter(writer, processor.header_fields)
+    if progress["bytes"] == 0:
+        csv_writer.writeheader()
+
+    offset = progress["offset"]
+    done = limit is not None and offset >= limit
+    with snuba_error_handler(logger=logger), ThreadPoolExecutor(
+        max_workers=MAX_CONCURRENT_PAGES
+    ) as executor:
+        while not done:
+            offsets = [offset + SNUBA_MAX_RESULTS * i for i in range(MAX_CONCURRENT_PAGES)]
+            if limit is not None:
+                offsets = [page_offset for page_offset in offsets if page_offset < limit]
+
+            # Pages are fetched concurrently, but serialized and written in
+            # order on this thread.
+            for page in executor.map(partial(fetch_page_in_worker, processor), offsets):
+                if limit is not None:
+                    page = page[: limit - offset]
+                # TODO(python3): Remove the conversion once the 'csv' module has been updated to Python 3
+                # See associated comment in './utils.py'
+                csv_writer.writerows(convert_to_utf8(processor.serialize_page(page)))
+                offset += len(page)
+                if len(page) < SNUBA_MAX_RESULTS:
+                    done = True
+                    break
+
+            if limit is not None and offset >= limit:
+                done = True
+
+            writer.flush()
+            progress.update(offset=offset, bytes=writer.offset)
+            save_progress(data_export, progress)
 
-    # Iterate through all the GroupTagValues
-    writer = create_writer(file, processor.header_fields)
-    iteration = 0
-    with snuba_error_handler(logger=logger):
-        while True:
-            offset = SNUBA_MAX_RESULTS * iteration
-            next_offset = SNUBA_MAX_RESULTS * (iteration + 1)
-            gtv_list_unicode = processor.get_serialized_data(offset=offset)
-            if len(gtv_list_unicode) == 0:
-                break
-            # TODO(python3): Remove next line once the 'csv' module has been updated to Python 3
-            # See associated comment in './utils.py'
-            gtv_list = convert_to_utf8(gtv_list_unicode)
-            if limit and limit < next_offset:
-                # Since the next offset will pass the limit, write the remainder and quit
-                writer.writerows(gtv_list[: limit % SNUBA_MAX_RESULTS])
-                break
-            else:
-                writer.writerows(gtv_list)
-                iteration += 1
-
-
-def process_discover(data_export, file):
-    # TODO(Leander): Implement processing for Discover
-    raise NotImplementedError("Discover processing has not been implemented yet")
-
-
-def create_writer(file, fields):
-    writer = csv.DictWriter(file, fields)
-    writer.writeheader()
-    return writer
+    writer.close()
+    metrics.timing("dataexport.rows", offset, sample_rate=1.0)
+    return file
@@ -29,6 +29,7 @@ def snuba_error_handler(logger):
         logger.info("dataexport.error: {}".format(six.text_type(error)))
         capture_exception(error)
         message = "Internal error. Please try again."
+        recoverable = False
         if isinstance(
             error,
             (
@@ -38,12 +39,13 @@ def snuba_error_handler(logger):
             ),
         ):
             message = "Query timeout. Please try again. If the problem persists try a smaller date range or fewer projects."
+            recoverable = True
         elif isinstance(
             error,
             (snuba.UnqualifiedQueryError, snuba.QueryExecutionError, snuba.SchemaValidationError),
         ):
             message = "Internal error. Your query failed to run."
-        raise ExportError(message)
+        raise ExportError(message, recoverable=recoverable)
 
 
 # TODO(python3): For now, this function must be run to ensure only utf-8 is passed into the 'csv' module
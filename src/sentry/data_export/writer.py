@@ -0,0 +1,81 @@
+from __future__ import absolute_import
+
+import six
+from hashlib import sha1
+
+from django.core.files.base import ContentFile
+
+from sentry.models import FileBlob, FileBlobIndex
+from sentry.models.file import DEFAULT_BLOB_SIZE, nooplogger
+
+
+class ExportFileWriter(object):
+    """
+    A writable file-like object that uploads its contents straight into the
+    blobs of a `File`, so that exports never need a full local copy.
+
+    Data is uploaded whenever a full blob has been buffered and on `flush`.
+    Once `flush` returns, ``offset`` is the size of the uploaded data, which
+    can be used to resume writing to the same file later on.
+    """
+
+    def __init__(self, file, offset=0, blob_size=DEFAULT_BLOB_SIZE, logger=nooplogger):
+        self.file = file
+        self.offset = offset
+        self.blob_size = blob_size
+        self.logger = logger
+        self.checksum = sha1(b"")
+        self._buffer = []
+        self._buffer_size = 0
+
+        if offset:
+            self._truncate()
+
+    def _truncate(self):
+        # Remove blobs that were uploaded after the last checkpoint and
+        # restore the checksum of everything before it.
+        FileBlobIndex.objects.filter(file=self.file, offset__gte=self.offset).delete()
+        with self.file.getfile() as f:
+            while True:
+                chunk = f.read(self.blob_size)
+                if not chunk:
+                    break
+                self.checksum.update(chunk)
+
+    def write(self, data):
+        if isinstance(data, six.text_type):
+            data = data.encode("utf-8")
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        if self._buffer_size >= self.blob_size:
+            self._upload(final=False)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        self._upload(final=True)
+
+    def _upload(self, final):
+        data = b"".join(self._buffer)
+        while len(data) >= self.blob_size or (final and data):
+            chunk, data = data[: self.blob_size], data[self.blob_size :]
+            self.checksum.update(chunk)
+            blob = FileBlob.from_file(ContentFile(chunk), logger=self.logger)
+            FileBlobIndex.objects.create(file=self.file, blob=blob, offset=self.offset)
+            self.offset += blob.size
+
+        self._buffer = [data] if data else []
+        self._buffer_size = len(data)
+
+    def close(self, commit=True):
+        """
+        Uploads the remaining data and stores the size and checksum of the
+        file.
+        """
+        self.flush()
+        self.file.size = self.offset
+        self.file.checksum = self.checksum.hexdigest()
+        if commit:
+            self.file.save()
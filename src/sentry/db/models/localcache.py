@@ -0,0 +1,213 @@
+"""
+A per-process cache tier in front of the shared model cache used by
+`BaseManager.get_from_cache`.
+
+Entries are kept for a short time only, and are dropped in all processes
+when an instance is saved or deleted: invalidated keys are broadcast over a
+Redis channel, to which every process subscribes from a background thread.
+Concurrent misses of the same key within a process are coalesced, so that
+only one thread fetches it from the shared cache or the database.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+import time
+
+from six.moves import cPickle as pickle
+
+from sentry.utils import json, metrics
+from sentry.utils.lru import LRUCache
+
+__all__ = (
+    "LocalModelCache",
+    "broadcast_invalidation",
+    "get_local_model_cache",
+    "make_local_key",
+)
+
+logger = logging.getLogger("sentry")
+
+INVALIDATION_CHANNEL = "modelcache:invalidate"
+
+# How long followers wait for the thread fetching a key before fetching it
+# themselves.
+SINGLE_FLIGHT_TIMEOUT = 5
+
+# How long the subscriber waits before reconnecting after an error.
+RECONNECT_DELAY = 5
+
+
+class _Flight(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LocalModelCache(object):
+    """
+    A bounded `LRUCache` of pickled model instances, which are unpickled on
+    every read, so that callers never share an instance.
+
+    Every invalidation bumps ``generation``. Values are only stored if no
+    invalidation happened while they were fetched, so that a slow fetch
+    cannot put back a value that was invalidated in the meantime.
+    """
+
+    def __init__(self, max_size, ttl=10):
+        self._items = LRUCache(max_size, ttl=ttl)
+        self.generation = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        data = self._items.get(key)
+        if data is None:
+            return None
+        return pickle.loads(data)
+
+    def set(self, key, value, generation=None):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._items.set(key, data)
+
+    def delete_many(self, keys):
+        with self._lock:
+            self.generation += 1
+            self._items.delete_many(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._items.clear()
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the value of ``key``, calling ``fetch`` on a miss. Only one
+        thread calls ``fetch`` for the same key at a time, all others wait
+        for its result. `None` results are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            metrics.incr("modelcache.local.hit", skip_internal=True)
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            generation = self.generation
+
+        if not leader:
+            metrics.incr("modelcache.local.coalesced", skip_internal=True)
+            if flight.event.wait(SINGLE_FLIGHT_TIMEOUT):
+                if flight.error is not None:
+                    raise flight.error
+                if flight.value is not None:
+                    return pickle.loads(flight.value)
+            return fetch()
+
+        metrics.incr("modelcache.local.miss", skip_internal=True)
+        try:
+            value = fetch()
+            if value is not None:
+                self.set(key, value, generation=generation)
+                flight.value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            return value
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+
+def get_invalidation_client():
+    from django.conf import settings
+    from sentry.utils.redis import clusters
+
+    cluster = clusters.get(settings.SENTRY_MODEL_CACHE_INVALIDATION_CLUSTER)
+    return cluster.get_local_client_for_key(INVALIDATION_CHANNEL)
+
+
+def broadcast_invalidation(keys):
+    """
+    Drops ``keys`` from the local cache of all processes.
+    """
+    local_cache = get_local_model_cache()
+    if local_cache is None or not keys:
+        return
+
+    local_cache.delete_many(keys)
+    try:
+        get_invalidation_client().publish(INVALIDATION_CHANNEL, json.dumps(list(keys)))
+    except Exception:
+        # Other processes drop the keys once their TTL expires.
+        logger.warning("modelcache.invalidation.publish_failed", exc_info=True)
+
+
+class InvalidationSubscriber(threading.Thread):
+    """
+    Drops invalidated keys from the local cache. Entries are cleared
+    whenever the subscription is (re-)established, as invalidations might
+    have been missed in the meantime.
+    """
+
+    def __init__(self, local_cache):
+        super(InvalidationSubscriber, self).__init__(name="modelcache-invalidation")
+        self.daemon = True
+        self.local_cache = local_cache
+
+    def run(self):
+        while True:
+            try:
+                pubsub = get_invalidation_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self.local_cache.clear()
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.local_cache.delete_many(json.loads(message["data"]))
+            except Exception:
+                logger.warning("modelcache.invalidation.subscribe_failed", exc_info=True)
+            self.local_cache.clear()
+            time.sleep(RECONNECT_DELAY)
+
+
+_local_model_cache = None
+_local_model_cache_pid = None
+_local_model_cache_lock = threading.Lock()
+
+
+def get_local_model_cache():
+    """
+    Returns the `LocalModelCache` of this process, or `None` if it is disabled
+    through ``SENTRY_MODEL_CACHE_LOCAL_SIZE``.
+    """
+    global _local_model_cache, _local_model_cache_pid
+    from django.conf import settings
+
+    max_size = settings.SENTRY_MODEL_CACHE_LOCAL_SIZE
+    if not max_size:
+        return None
+
+    # The subscriber thread does not survive a fork.
+    if _local_model_cache is None or _local_model_cache_pid != os.getpid():
+        with _local_model_cache_lock:
+            if _local_model_cache is None or _local_model_cache_pid != os.getpid():
+                local_cache = LocalModelCache(max_size, ttl=settings.SENTRY_MODEL_CACHE_LOCAL_TTL)
+                InvalidationSubscriber(local_cache).start()
+                _local_model_cache = local_cache
+                _local_model_cache_pid = os.getpid()
+
+    return _local_model_cache
+
+
+def make_local_key(cache_key, version):
+    return u"{}:{}".format(version, cache_key)
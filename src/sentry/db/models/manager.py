@@ -19,6 +19,7 @@ from celery.signals import task_postrun
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
 
+from .localcache import broadcast_invalidation, get_local_model_cache, make_local_key
 from .query import create_or_update
 from sentry.utils.compat import zip
 
@@ -174,40 +175,42 @@ class BaseManager(Manager):
         """
         self.__cache_state(instance)
 
-    def __post_save(self, instance, **kwargs):
+    def __post_save(self, instance, broadcast=True, **kwargs):
         """
         Pushes changes to an instance into the cache, and removes invalid (changed)
         lookup values.
+
+        Unless ``broadcast`` is disabled, all keys of the instance are also
+        dropped from the local caches of all processes.
         """
         pk_name = instance._meta.pk.name
         pk_names = ("pk", pk_name)
         pk_val = instance.pk
+        invalidated_keys = []
         for key in self.cache_fields:
             if key in pk_names:
                 continue
             # store pointers
             value = self.__value_for_field(instance, key)
+            cache_key = self.__get_lookup_cache_key(**{key: value})
             cache.set(
-                key=self.__get_lookup_cache_key(**{key: value}),
-                value=pk_val,
-                timeout=self.cache_ttl,
-                version=self.cache_version,
+                key=cache_key, value=pk_val, timeout=self.cache_ttl, version=self.cache_version
             )
+            invalidated_keys.append(cache_key)
 
         # Ensure we don't serialize the database into the cache
         db = instance._state.db
         instance._state.db = None
         # store actual object
+        cache_key = self.__get_lookup_cache_key(**{pk_name: pk_val})
         try:
             cache.set(
-                key=self.__get_lookup_cache_key(**{pk_name: pk_val}),
-                value=instance,
-                timeout=self.cache_ttl,
-                version=self.cache_version,
+                key=cache_key, value=instance, timeout=self.cache_ttl, version=self.cache_version
             )
         except Exception as e:
             logger.error(e, exc_info=True)
         instance._state.db = db
+        invalidated_keys.append(cache_key)
 
         # Kill off any keys which are no longer valid
         if instance in self.__cache:
@@ -217,33 +220,43 @@ class BaseManager(Manager):
                 value = self.__cache[instance][key]
                 current_value = self.__value_for_field(instance, key)
                 if value != current_value:
-                    cache.delete(
-                        key=self.__get_lookup_cache_key(**{key: value}), version=self.cache_version
-                    )
+                    cache_key = self.__get_lookup_cache_key(**{key: value})
+                    cache.delete(key=cache_key, version=self.cache_version)
+                    invalidated_keys.append(cache_key)
 
         self.__cache_state(instance)
 
+        if broadcast:
+            self.__broadcast_invalidation(invalidated_keys)
+
     def __post_delete(self, instance, **kwargs):
         """
         Drops instance from all cache storages.
         """
         pk_name = instance._meta.pk.name
+        invalidated_keys = []
         for key in self.cache_fields:
             if key in ("pk", pk_name):
                 continue
             # remove pointers
             value = self.__value_for_field(instance, key)
-            cache.delete(
-                key=self.__get_lookup_cache_key(**{key: value}), version=self.cache_version
-            )
+            invalidated_keys.append(self.__get_lookup_cache_key(**{key: value}))
         # remove actual object
-        cache.delete(
-            key=self.__get_lookup_cache_key(**{pk_name: instance.pk}), version=self.cache_version
-        )
+        invalidated_keys.append(self.__get_lookup_cache_key(**{pk_name: instance.pk}))
+
+        for cache_key in invalidated_keys:
+            cache.delete(key=cache_key, version=self.cache_version)
+        self.__broadcast_invalidation(invalidated_keys)
 
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, "modelcache", kwargs)
 
+    def __get_local_key(self, cache_key):
+        return make_local_key(cache_key, self.cache_version)
+
+    def __broadcast_invalidation(self, cache_keys):
+        broadcast_invalidation([self.__get_local_key(cache_key) for cache_key in cache_keys])
+
     def __value_for_field(self, instance, key):
         """
         Return the cacheable value for a field.
@@ -291,40 +304,56 @@ class BaseManager(Manager):
                 if result is not None:
                     return result
 
-            retval = cache.get(cache_key, version=self.cache_version)
-            if retval is None:
-                result = self.get(**kwargs)
-                # Ensure we're pushing it into the cache
-                self.__post_save(instance=result)
-                if local_cache is not None:
-                    local_cache[cache_key] = result
-                return result
+            process_cache = get_local_model_cache()
+            if process_cache is None:
+                return self.__get_from_shared_cache(key, value, cache_key, local_cache, kwargs)
 
-            # If we didn't look up by pk we need to hit the reffed
-            # key
-            if key != pk_name:
-                result = self.get_from_cache(**{pk_name: retval})
-                if local_cache is not None:
-                    local_cache[cache_key] = result
-                return result
+            # Concurrent misses of the same key are coalesced into a single
+            # lookup in the shared cache.
+            result = process_cache.get_or_fetch(
+                self.__get_local_key(cache_key),
+                lambda: self.__get_from_shared_cache(key, value, cache_key, local_cache, kwargs),
+            )
+            result._state.db = router.db_for_read(self.model, **kwargs)
+            return result
+        else:
+            raise ValueError("We cannot cache this query. Just hit the database.")
 
-            if not isinstance(retval, self.model):
-                if settings.DEBUG:
-                    raise ValueError("Unexpected value type returned from cache")
-                logger.error("Cache response returned invalid value %r", retval)
-                return self.get(**kwargs)
+    def __get_from_shared_cache(self, key, value, cache_key, local_cache, kwargs):
+        pk_name = self.model._meta.pk.name
 
-            if key == pk_name and int(value) != retval.pk:
-                if settings.DEBUG:
-                    raise ValueError("Unexpected value returned from cache")
-                logger.error("Cache response returned invalid value %r", retval)
-                return self.get(**kwargs)
+        retval = cache.get(cache_key, version=self.cache_version)
+        if retval is None:
+            result = self.get(**kwargs)
+            # Ensure we're pushing it into the cache
+            self.__post_save(instance=result, broadcast=False)
+            if local_cache is not None:
+                local_cache[cache_key] = result
+            return result
 
-            retval._state.db = router.db_for_read(self.model, **kwargs)
+        # If we didn't look up by pk we need to hit the reffed
+        # key
+        if key != pk_name:
+            result = self.get_from_cache(**{pk_name: retval})
+            if local_cache is not None:
+                local_cache[cache_key] = result
+            return result
 
-            return retval
-        else:
-            raise ValueError("We cannot cache this query. Just hit the database.")
+        if not isinstance(retval, self.model):
+            if settings.DEBUG:
+                raise ValueError("Unexpected value type returned from cache")
+            logger.error("Cache response returned invalid value %r", retval)
+            return self.get(**kwargs)
+
+        if key == pk_name and int(value) != retval.pk:
+            if settings.DEBUG:
+                raise ValueError("Unexpected value returned from cache")
+            logger.error("Cache response returned invalid value %r", retval)
+            return self.get(**kwargs)
+
+        retval._state.db = router.db_for_read(self.model, **kwargs)
+
+        return retval
 
     def get_many_from_cache(self, values, key="pk"):
         """
@@ -359,9 +388,15 @@ class BaseManager(Manager):
         cache_lookup_values = []
 
         local_cache = self._get_local_cache()
+        process_cache = get_local_model_cache()
+        # Values fetched below are only stored in the process cache if nothing
+        # was invalidated in the meantime.
+        generation = process_cache.generation if process_cache is not None else None
         for value in values:
             cache_key = self.__get_lookup_cache_key(**{key: value})
             result = local_cache and local_cache.get(cache_key)
+            if result is None and process_cache is not None:
+                result = process_cache.get(self.__get_local_key(cache_key))
             if result is not None:
                 final_results.append(result)
             else:
@@ -408,16 +443,24 @@ class BaseManager(Manager):
                 db_lookup_values.append(value)
                 continue
 
+            if process_cache is not None:
+                process_cache.set(
+                    self.__get_local_key(cache_key), cache_result, generation=generation
+                )
             final_results.append(cache_result)
 
         if nested_lookup_values:
             nested_results = self.get_many_from_cache(nested_lookup_values, key=pk_name)
             final_results.extend(nested_results)
-            if local_cache is not None:
-                for nested_result in nested_results:
-                    value = getattr(nested_result, key)
-                    cache_key = self.__get_lookup_cache_key(**{key: value})
+            for nested_result in nested_results:
+                value = getattr(nested_result, key)
+                cache_key = self.__get_lookup_cache_key(**{key: value})
+                if local_cache is not None:
                     local_cache[cache_key] = nested_result
+                if process_cache is not None:
+                    process_cache.set(
+                        self.__get_local_key(cache_key), nested_result, generation=generation
+                    )
 
         if not db_lookup_values:
             return final_results
@@ -434,12 +477,14 @@ class BaseManager(Manager):
             cache_writes.append(db_result)
             if local_cache is not None:
                 local_cache[cache_key] = db_result
+            if process_cache is not None:
+                process_cache.set(self.__get_local_key(cache_key), db_result, generation=generation)
 
             final_results.append(db_result)
 
         # XXX: Should use set_many here, but __post_save code is too complex
         for instance in cache_writes:
-            self.__post_save(instance=instance)
+            self.__post_save(instance=instance, broadcast=False)
 
         return final_results
 
@@ -450,6 +495,7 @@ class BaseManager(Manager):
         pk_name = self.model._meta.pk.name
         cache_key = self.__get_lookup_cache_key(**{pk_name: instance_id})
         cache.delete(cache_key, version=self.cache_version)
+        self.__broadcast_invalidation([cache_key])
 
     def post_save(self, instance, **kwargs):
         """
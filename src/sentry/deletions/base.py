@@ -183,10 +183,15 @@ class ModelDeletionTask(BaseDeletionTask):
             if num_shards:
                 assert num_shards > 1
                 assert shard_id < num_shards
+                # The column is qualified, as the query might join other
+                # tables with an ``id`` column.
                 queryset = queryset.extra(
                     where=[
-                        u"id %% {num_shards} = {shard_id}".format(
-                            num_shards=num_shards, shard_id=shard_id
+                        u'"{table}"."{column}" %% {num_shards} = {shard_id}'.format(
+                            table=self.model._meta.db_table,
+                            column=self.model._meta.pk.column,
+                            num_shards=num_shards,
+                            shard_id=shard_id,
                         )
                     ]
                 )
@@ -0,0 +1,198 @@
+"""
+Helpers to delete a single root object (a project or an organization) with
+many parallel tasks.
+
+The child relations of the root object are split into stages which run one
+after another. Consecutive bulk relations that do not reference each other
+share a stage, every other relation gets a stage of its own which is split
+into ``num_shards`` shards by primary key. All shards of a stage run at the
+same time, and the progress is checkpointed in Redis, so that a retried
+deletion continues with the stage it stopped at.
+
+All shards share a global budget of deleted rows per second, and back off
+while the replicas lag behind the primary.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import ForeignKey
+
+from sentry.utils import json, metrics, redis
+
+from .base import BulkModelDeletionTask, ModelDeletionTask
+
+logger = logging.getLogger("sentry.deletions.async")
+
+# The TTL of a checkpoint is refreshed whenever it is saved.
+CHECKPOINT_TIMEOUT = 60 * 60 * 24 * 7
+
+# The rows budget is accounted in windows of this many seconds, so that
+# chunks which are larger than the per second budget are still allowed.
+BUDGET_WINDOW = 10
+
+# How long a shard task deletes chunks before it re-enqueues itself.
+SHARD_TIME_BUDGET = 10
+
+
+def get_child_relations(task, instance):
+    """
+    Returns the child relations of ``instance`` in the order in which
+    ``task.delete_bulk`` would delete them.
+    """
+    relations = task.get_child_relations_bulk([instance])
+    relations = task.filter_relations(task.extend_relations_bulk(relations, [instance]))
+    child_relations = task.get_child_relations(instance)
+    child_relations = task.filter_relations(task.extend_relations(child_relations, instance))
+    return list(relations or []) + list(child_relations or [])
+
+
+def get_relation_task(manager, relation):
+    task = relation.task
+    if task is None:
+        task = manager.tasks.get(relation.params.get("model"), manager.default_task)
+    return task
+
+
+def _references(model, other):
+    return any(
+        isinstance(field, ForeignKey) and field.related_model is other
+        for field in model._meta.get_fields()
+    )
+
+
+def get_deletion_plan(manager, relations, num_shards=None):
+    """
+    Returns a list of stages, each of which is a list of ``(relation_index,
+    shard_id)`` tuples that can be deleted at the same time. ``shard_id`` is
+    `None` for relations that are not sharded.
+    """
+    stages = []
+    bulk_models = None
+    for index, relation in enumerate(relations):
+        model = relation.params.get("model")
+        task = get_relation_task(manager, relation)
+        if issubclass(task, BulkModelDeletionTask):
+            # Rows of a model can only be removed once all rows referencing
+            # them are gone, which is the order the relations are declared in.
+            if bulk_models is None or any(_references(other, model) for other in bulk_models):
+                bulk_models = []
+                stages.append([])
+            bulk_models.append(model)
+            stages[-1].append((index, None))
+        else:
+            # These relations cascade to other models, which might depend on
+            # any of the earlier relations.
+            bulk_models = None
+            if issubclass(task, ModelDeletionTask) and num_shards and num_shards > 1:
+                stages.append([(index, shard_id) for shard_id in range(num_shards)])
+            else:
+                stages.append([(index, None)])
+    return stages
+
+
+def get_shard_key(relation_index, shard_id):
+    return u"{}:{}".format(relation_index, "" if shard_id is None else shard_id)
+
+
+def get_checkpoint_key(app_label, model_name, object_id):
+    return u"deletions:checkpoint:{}.{}:{}".format(app_label, model_name, object_id)
+
+
+def _get_checkpoint_client(key):
+    return redis.clusters.get("default").get_local_client_for_key(key)
+
+
+def get_checkpoint(app_label, model_name, object_id):
+    """
+    Returns the checkpoint of a sharded deletion, which is a dict with the
+    ``num_shards`` the deletion was planned with, the current ``stage`` and
+    the keys of its ``pending`` shards, or `None` if it has not started (or
+    the checkpoint was lost, in which case the deletion starts over).
+    """
+    key = get_checkpoint_key(app_label, model_name, object_id)
+    value = _get_checkpoint_client(key).get(key)
+    if value is None:
+        return None
+    return json.loads(value)
+
+
+def save_checkpoint(app_label, model_name, object_id, checkpoint):
+    key = get_checkpoint_key(app_label, model_name, object_id)
+    _get_checkpoint_client(key).set(key, json.dumps(checkpoint), ex=CHECKPOINT_TIMEOUT)
+
+
+def clear_checkpoint(app_label, model_name, object_id):
+    key = get_checkpoint_key(app_label, model_name, object_id)
+    _get_checkpoint_client(key).delete(key)
+
+
+def reserve_rows(rows, now=None):
+    """
+    Reserves ``rows`` from the global budget of deleted rows, configured
+    through ``SENTRY_DELETIONS_MAX_ROWS_PER_SECOND``. Returns the number of
+    seconds to wait if the budget is used up, or ``0`` if the rows may be
+    deleted right away.
+    """
+    rate = settings.SENTRY_DELETIONS_MAX_ROWS_PER_SECOND
+    if not rate:
+        return 0
+
+    if now is None:
+        now = time.time()
+    window = int(now // BUDGET_WINDOW)
+    key = u"deletions:budget:{}".format(window)
+
+    client = redis.clusters.get("default").get_local_client_for_key(key)
+    with client.pipeline() as pipe:
+        pipe.incrby(key, rows)
+        pipe.expire(key, BUDGET_WINDOW)
+        used = pipe.execute()[0]
+
+    # A chunk is allowed as long as the budget was not used up before it,
+    # which lets chunks larger than the budget through once per window.
+    if used - rows < rate * BUDGET_WINDOW:
+        return 0
+
+    client.decrby(key, rows)
+    return (window + 1) * BUDGET_WINDOW - now
+
+
+def get_replication_lag(using="default"):
+    """
+    Returns the replay lag of the slowest replica in seconds, or `None` if it
+    cannot be determined (for instance if there are no replicas).
+    """
+    try:
+        with transaction.atomic(using=using):
+            cursor = connections[using].cursor()
+            cursor.execute("SELECT EXTRACT(EPOCH FROM MAX(replay_lag)) FROM pg_stat_replication")
+            row = cursor.fetchone()
+    except DatabaseError:
+        logger.warning("deletion.replication_lag.failed", exc_info=True)
+        return None
+    if row is None or row[0] is None:
+        return None
+    return float(row[0])
+
+
+def get_throttle_delay(rows):
+    """
+    Returns the number of seconds to wait before deleting ``rows`` more rows,
+    or ``0`` if the deletion may continue right away.
+    """
+    max_lag = settings.SENTRY_DELETIONS_MAX_REPLICATION_LAG
+    if max_lag:
+        lag = get_replication_lag()
+        if lag is not None and lag > max_lag:
+            metrics.incr("deletions.throttled", tags={"reason": "replication_lag"})
+            return lag
+
+    delay = reserve_rows(rows)
+    if delay:
+        metrics.incr("deletions.throttled", tags={"reason": "budget"})
+    return delay
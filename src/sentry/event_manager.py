@@ -462,206 +462,17 @@ class EventManager(object):
             jobs = save_transaction_events([job], projects)
             return jobs[0]["event"]
 
-        with metrics.timer("event_manager.save.organization.get_from_cache"):
-            project._organization_cache = Organization.objects.get_from_cache(
-                id=project.organization_id
-            )
-
-        job = {"data": self._data, "project_id": project_id, "raw": raw, "start_time": start_time}
-        jobs = [job]
-
-        _pull_out_data(jobs, projects)
-        _get_or_create_release_many(jobs, projects)
-        _get_event_user_many(jobs, projects)
-
-        with metrics.timer("event_manager.load_grouping_config"):
-            # At this point we want to normalize the in_app values in case the
-            # clients did not set this appropriately so far.
-            grouping_config = load_grouping_config(
-                get_grouping_config_dict_for_event_data(job["data"], project)
-            )
-
-        with metrics.timer("event_manager.normalize_stacktraces_for_grouping"):
-            normalize_stacktraces_for_grouping(job["data"], grouping_config)
-
-        _derive_plugin_tags_many(jobs, projects)
-        _derive_interface_tags_many(jobs)
-
-        with metrics.timer("event_manager.apply_server_fingerprinting"):
-            # The active grouping config was put into the event in the
-            # normalize step before.  We now also make sure that the
-            # fingerprint was set to `'{{ default }}' just in case someone
-            # removed it from the payload.  The call to get_hashes will then
-            # look at `grouping_config` to pick the right parameters.
-            job["data"]["fingerprint"] = job["data"].get("fingerprint") or ["{{ default }}"]
-            apply_server_fingerprinting(job["data"], get_fingerprinting_config_for_project(project))
-
-        with metrics.timer("event_manager.event.get_hashes"):
-            # Here we try to use the grouping config that was requested in the
-            # event.  If that config has since been deleted (because it was an
-            # experimental grouping config) we fall back to the default.
-            try:
-                hashes = job["event"].get_hashes()
-            except GroupingConfigNotFound:
-                job["data"]["grouping_config"] = get_grouping_config_dict_for_project(project)
-                hashes = job["event"].get_hashes()
-
-        job["data"]["hashes"] = hashes
-
-        _materialize_metadata_many(jobs)
-
-        # The group gets the same metadata as the event when it's flushed but
-        # additionally the `last_received` key is set.  This key is used by
-        # _save_aggregate.
-        group_metadata = dict(job["materialized_metadata"])
-        group_metadata["last_received"] = job["received_timestamp"]
-        kwargs = {
-            "platform": job["platform"],
-            "message": job["event"].search_message,
-            "culprit": job["culprit"],
-            "logger": job["logger_name"],
-            "level": LOG_LEVELS_MAP.get(job["level"]),
-            "last_seen": job["event"].datetime,
-            "first_seen": job["event"].datetime,
-            "active_at": job["event"].datetime,
-            "data": group_metadata,
+        job = {
+            "data": self._data,
+            "project_id": project_id,
+            "raw": raw,
+            "start_time": start_time,
+            "cache_key": cache_key,
         }
+        save_error_events([job], projects)
 
-        if job["release"]:
-            kwargs["first_release"] = job["release"]
-
-        try:
-            job["group"], job["is_new"], job["is_regression"] = _save_aggregate(
-                event=job["event"], hashes=hashes, release=job["release"], **kwargs
-            )
-        except HashDiscarded:
-            project_key = None
-            if job["key_id"] is not None:
-                try:
-                    project_key = ProjectKey.objects.get_from_cache(id=job["key_id"])
-                except ProjectKey.DoesNotExist:
-                    pass
-
-            quotas.refund(project, key=project_key, timestamp=start_time)
-
-            track_outcome(
-                org_id=project.organization_id,
-                project_id=project_id,
-                key_id=job["key_id"],
-                outcome=Outcome.FILTERED,
-                reason=FilterStatKeys.DISCARDED_HASH,
-                timestamp=to_datetime(job["start_time"]),
-                event_id=job["event"].event_id,
-                category=job["category"],
-            )
-
-            metrics.incr(
-                "events.discarded",
-                skip_internal=True,
-                tags={"organization_id": project.organization_id, "platform": job["platform"]},
-            )
-            raise
-
-        job["event"].group = job["group"]
-
-        # store a reference to the group id to guarantee validation of isolation
-        # XXX(markus): No clue what this does
-        job["event"].data.bind_ref(job["event"])
-
-        _get_or_create_environment_many(jobs, projects)
-
-        if job["group"]:
-            group_environment, job["is_new_group_environment"] = GroupEnvironment.get_or_create(
-                group_id=job["group"].id,
-                environment_id=job["environment"].id,
-                defaults={"first_release": job["release"] or None},
-            )
-        else:
-            job["is_new_group_environment"] = False
-
-        _get_or_create_release_associated_models(jobs, projects)
-
-        if job["release"] and job["group"]:
-            job["grouprelease"] = GroupRelease.get_or_create(
-                group=job["group"],
-                release=job["release"],
-                environment=job["environment"],
-                datetime=job["event"].datetime,
-            )
-
-        _tsdb_record_all_metrics(jobs)
-
-        if job["group"]:
-            UserReport.objects.filter(project=project, event_id=job["event"].event_id).update(
-                group=job["group"], environment=job["environment"]
-            )
-
-        _materialize_event_metrics(jobs)
-
-        # Load attachments first, but persist them at the very last after
-        # posting to eventstream to make sure all counters and eventstream are
-        # incremented for sure.
-        attachments = []
-        for attachment in get_attachments(cache_key, job["event"]):
-            try:
-                attachment_data = attachment.data
-            except MissingAttachmentChunks:
-                logger.exception("Missing chunks for cache_key=%s", cache_key)
-            else:
-                key = "bytes.stored.%s" % (attachment.type,)
-                job["event_metrics"][key] = (job["event_metrics"].get(key) or 0) + len(
-                    attachment_data
-                )
-                attachments.append(attachment)
-
-        _nodestore_save_many(jobs)
-
-        if job["release"]:
-            if job["is_new"]:
-                buffer.incr(
-                    ReleaseProject,
-                    {"new_groups": 1},
-                    {"release_id": job["release"].id, "project_id": project.id},
-                )
-            if job["is_new_group_environment"]:
-                buffer.incr(
-                    ReleaseProjectEnvironment,
-                    {"new_issues_count": 1},
-                    {
-                        "project_id": project.id,
-                        "release_id": job["release"].id,
-                        "environment_id": job["environment"].id,
-                    },
-                )
-
-        if not raw:
-            if not project.first_event:
-                project.update(first_event=job["event"].datetime)
-                first_event_received.send_robust(
-                    project=project, event=job["event"], sender=Project
-                )
-
-        _eventstream_insert_many(jobs)
-
-        # Do this last to ensure signals get emitted even if connection to the
-        # file store breaks temporarily.
-        save_attachments(attachments, job["event"])
-
-        metric_tags = {"from_relay": "_relay_processed" in job["data"]}
-
-        metrics.timing(
-            "events.latency",
-            job["received_timestamp"] - job["recorded_timestamp"],
-            tags=metric_tags,
-        )
-        metrics.timing("events.size.data.post_save", job["event"].size, tags=metric_tags)
-        metrics.incr(
-            "events.post_save.normalize.errors",
-            amount=len(job["data"].get("errors") or ()),
-            tags=metric_tags,
-        )
-
-        _track_outcome_accepted_many(jobs)
+        if job.get("hash_discarded") is not None:
+            raise job["hash_discarded"]
 
         self._data = job["event"].data.data
         return job["event"]
@@ -805,6 +616,54 @@ def _derive_interface_tags_many(jobs):
                 data.pop(iface.path, None)
 
 
+@metrics.wraps("save_event.normalize_stacktraces_for_grouping_many")
+def _normalize_stacktraces_for_grouping_many(jobs, projects):
+    for job in jobs:
+        project = projects[job["project_id"]]
+
+        with metrics.timer("event_manager.load_grouping_config"):
+            # At this point we want to normalize the in_app values in case the
+            # clients did not set this appropriately so far.
+            grouping_config = load_grouping_config(
+                get_grouping_config_dict_for_event_data(job["data"], project)
+            )
+
+        with metrics.timer("event_manager.normalize_stacktraces_for_grouping"):
+            normalize_stacktraces_for_grouping(job["data"], grouping_config)
+
+
+@metrics.wraps("save_event.calculate_hashes_many")
+def _calculate_hashes_many(jobs, projects):
+    fingerprinting_configs = {}
+
+    for job in jobs:
+        project = projects[job["project_id"]]
+
+        if project.id not in fingerprinting_configs:
+            fingerprinting_configs[project.id] = get_fingerprinting_config_for_project(project)
+
+        with metrics.timer("event_manager.apply_server_fingerprinting"):
+            # The active grouping config was put into the event in the
+            # normalize step before.  We now also make sure that the
+            # fingerprint was set to `'{{ default }}' just in case someone
+            # removed it from the payload.  The call to get_hashes will then
+            # look at `grouping_config` to pick the right parameters.
+            job["data"]["fingerprint"] = job["data"].get("fingerprint") or ["{{ default }}"]
+            apply_server_fingerprinting(job["data"], fingerprinting_configs[project.id])
+
+        with metrics.timer("event_manager.event.get_hashes"):
+            # Here we try to use the grouping config that was requested in the
+            # event.  If that config has since been deleted (because it was an
+            # experimental grouping config) we fall back to the default.
+            try:
+                hashes = job["event"].get_hashes()
+            except GroupingConfigNotFound:
+                job["data"]["grouping_config"] = get_grouping_config_dict_for_project(project)
+                hashes = job["event"].get_hashes()
+
+        job["data"]["hashes"] = hashes
+
+
 @metrics.wraps("save_event.materialize_metadata_many")
 def _materialize_metadata_many(jobs):
     for job in jobs:
@@ -822,9 +681,239 @@ def _materialize_metadata_many(jobs):
 
 @metrics.wraps("save_event.get_or_create_environment_many")
 def _get_or_create_environment_many(jobs, projects):
+    environments = {}
+
     for job in jobs:
-        job["environment"] = Environment.get_or_create(
-            project=projects[job["project_id"]], name=job["environment"]
+        environment_key = (job["project_id"], job["environment"])
+        if environment_key not in environments:
+            environments[environment_key] = Environment.get_or_create(
+                project=projects[job["project_id"]], name=job["environment"]
+            )
+        job["environment"] = environments[environment_key]
+
+
+@metrics.wraps("save_event.save_aggregate_many")
+def _save_aggregate_many(jobs, projects):
+    """
+    Assigns a group to every job, creating groups for unseen hashes.
+
+    Grouphashes for the whole batch are fetched upfront and `times_seen`
+    increments for the same group are coalesced into a single buffer write.
+    Jobs that match a tombstone are flagged with `hash_discarded` and left
+    out of the returned list.
+    """
+    all_grouphashes = _find_hashes_many(jobs, projects)
+    groups = {}
+    group_updates = {}
+    saved_jobs = []
+
+    # The coalesced increments of groups saved earlier in the batch are
+    # written even if a later job fails.
+    try:
+        for job in jobs:
+            # The group gets the same metadata as the event when it's flushed but
+            # additionally the `last_received` key is set.  This key is used by
+            # _save_aggregate.
+            group_metadata = dict(job["materialized_metadata"])
+            group_metadata["last_received"] = job["received_timestamp"]
+            kwargs = {
+                "platform": job["platform"],
+                "message": job["event"].search_message,
+                "culprit": job["culprit"],
+                "logger": job["logger_name"],
+                "level": LOG_LEVELS_MAP.get(job["level"]),
+                "last_seen": job["event"].datetime,
+                "first_seen": job["event"].datetime,
+                "active_at": job["event"].datetime,
+                "data": group_metadata,
+            }
+
+            if job["release"]:
+                kwargs["first_release"] = job["release"]
+
+            grouphashes = [all_grouphashes[(job["project_id"], h)] for h in job["data"]["hashes"]]
+
+            try:
+                job["group"], job["is_new"], job["is_regression"] = _save_aggregate(
+                    event=job["event"],
+                    all_hashes=grouphashes,
+                    release=job["release"],
+                    groups=groups,
+                    group_updates=group_updates,
+                    **kwargs
+                )
+            except HashDiscarded as e:
+                _track_outcome_discarded_hash(job, projects)
+                job["hash_discarded"] = e
+                continue
+
+            job["event"].group = job["group"]
+
+            # store a reference to the group id to guarantee validation of isolation
+            # XXX(markus): No clue what this does
+            job["event"].data.bind_ref(job["event"])
+
+            saved_jobs.append(job)
+    finally:
+        for group_id, (times_seen, extra) in six.iteritems(group_updates):
+            buffer.incr(Group, {"times_seen": times_seen}, {"id": group_id}, extra)
+
+    return saved_jobs
+
+
+def _track_outcome_discarded_hash(job, projects):
+    project = projects[job["project_id"]]
+
+    project_key = None
+    if job["key_id"] is not None:
+        try:
+            project_key = ProjectKey.objects.get_from_cache(id=job["key_id"])
+        except ProjectKey.DoesNotExist:
+            pass
+
+    quotas.refund(project, key=project_key, timestamp=job["start_time"])
+
+    track_outcome(
+        org_id=project.organization_id,
+        project_id=job["project_id"],
+        key_id=job["key_id"],
+        outcome=Outcome.FILTERED,
+        reason=FilterStatKeys.DISCARDED_HASH,
+        timestamp=to_datetime(job["start_time"]),
+        event_id=job["event"].event_id,
+        category=job["category"],
+    )
+
+    metrics.incr(
+        "events.discarded",
+        skip_internal=True,
+        tags={"organization_id": project.organization_id, "platform": job["platform"]},
+    )
+
+
+@metrics.wraps("save_event.get_or_create_group_environment_many")
+def _get_or_create_group_environment_many(jobs):
+    group_environments = {}
+
+    for job in jobs:
+        if not job["group"]:
+            job["is_new_group_environment"] = False
+            continue
+
+        # Only the first event of a batch can create the group environment.
+        group_environment_key = (job["group"].id, job["environment"].id)
+        if group_environment_key in group_environments:
+            job["is_new_group_environment"] = False
+            continue
+
+        _, job["is_new_group_environment"] = GroupEnvironment.get_or_create(
+            group_id=job["group"].id,
+            environment_id=job["environment"].id,
+            defaults={"first_release": job["release"] or None},
+        )
+        group_environments[group_environment_key] = True
+
+
+@metrics.wraps("save_event.get_or_create_group_release_many")
+def _get_or_create_group_release_many(jobs):
+    for job in jobs:
+        if job["release"] and job["group"]:
+            job["grouprelease"] = GroupRelease.get_or_create(
+                group=job["group"],
+                release=job["release"],
+                environment=job["environment"],
+                datetime=job["event"].datetime,
+            )
+
+
+@metrics.wraps("save_event.update_user_reports_many")
+def _update_user_reports_many(jobs):
+    for job in jobs:
+        if job["group"]:
+            UserReport.objects.filter(
+                project_id=job["project_id"], event_id=job["event"].event_id
+            ).update(group=job["group"], environment=job["environment"])
+
+
+@metrics.wraps("save_event.get_attachments_many")
+def _get_attachments_many(jobs):
+    # Load attachments first, but persist them at the very last after
+    # posting to eventstream to make sure all counters and eventstream are
+    # incremented for sure.
+    for job in jobs:
+        job["attachments"] = attachments = []
+
+        for attachment in get_attachments(job.get("cache_key"), job["event"]):
+            try:
+                attachment_data = attachment.data
+            except MissingAttachmentChunks:
+                logger.exception("Missing chunks for cache_key=%s", job.get("cache_key"))
+            else:
+                key = "bytes.stored.%s" % (attachment.type,)
+                job["event_metrics"][key] = (job["event_metrics"].get(key) or 0) + len(
+                    attachment_data
+                )
+                attachments.append(attachment)
+
+
+@metrics.wraps("save_event.record_release_new_groups_many")
+def _record_release_new_groups_many(jobs):
+    for job in jobs:
+        if not job["release"]:
+            continue
+
+        if job["is_new"]:
+            buffer.incr(
+                ReleaseProject,
+                {"new_groups": 1},
+                {"release_id": job["release"].id, "project_id": job["project_id"]},
+            )
+        if job["is_new_group_environment"]:
+            buffer.incr(
+                ReleaseProjectEnvironment,
+                {"new_issues_count": 1},
+                {
+                    "project_id": job["project_id"],
+                    "release_id": job["release"].id,
+                    "environment_id": job["environment"].id,
+                },
+            )
+
+
+@metrics.wraps("save_event.record_first_event_many")
+def _record_first_event_many(jobs, projects):
+    for job in jobs:
+        if job["raw"]:
+            continue
+
+        project = projects[job["project_id"]]
+        if not project.first_event:
+            project.update(first_event=job["event"].datetime)
+            first_event_received.send_robust(project=project, event=job["event"], sender=Project)
+
+
+@metrics.wraps("save_event.save_attachments_many")
+def _save_attachments_many(jobs):
+    for job in jobs:
+        # Do this last to ensure signals get emitted even if connection to the
+        # file store breaks temporarily.
+        save_attachments(job["attachments"], job["event"])
+
+
+def _record_save_metrics_many(jobs):
+    for job in jobs:
+        metric_tags = {"from_relay": "_relay_processed" in job["data"]}
+
+        metrics.timing(
+            "events.latency",
+            job["received_timestamp"] - job["recorded_timestamp"],
+            tags=metric_tags,
+        )
+        metrics.timing("events.size.data.post_save", job["event"].size, tags=metric_tags)
+        metrics.incr(
+            "events.post_save.normalize.errors",
+            amount=len(job["data"].get("errors") or ()),
+            tags=metric_tags,
         )
 
 
@@ -1050,12 +1139,9 @@ def get_culprit(data):
     )
 
 
-def _save_aggregate(event, hashes, release, **kwargs):
+def _save_aggregate(event, all_hashes, release, groups, group_updates, **kwargs):
     project = event.project
 
-    # attempt to find a matching hash
-    all_hashes = _find_hashes(project, hashes)
-
     existing_group_id = None
     for h in all_hashes:
         if h.group_id is not None:
@@ -1089,12 +1175,18 @@ def _save_aggregate(event, hashes, release, **kwargs):
                 True,
             )
 
+        groups[group.id] = group
+
         metrics.incr(
             "group.created", skip_internal=True, tags={"platform": event.platform or "unknown"}
         )
 
     else:
-        group = Group.objects.get(id=existing_group_id)
+        # Events of the same batch share the group instance so that they
+        # see each other's changes (e.g. regressions and `last_seen`).
+        group = groups.get(existing_group_id)
+        if group is None:
+            group = groups[existing_group_id] = Group.objects.get(id=existing_group_id)
 
         group_is_new = False
 
@@ -1117,12 +1209,18 @@ def _save_aggregate(event, hashes, release, **kwargs):
             state=GroupHash.State.LOCKED_IN_MIGRATION
         ).update(group=group)
 
+        # Keep the grouphashes shared within the batch in sync with the
+        # update above.
+        for h in new_hashes:
+            if h.state != GroupHash.State.LOCKED_IN_MIGRATION:
+                h.group_id = group.id
+
         if group_is_new and len(new_hashes) == len(all_hashes):
             is_new = True
 
     if not is_new:
         is_regression = _process_existing_aggregate(
-            group=group, event=event, data=kwargs, release=release
+            group=group, event=event, data=kwargs, release=release, group_updates=group_updates
         )
     else:
         is_regression = False
@@ -1215,7 +1313,7 @@ def _handle_regression(group, event, release):
     return is_regression
 
 
-def _process_existing_aggregate(group, event, data, release):
+def _process_existing_aggregate(group, event, data, release, group_updates):
     date = max(event.datetime, group.last_seen)
     extra = {"last_seen": date, "score": ScoreClause(group), "data": data["data"]}
     if event.search_message and event.search_message != group.message:
@@ -1231,9 +1329,19 @@ def _process_existing_aggregate(group, event, data, release):
 
     group.last_seen = extra["last_seen"]
 
-    update_kwargs = {"times_seen": 1}
-
-    buffer.incr(Group, update_kwargs, {"id": group.id}, extra)
+    # Coalesce the buffer writes for all events of a batch hitting the same
+    # group. The latest event wins, except for `first_seen`.
+    if group.id in group_updates:
+        times_seen, previous_extra = group_updates[group.id]
+        if previous_extra["last_seen"] > extra["last_seen"]:
+            extra, previous_extra = previous_extra, extra
+        if "first_seen" in previous_extra:
+            extra["first_seen"] = min(
+                previous_extra["first_seen"], extra.get("first_seen", previous_extra["first_seen"])
+            )
+        group_updates[group.id] = (times_seen + 1, extra)
+    else:
+        group_updates[group.id] = (1, extra)
 
     return is_regression
 
@@ -1328,10 +1436,28 @@ def save_attachments(attachments, event):
         )
 
 
-def _find_hashes(project, hash_list):
-    return map(
-        lambda hash: GroupHash.objects.get_or_create(project=project, hash=hash)[0], hash_list
-    )
+@metrics.wraps("save_event.find_hashes_many")
+def _find_hashes_many(jobs, projects):
+    """
+    Fetches (or creates) the grouphashes of all jobs, keyed by project id and
+    hash. Existing hashes are loaded with one query per project.
+    """
+    hashes_by_project = {}
+    for job in jobs:
+        hashes_by_project.setdefault(job["project_id"], set()).update(job["data"]["hashes"])
+
+    grouphashes = {}
+    for project_id, hashes in six.iteritems(hashes_by_project):
+        for grouphash in GroupHash.objects.filter(project_id=project_id, hash__in=hashes):
+            grouphashes[(project_id, grouphash.hash)] = grouphash
+
+        for hash in hashes:
+            if (project_id, hash) not in grouphashes:
+                grouphashes[(project_id, hash)] = GroupHash.objects.get_or_create(
+                    project=projects[project_id], hash=hash
+                )[0]
+
+    return grouphashes
 
 
 @metrics.wraps("event_manager.save_transactions.materialize_event_metrics")
@@ -1347,22 +1473,70 @@ def _materialize_event_metrics(jobs):
         job["event_metrics"] = event_metrics
 
 
+def _set_organization_cache_many(projects):
+    organization_ids = set(project.organization_id for project in six.itervalues(projects))
+    organizations = {o.id: o for o in Organization.objects.get_many_from_cache(organization_ids)}
+
+    for project in six.itervalues(projects):
+        try:
+            project._organization_cache = organizations[project.organization_id]
+        except KeyError:
+            continue
+
+
+@metrics.wraps("event_manager.save_error_events")
+def save_error_events(jobs, projects):
+    """
+    Saves a batch of (normalized) error events.
+
+    Every job needs at least `data`, `project_id` and `start_time`, and may
+    carry `raw` and `cache_key` (used to look up attachments). Releases,
+    environments, grouphashes and group counters are resolved once per batch
+    instead of once per event.
+
+    Returns the jobs that were saved. Jobs whose hashes match a tombstone are
+    skipped and get a `hash_discarded` exception set instead.
+    """
+    with metrics.timer("event_manager.save_error_events.set_organization_cache"):
+        _set_organization_cache_many(projects)
+
+    for job in jobs:
+        job.setdefault("raw", False)
+        job.setdefault("cache_key", None)
+
+    _pull_out_data(jobs, projects)
+    _get_or_create_release_many(jobs, projects)
+    _get_event_user_many(jobs, projects)
+    _normalize_stacktraces_for_grouping_many(jobs, projects)
+    _derive_plugin_tags_many(jobs, projects)
+    _derive_interface_tags_many(jobs)
+    _calculate_hashes_many(jobs, projects)
+    _materialize_metadata_many(jobs)
+
+    jobs = _save_aggregate_many(jobs, projects)
+
+    _get_or_create_environment_many(jobs, projects)
+    _get_or_create_group_environment_many(jobs)
+    _get_or_create_release_associated_models(jobs, projects)
+    _get_or_create_group_release_many(jobs)
+    _tsdb_record_all_metrics(jobs)
+    _update_user_reports_many(jobs)
+    _materialize_event_metrics(jobs)
+    _get_attachments_many(jobs)
+    _nodestore_save_many(jobs)
+    _record_release_new_groups_many(jobs)
+    _record_first_event_many(jobs, projects)
+    _eventstream_insert_many(jobs)
+    _save_attachments_many(jobs)
+    _record_save_metrics_many(jobs)
+    _track_outcome_accepted_many(jobs)
+    return jobs
+
+
 @metrics.wraps("event_manager.save_transaction_events")
 def save_transaction_events(jobs, projects):
-    with metrics.timer("event_manager.save_transactions.collect_organization_ids"):
-        organization_ids = set(project.organization_id for project in six.itervalues(projects))
-
     with metrics.timer("event_manager.save_transactions.fetch_organizations"):
-        organizations = {
-            o.id: o for o in Organization.objects.get_many_from_cache(organization_ids)
-        }
-
-    with metrics.timer("event_manager.save_transactions.set_organization_cache"):
-        for project in six.itervalues(projects):
-            try:
-                project._organization_cache = organizations[project.organization_id]
-            except KeyError:
-                continue
+        _set_organization_cache_many(projects)
 
     with metrics.timer("event_manager.save_transactions.prepare_jobs"):
         for job in jobs:
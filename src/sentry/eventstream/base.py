@@ -39,18 +39,34 @@ class EventStream(Service):
         is_new_group_environment,
         primary_hash,
         skip_consume=False,
+        producer=None,
     ):
         if skip_consume:
             logger.info("post_process.skip.raw_event", extra={"event_id": event.event_id})
         else:
-            post_process_group.delay(
-                event=event,
-                is_new=is_new,
-                is_regression=is_regression,
-                is_new_group_environment=is_new_group_environment,
-                primary_hash=primary_hash,
+            post_process_group.apply_async(
+                kwargs={
+                    "event": event,
+                    "is_new": is_new,
+                    "is_regression": is_regression,
+                    "is_new_group_environment": is_new_group_environment,
+                    "primary_hash": primary_hash,
+                },
+                producer=producer,
             )
 
+    def _dispatch_post_process_group_tasks(self, task_kwargs_list):
+        """
+        Dispatches the post-processing tasks of several events, publishing
+        all of them through the same broker producer.
+        """
+        if not task_kwargs_list:
+            return
+
+        with post_process_group.app.producer_or_acquire() as producer:
+            for task_kwargs in task_kwargs_list:
+                self._dispatch_post_process_group_task(producer=producer, **task_kwargs)
+
     def insert(
         self,
         group,
@@ -100,6 +116,7 @@ class EventStream(Service):
         synchronize_commit_group,
         commit_batch_size=100,
         initial_offset_reset="latest",
+        batch_timeout=None,
     ):
         assert not self.requires_post_process_forwarder()
         raise ForwarderNotRequired
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 import logging
 import six
+import time
 
 from confluent_kafka import OFFSET_INVALID, TopicPartition
 from django.conf import settings
@@ -80,7 +81,15 @@ class KafkaEventStream(SnubaProtocolEventStream):
         synchronize_commit_group,
         commit_batch_size=100,
         initial_offset_reset="latest",
+        batch_timeout=None,
     ):
+        """
+        Enqueues the post-processing tasks of the events that Snuba has
+        committed. By default a task is enqueued as soon as its message is
+        consumed. If ``batch_timeout`` is set, messages are collected for up
+        to that many seconds (or ``commit_batch_size`` messages), and all of
+        their tasks are enqueued together before the offsets are committed.
+        """
         logger.debug("Starting post-process forwarder...")
 
         cluster_name = settings.KAFKA_TOPICS[settings.KAFKA_EVENTS]["cluster"]
@@ -96,6 +105,31 @@ class KafkaEventStream(SnubaProtocolEventStream):
 
         owned_partition_offsets = {}
 
+        # Messages that were consumed in batching mode, but whose tasks have
+        # not been enqueued yet.
+        pending_messages = []
+
+        def dispatch_pending_messages():
+            if not pending_messages:
+                return
+
+            with metrics.timer("eventstream.duration", instance="get_task_kwargs_for_messages"):
+                task_kwargs_list = [
+                    task_kwargs
+                    for task_kwargs in (
+                        get_task_kwargs_for_message(message.value()) for message in pending_messages
+                    )
+                    if task_kwargs is not None
+                ]
+
+            with metrics.timer(
+                "eventstream.duration", instance="dispatch_post_process_group_tasks"
+            ):
+                self._dispatch_post_process_group_tasks(task_kwargs_list)
+
+            metrics.timing("eventstream.batch_size", len(pending_messages))
+            del pending_messages[:]
+
         def commit(partitions):
             results = consumer.commit(offsets=partitions, asynchronous=False)
 
@@ -135,6 +169,9 @@ class KafkaEventStream(SnubaProtocolEventStream):
         def on_revoke(consumer, partitions):
             logger.debug("Revoked partition assignment: %r", partitions)
 
+            # The offsets of the pending messages are about to be committed.
+            dispatch_pending_messages()
+
             offsets_to_commit = []
 
             for i in partitions:
@@ -183,39 +220,70 @@ class KafkaEventStream(SnubaProtocolEventStream):
                 )
                 commit(offsets_to_commit)
 
-        try:
-            i = 0
-            while True:
-                message = consumer.poll(0.1)
-                if message is None:
-                    continue
+        def poll(timeout):
+            """
+            Returns the next message of an owned partition, or `None`.
+            """
+            message = consumer.poll(timeout)
+            if message is None:
+                return None
 
-                error = message.error()
-                if error is not None:
-                    raise Exception(error)
+            error = message.error()
+            if error is not None:
+                raise Exception(error)
 
-                key = (message.topic(), message.partition())
-                if key not in owned_partition_offsets:
-                    logger.warning("Skipping message for unowned partition: %r", key)
-                    continue
+            key = (message.topic(), message.partition())
+            if key not in owned_partition_offsets:
+                logger.warning("Skipping message for unowned partition: %r", key)
+                return None
 
-                i = i + 1
-                owned_partition_offsets[key] = message.offset() + 1
+            owned_partition_offsets[key] = message.offset() + 1
+            return message
 
-                with metrics.timer("eventstream.duration", instance="get_task_kwargs_for_message"):
-                    task_kwargs = get_task_kwargs_for_message(message.value())
+        try:
+            if batch_timeout is None:
+                i = 0
+                while True:
+                    message = poll(0.1)
+                    if message is None:
+                        continue
+
+                    i = i + 1
 
-                if task_kwargs is not None:
                     with metrics.timer(
-                        "eventstream.duration", instance="dispatch_post_process_group_task"
+                        "eventstream.duration", instance="get_task_kwargs_for_message"
                     ):
-                        self._dispatch_post_process_group_task(**task_kwargs)
-
-                if i % commit_batch_size == 0:
-                    commit_offsets()
+                        task_kwargs = get_task_kwargs_for_message(message.value())
+
+                    if task_kwargs is not None:
+                        with metrics.timer(
+                            "eventstream.duration", instance="dispatch_post_process_group_task"
+                        ):
+                            self._dispatch_post_process_group_task(**task_kwargs)
+
+                    if i % commit_batch_size == 0:
+                        commit_offsets()
+            else:
+                while True:
+                    # Messages are still polled one at a time, so that the
+                    # consumer pauses as soon as it catches up with Snuba.
+                    deadline = time.time() + batch_timeout
+                    while len(pending_messages) < commit_batch_size:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+
+                        message = poll(min(remaining, 0.1))
+                        if message is not None:
+                            pending_messages.append(message)
+
+                    if pending_messages:
+                        dispatch_pending_messages()
+                        commit_offsets()
         except KeyboardInterrupt:
             pass
 
+        dispatch_pending_messages()
         logger.debug("Committing offsets and closing consumer...")
         commit_offsets()
 
@@ -18,6 +18,7 @@ from sentry.grouping.utils import (
     hash_from_values,
     resolve_fingerprint_values,
 )
+from sentry.utils.compat import functools
 
 
 HASH_RE = re.compile(r"^[0-9a-f]{32}$")
@@ -52,7 +53,13 @@ def _get_project_enhancements_config(project):
     enhancements_base = project.get_option(
         "sentry:grouping_enhancements_base", validate=lambda x: x in ENHANCEMENT_BASES
     )
+    return _get_enhancements_config(enhancements_base, enhancements)
 
+
+# The grouping caches below are per process and keyed by the contents of the
+# configuration, so they never need to be invalidated.
+@functools.lru_cache(maxsize=100)
+def _get_enhancements_config(enhancements_base, enhancements):
     # Instead of parsing and dumping out config here, we can make a
     # shortcut
     from sentry.utils.cache import cache
@@ -94,11 +101,16 @@ def load_grouping_config(config_dict=None):
         config_dict = get_default_grouping_config_dict()
     elif "id" not in config_dict:
         raise ValueError("Malformed configuration dictionary")
-    config_dict = dict(config_dict)
-    config_id = config_dict.pop("id")
+    config_id = config_dict["id"]
     if config_id not in CONFIGURATIONS:
         raise GroupingConfigNotFound(config_id)
-    return CONFIGURATIONS[config_id](**config_dict)
+    # Other keys of the dictionary are not used by any configuration.
+    return _load_grouping_config(config_id, config_dict.get("enhancements"))
+
+
+@functools.lru_cache(maxsize=100)
+def _load_grouping_config(config_id, enhancements):
+    return CONFIGURATIONS[config_id](enhancements=enhancements)
 
 
 def load_default_grouping_config():
@@ -106,12 +118,17 @@ def load_default_grouping_config():
 
 
 def get_fingerprinting_config_for_project(project):
-    from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
+    from sentry.grouping.fingerprinting import FingerprintingRules
 
     rules = project.get_option("sentry:fingerprinting_rules")
     if not rules:
         return FingerprintingRules([])
+    return _get_fingerprinting_config(rules)
+
 
+@functools.lru_cache(maxsize=100)
+def _get_fingerprinting_config(rules):
+    from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
     from sentry.utils.cache import cache
     from sentry.utils.hashlib import md5_text
 
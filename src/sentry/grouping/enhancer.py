@@ -7,7 +7,9 @@ import zlib
 import base64
 import msgpack
 import inspect
+import weakref
 
+from collections import defaultdict
 from parsimonious.grammar import Grammar, NodeVisitor
 from parsimonious.exceptions import ParseError
 
@@ -88,6 +90,14 @@ ACTION_FLAGS = {
 }
 REVERSE_ACTION_FLAGS = dict((v, k) for k, v in six.iteritems(ACTION_FLAGS))
 
+# The frame values that matchers (other than ``app``) look at, in the order
+# they make up the key of the per-frame match cache.
+FRAME_VALUE_KEYS = ("family", "path", "package", "function", "module")
+
+# Maximum number of distinct frames whose matching rules are memoized per
+# `Enhancements` instance.
+MAX_MATCH_CACHE_SIZE = 5000
+
 
 class InvalidEnhancerConfig(Exception):
     pass
@@ -106,12 +116,21 @@ class Match(object):
         )
 
     def matches_frame(self, frame_data, platform):
+        # in-app matching is just a bool
+        if self.key == "app":
+            return self.matches_app(frame_data)
+        return self.matches_value(get_frame_value(self.key, frame_data, platform))
+
+    def matches_app(self, frame_data):
+        ref_val = get_rule_bool(self.pattern)
+        return ref_val is not None and ref_val == frame_data.get("in_app")
+
+    def matches_value(self, value):
+        """Matches the frame value for this matcher's key as returned by
+        `get_frame_value`.
+        """
         # Path matches are always case insensitive
         if self.key in ("path", "package"):
-            if self.key == "package":
-                value = frame_data.get("package") or ""
-            else:
-                value = frame_data.get("abs_path") or frame_data.get("filename") or ""
             if glob_match(
                 value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True
             ):
@@ -125,28 +144,19 @@ class Match(object):
         # families need custom handling as well
         if self.key == "family":
             flags = self.pattern.split(",")
-            if "all" in flags:
-                return True
-            family = get_behavior_family_for_platform(frame_data.get("platform") or platform)
-            return family in flags
-
-        # in-app matching is just a bool
-        if self.key == "app":
-            ref_val = get_rule_bool(self.pattern)
-            return ref_val is not None and ref_val == frame_data.get("in_app")
+            return "all" in flags or value in flags
 
         # all other matches are case sensitive
-        if self.key == "function":
-            from sentry.stacktraces.functions import get_function_name_for_frame
-
-            value = get_function_name_for_frame(frame_data, platform) or "<unknown>"
-        elif self.key == "module":
-            value = frame_data.get("module") or "<unknown>"
-        else:
-            # should not happen :)
-            value = "<unknown>"
         return glob_match(value, self.pattern)
 
+    @property
+    def families(self):
+        """The families a ``family`` matcher accepts, or `None` for all."""
+        flags = self.pattern.split(",")
+        if "all" in flags:
+            return None
+        return frozenset(flags)
+
     def _to_config_structure(self):
         if self.key == "family":
             arg = "".join([_f for _f in [FAMILIES.get(x) for x in self.pattern.split(",")] if _f])
@@ -166,6 +176,24 @@ class Match(object):
         return cls(key, arg)
 
 
+def get_frame_value(key, frame_data, platform):
+    """Returns the value of a frame that matchers of ``key`` look at."""
+    if key == "path":
+        return frame_data.get("abs_path") or frame_data.get("filename") or ""
+    if key == "package":
+        return frame_data.get("package") or ""
+    if key == "family":
+        return get_behavior_family_for_platform(frame_data.get("platform") or platform)
+    if key == "function":
+        from sentry.stacktraces.functions import get_function_name_for_frame
+
+        return get_function_name_for_frame(frame_data, platform) or "<unknown>"
+    if key == "module":
+        return frame_data.get("module") or "<unknown>"
+    # should not happen :)
+    return "<unknown>"
+
+
 class Action(object):
     def apply_modifications_to_frame(self, frames, idx):
         pass
@@ -292,6 +320,11 @@ class StacktraceState(object):
         return "%s by grouping enhancement rule (%s)" % (hint, description)
 
 
+# Matchers are kept out of the instance so that they do not show up in its
+# ``__dict__``, which is what gets serialized and snapshotted.
+_matchers = weakref.WeakKeyDictionary()
+
+
 class Enhancements(object):
     def __init__(self, rules, changelog=None, version=None, bases=None, id=None):
         self.id = id
@@ -304,26 +337,28 @@ class Enhancements(object):
             bases = []
         self.bases = bases
 
+    def _iter_matching_frames(self, frames, platform):
+        matcher = _matchers.get(self)
+        if matcher is None:
+            matcher = _matchers[self] = EnhancementsMatcher(list(self.iter_rules()))
+        return matcher.iter_matching_frames(frames, platform)
+
     def apply_modifications_to_frame(self, frames, platform):
         """This applies the frame modifications to the frames itself.  This
         does not affect grouping.
         """
-        for rule in self.iter_rules():
-            for idx, frame in enumerate(frames):
-                actions = rule.get_matching_frame_actions(frame, platform)
-                for action in actions or ():
-                    action.apply_modifications_to_frame(frames, idx)
+        for rule, idx in self._iter_matching_frames(frames, platform):
+            for action in rule.actions:
+                action.apply_modifications_to_frame(frames, idx)
 
     def update_frame_components_contributions(self, components, frames, platform):
         stacktrace_state = StacktraceState()
 
         # Apply direct frame actions and update the stack state alongside
-        for rule in self.iter_rules():
-            for idx, (component, frame) in enumerate(zip(components, frames)):
-                actions = rule.get_matching_frame_actions(frame, platform)
-                for action in actions or ():
-                    action.update_frame_components_contributions(components, frames, idx, rule=rule)
-                    action.modify_stacktrace_state(stacktrace_state, rule)
+        for rule, idx in self._iter_matching_frames(frames[: len(components)], platform):
+            for action in rule.actions:
+                action.update_frame_components_contributions(components, frames, idx, rule=rule)
+                action.modify_stacktrace_state(stacktrace_state, rule)
 
         # Use the stack state to update frame contributions again to trim
         # down to max-frames.  min-frames is handled on the other hand for
@@ -440,11 +475,84 @@ class Enhancements(object):
         return EnhancmentsVisitor(bases, id).visit(tree)
 
 
+class EnhancementsMatcher(object):
+    """Matches a list of rules against frames.
+
+    Rules are first narrowed down by the family of the frame, and the rules
+    matching a frame are memoized by the frame values the matchers look at,
+    so every distinct frame is matched against the rules only once.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._rules_by_family = {}
+        self._match_cache = {}
+
+    def _get_rules_for_family(self, family):
+        """Returns the indexes of all rules that can match frames of the
+        given family.
+        """
+        rv = self._rules_by_family.get(family)
+        if rv is None:
+            rv = self._rules_by_family[family] = [
+                idx
+                for idx, rule in enumerate(self.rules)
+                if rule.matchers and (rule.families is None or family in rule.families)
+            ]
+        return rv
+
+    def get_matching_rules(self, frame, platform):
+        """Returns the indexes of all rules whose matchers match the frame,
+        ignoring ``app`` matchers as the in-app flag changes while the rules
+        are applied.
+        """
+        values = tuple(get_frame_value(key, frame, platform) for key in FRAME_VALUE_KEYS)
+        rv = self._match_cache.get(values)
+        if rv is None:
+            frame_values = dict(zip(FRAME_VALUE_KEYS, values))
+            rv = tuple(
+                idx
+                for idx in self._get_rules_for_family(frame_values["family"])
+                if self.rules[idx].matches_frame_values(frame_values)
+            )
+            if len(self._match_cache) >= MAX_MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[values] = rv
+        return rv
+
+    def iter_matching_frames(self, frames, platform):
+        """Yields ``(rule, frame index)`` for every rule that matches a frame,
+        in the order the rules are defined.  This is equivalent to matching
+        every rule against every frame.
+        """
+        frames_by_rule = defaultdict(list)
+        for idx, frame in enumerate(frames):
+            for rule_idx in self.get_matching_rules(frame, platform):
+                frames_by_rule[rule_idx].append(idx)
+
+        for rule_idx in sorted(frames_by_rule):
+            rule = self.rules[rule_idx]
+            for idx in frames_by_rule[rule_idx]:
+                # Actions of previous rules may have changed the in-app flag,
+                # so this needs to be checked lazily.
+                if rule.matches_app(frames[idx]):
+                    yield rule, idx
+
+
 class Rule(object):
     def __init__(self, matchers, actions):
         self.matchers = matchers
         self.actions = actions
 
+    @property
+    def families(self):
+        """The families this rule can match, or `None` for all."""
+        rv = None
+        for matcher in self.matchers:
+            if matcher.key == "family" and matcher.families is not None:
+                rv = matcher.families if rv is None else rv & matcher.families
+        return rv
+
     @property
     def matcher_description(self):
         rv = " ".join(x.description for x in self.matchers)
@@ -465,6 +573,19 @@ class Rule(object):
         if self.matchers and all(m.matches_frame(frame_data, platform) for m in self.matchers):
             return self.actions
 
+    def matches_frame_values(self, frame_values):
+        """Checks all matchers except ``app`` and ``family`` matchers against
+        frame values as returned by `get_frame_value`.
+        """
+        return all(
+            m.matches_value(frame_values[m.key])
+            for m in self.matchers
+            if m.key not in ("app", "family")
+        )
+
+    def matches_app(self, frame_data):
+        return all(m.matches_app(frame_data) for m in self.matchers if m.key == "app")
+
     def _to_config_structure(self):
         return [
             [x._to_config_structure() for x in self.matchers],
@@ -0,0 +1,366 @@
+"""
+A benchmark harness for the ingest consumer.
+
+The harness runs the real `IngestConsumerWorker` inside a
+`BatchingKafkaConsumer` whose Kafka consumer is replaced with an in-process
+stand-in that serves pre-generated, msgpack encoded messages. It reports the
+consumer throughput, the batch flush latency and the timings of all
+``metrics.timer`` (and ``metrics.timing``) calls made while the benchmark
+was running.
+
+Timings of work done in worker processes (``use_processes=True``) are not
+reported, as they are recorded in the metrics backend of those processes.
+"""
+
+from __future__ import absolute_import
+
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+
+import msgpack
+import six
+
+from sentry.metrics.base import MetricsBackend
+from sentry.utils import json, metrics
+from sentry.utils.batching_kafka_consumer import BatchingKafkaConsumer
+
+# The relative frequency of the message types that are generated by default.
+DEFAULT_MESSAGE_MIX = {"event": 80, "transaction": 10, "attachment": 5, "user_report": 5}
+
+
+class FakeMessage(object):
+    """
+    Implements the parts of ``confluent_kafka.Message`` used by the consumer.
+    """
+
+    def __init__(self, topic, partition, offset, value, key=None):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._value = value
+        self._key = key
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def error(self):
+        return None
+
+
+class FakeConsumer(object):
+    """
+    Implements the parts of ``confluent_kafka.Consumer`` used by the
+    `BatchingKafkaConsumer`, serving messages from a list.
+
+    ``on_exhausted`` is called once all messages have been polled.
+    """
+
+    def __init__(self, messages, on_exhausted=None):
+        self.messages = iter(messages)
+        self.on_exhausted = on_exhausted
+        self.commits = 0
+
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        pass
+
+    def poll(self, timeout=None):
+        try:
+            return next(self.messages)
+        except StopIteration:
+            if self.on_exhausted is not None:
+                self.on_exhausted()
+            return None
+
+    def commit(self, asynchronous=True):
+        self.commits += 1
+        return []
+
+    def close(self):
+        pass
+
+
+class BenchmarkConsumer(BatchingKafkaConsumer):
+    def __init__(self, messages, *args, **kwargs):
+        self.__messages = messages
+        super(BenchmarkConsumer, self).__init__(*args, **kwargs)
+
+    def create_consumer(self, topics, *args, **kwargs):
+        def on_exhausted():
+            # Flush the last (partial) batch before shutting down, as the
+            # consumer would otherwise drop it.
+            self._flush(force=True)
+            self.signal_shutdown()
+
+        return FakeConsumer(self.__messages, on_exhausted=on_exhausted)
+
+
+class TimingRecorder(object):
+    def __init__(self):
+        self.timings = defaultdict(list)
+        # Keys whose values are durations in milliseconds. All other values
+        # passed to `metrics.timing` (e.g. batch sizes) are recorded as is.
+        self.durations = set()
+        self.lock = threading.Lock()
+
+    def add(self, key, value):
+        with self.lock:
+            self.timings[key].append(value)
+
+    def add_duration_key(self, key):
+        with self.lock:
+            self.durations.add(key)
+
+
+class RecordingMetricsBackend(MetricsBackend):
+    """
+    Records all timings into a `TimingRecorder` and forwards everything to
+    the ``wrapped`` backend. Durations measured by `metrics.timer` are
+    recorded in milliseconds, all other values unchanged.
+    """
+
+    def __init__(self, recorder, wrapped, prefix=None):
+        # The backend is thread local, so the recorder is passed in to share
+        # it between all threads.
+        super(RecordingMetricsBackend, self).__init__(prefix=prefix)
+        self.recorder = recorder
+        self.wrapped = wrapped
+
+    def incr(self, key, instance=None, tags=None, amount=1, sample_rate=1):
+        self.wrapped.incr(key, instance, tags, amount, sample_rate)
+
+    def timing(self, key, value, instance=None, tags=None, sample_rate=1):
+        if key in self.recorder.durations:
+            self.recorder.add(key, value * 1000)
+        else:
+            self.recorder.add(key, value)
+        self.wrapped.timing(key, value, instance, tags, sample_rate)
+
+
+class ConsumerMetrics(object):
+    """
+    The metrics object passed to the `BatchingKafkaConsumer`, which already
+    reports milliseconds.
+    """
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    def timing(self, metric, value, tags=None, sample_rate=1):
+        key = "consumer.%s" % (metric,)
+        self.recorder.add_duration_key(key)
+        self.recorder.add(key, value)
+
+
+@contextmanager
+def record_timings():
+    recorder = TimingRecorder()
+    backend = metrics.backend
+    timer = metrics.timer
+
+    def recording_timer(key, *args, **kwargs):
+        recorder.add_duration_key(key)
+        return timer(key, *args, **kwargs)
+
+    metrics.backend = RecordingMetricsBackend(recorder, backend)
+    metrics.timer = recording_timer
+    try:
+        yield recorder
+    finally:
+        metrics.backend = backend
+        metrics.timer = timer
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+TimingSummary = namedtuple("TimingSummary", "count total p50 p99 unit")
+
+BenchmarkResult = namedtuple(
+    "BenchmarkResult", "messages duration throughput flush_p50 flush_p99 batches timings"
+)
+
+
+def summarize(values, unit=None):
+    return TimingSummary(
+        len(values), sum(values), percentile(values, 50), percentile(values, 99), unit
+    )
+
+
+def generate_messages(count, project_ids, mix=None, topic="ingest-events", partitions=1, seed=None):
+    """
+    Generates ``count`` msgpack encoded messages in the format produced by
+    Relay, choosing the message types according to ``mix``.
+
+    Attachments are generated as an ``attachment`` message preceded by its
+    ``attachment_chunk`` messages, which count as a single message.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MESSAGE_MIX
+    types = sorted(mix)
+    weights = [mix[t] for t in types]
+
+    def choose_type():
+        value = rng.uniform(0, sum(weights))
+        for message_type, weight in zip(types, weights):
+            value -= weight
+            if value <= 0:
+                return message_type
+        return types[-1]
+
+    messages = []
+    for _ in range(count):
+        message_type = choose_type()
+        project_id = rng.choice(project_ids)
+        event_id = uuid.UUID(int=rng.getrandbits(128)).hex
+        start_time = time.time()
+
+        if message_type == "event":
+            messages.append(
+                {
+                    "type": "event",
+                    "event_id": event_id,
+                    "project_id": project_id,
+                    "start_time": start_time,
+                    "remote_addr": "127.0.0.1",
+                    "payload": json.dumps(
+                        {
+                            "event_id": event_id,
+                            "platform": "python",
+                            "message": "benchmark event %d" % rng.randint(0, 100),
+                            "level": "error",
+                            "timestamp": start_time,
+                        }
+                    ),
+                }
+            )
+        elif message_type == "transaction":
+            messages.append(
+                {
+                    "type": "transaction",
+                    "event_id": event_id,
+                    "project_id": project_id,
+                    "start_time": start_time,
+                    "payload": json.dumps(
+                        {
+                            "event_id": event_id,
+                            "type": "transaction",
+                            "transaction": "/benchmark/%d" % rng.randint(0, 10),
+                            "start_timestamp": start_time - 1,
+                            "timestamp": start_time,
+                            "contexts": {
+                                "trace": {
+                                    "trace_id": uuid.UUID(int=rng.getrandbits(128)).hex,
+                                    "span_id": "%016x" % rng.getrandbits(64),
+                                }
+                            },
+                            "spans": [],
+                        }
+                    ),
+                }
+            )
+        elif message_type == "attachment":
+            attachment_id = six.text_type(uuid.UUID(int=rng.getrandbits(128)))
+            chunks = [b"x" * 1024 for _ in range(rng.randint(1, 4))]
+            for index, chunk in enumerate(chunks):
+                messages.append(
+                    {
+                        "type": "attachment_chunk",
+                        "payload": chunk,
+                        "event_id": event_id,
+                        "project_id": project_id,
+                        "id": attachment_id,
+                        "chunk_index": index,
+                    }
+                )
+            messages.append(
+                {
+                    "type": "attachment",
+                    "attachment": {
+                        "attachment_type": "event.attachment",
+                        "chunks": len(chunks),
+                        "content_type": "application/octet-stream",
+                        "id": attachment_id,
+                        "name": "benchmark.txt",
+                    },
+                    "event_id": event_id,
+                    "project_id": project_id,
+                }
+            )
+        elif message_type == "user_report":
+            messages.append(
+                {
+                    "type": "user_report",
+                    "start_time": start_time,
+                    "project_id": project_id,
+                    "payload": json.dumps(
+                        {
+                            "event_id": event_id,
+                            "name": "Benchmark",
+                            "email": "benchmark@example.com",
+                            "comments": "benchmark",
+                        }
+                    ),
+                }
+            )
+        else:
+            raise ValueError("Unknown message type: {}".format(message_type))
+
+    return [
+        FakeMessage(topic, offset % partitions, offset, msgpack.packb(message))
+        for offset, message in enumerate(messages)
+    ]
+
+
+def run_benchmark(messages, worker, max_batch_size=100, max_batch_time=1000):
+    """
+    Consumes ``messages`` with ``worker`` and returns a `BenchmarkResult`.
+    """
+    with record_timings() as recorder:
+        consumer = BenchmarkConsumer(
+            messages,
+            topics=sorted(set(message.topic() for message in messages)),
+            worker=worker,
+            max_batch_size=max_batch_size,
+            max_batch_time=max_batch_time,
+            bootstrap_servers=[],
+            group_id="ingest-benchmark",
+            metrics=ConsumerMetrics(recorder),
+        )
+
+        start = time.time()
+        consumer.run()
+        duration = time.time() - start
+
+    flushes = recorder.timings.get("consumer.batch.flush", [])
+    return BenchmarkResult(
+        messages=len(messages),
+        duration=duration,
+        throughput=len(messages) / duration if duration else None,
+        flush_p50=percentile(flushes, 50),
+        flush_p99=percentile(flushes, 99),
+        batches=len(flushes),
+        timings={
+            key: summarize(values, "ms" if key in recorder.durations else None)
+            for key, values in six.iteritems(recorder.timings)
+        },
+    )
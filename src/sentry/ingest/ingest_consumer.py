@@ -1,14 +1,17 @@
 from __future__ import absolute_import
 
 import atexit
+import functools
 import logging
 import msgpack
+import signal
 from six import BytesIO
 
 import multiprocessing.dummy
 import multiprocessing as _multiprocessing
 
 from django.core.cache import cache
+from django.db import connections
 
 from sentry import eventstore, features, options
 from sentry.cache import default_cache
@@ -31,9 +34,29 @@ logger = logging.getLogger(__name__)
 CACHE_TIMEOUT = 3600
 
 
+def _init_worker_process():
+    # Leave shutdown to the parent process: it receives SIGINT as well and
+    # closes the pool once the current batch has been flushed.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _call_with_projects(args, projects):
+    func, message = args
+    return func(message, projects=projects)
+
+
 class IngestConsumerWorker(AbstractBatchWorker):
-    def __init__(self, concurrency):
-        self.pool = _multiprocessing.dummy.Pool(concurrency)
+    def __init__(self, concurrency, use_processes=False):
+        self.use_processes = use_processes
+
+        if use_processes:
+            # Forked children must not share the parent's database sockets,
+            # every process opens its own connections lazily instead.
+            connections.close_all()
+            self.pool = _multiprocessing.Pool(concurrency, initializer=_init_worker_process)
+        else:
+            self.pool = _multiprocessing.dummy.Pool(concurrency)
+
         atexit.register(self.pool.close)
 
     def process_message(self, message):
@@ -68,28 +91,34 @@ class IngestConsumerWorker(AbstractBatchWorker):
         with metrics.timer("ingest_consumer.fetch_projects"):
             projects = {p.id: p for p in Project.objects.get_many_from_cache(projects_to_fetch)}
 
+        # Only the process pool needs a picklable callable, so bind the
+        # projects with `functools.partial` rather than a lambda.
+        call = functools.partial(_call_with_projects, projects=projects)
+
         if attachment_chunks:
             # attachment_chunk messages need to be processed before attachment/event messages.
             with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
                 for _ in self.pool.imap_unordered(
-                    lambda msg: process_attachment_chunk(msg, projects=projects),
-                    attachment_chunks,
+                    call,
+                    [(process_attachment_chunk, msg) for msg in attachment_chunks],
                     chunksize=100,
                 ):
                     pass
 
         if other_messages:
             with metrics.timer("ingest_consumer.process_other_messages_batch"):
-                for _ in self.pool.imap_unordered(
-                    lambda args: args[0](args[1], projects=projects), other_messages, chunksize=100
-                ):
+                for _ in self.pool.imap_unordered(call, other_messages, chunksize=100):
                     pass
 
         if transactions:
             process_transactions_batch(transactions, projects)
 
     def shutdown(self):
-        pass
+        if self.use_processes:
+            # Wait for in-flight work so that no message is handled after the
+            # consumer has given up its partitions.
+            self.pool.close()
+            self.pool.join()
 
 
 @metrics.wraps("ingest_consumer.process_transactions_batch")
@@ -261,15 +290,23 @@ def process_userreport(message, projects):
         return False
 
 
-def get_ingest_consumer(consumer_types, once=False, concurrency=None, **options):
+def get_ingest_consumer(
+    consumer_types, once=False, concurrency=None, use_processes=False, **options
+):
     """
     Handles events coming via a kafka queue.
 
     The events should have already been processed (normalized... ) upstream (by Relay).
+
+    With ``use_processes`` the messages of a batch are handled by a pool of
+    ``concurrency`` worker processes instead of threads. Offsets are still
+    only committed once the whole batch has been flushed.
     """
     topic_names = set(
         ConsumerType.get_topic_name(consumer_type) for consumer_type in consumer_types
     )
     return create_batching_kafka_consumer(
-        topic_names=topic_names, worker=IngestConsumerWorker(concurrency=concurrency), **options
+        topic_names=topic_names,
+        worker=IngestConsumerWorker(concurrency=concurrency, use_processes=use_processes),
+        **options
     )
@@ -1,10 +1,15 @@
 from __future__ import absolute_import, print_function
 
+import threading
+
+from operator import itemgetter
 from six import text_type
 from symbolic import SourceView
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "SourceMapViewCache"]
 
 
 def is_utf8(codec):
@@ -84,3 +89,64 @@ class SourceMapCache(object):
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class SourceMapViewCache(object):
+    """
+    A per-process LRU cache of parsed sourcemaps that outlives a single
+    event, bounded by the total size of the raw sourcemaps in bytes.
+
+    Keys must include a checksum of the raw sourcemap, so that a changed
+    artifact is never answered with a stale view. Views are immutable and
+    can be shared between events and threads.
+    """
+
+    def __init__(self, max_size):
+        # Items are `(sourcemap_view, size)` tuples.
+        self._items = LRUCache(max_size, get_size=itemgetter(1))
+
+    @property
+    def size(self):
+        return self._items.size
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            metrics.incr("sourcemaps.view_cache.miss", skip_internal=True)
+            return None
+
+        metrics.incr("sourcemaps.view_cache.hit", skip_internal=True)
+        return item[0]
+
+    def set(self, key, sourcemap_view, size):
+        evicted = self._items.set(key, (sourcemap_view, size))
+        if evicted:
+            metrics.incr("sourcemaps.view_cache.evicted", amount=evicted, skip_internal=True)
+
+    def clear(self):
+        self._items.clear()
+
+
+_sourcemap_view_cache = None
+_sourcemap_view_cache_lock = threading.Lock()
+
+
+def get_sourcemap_view_cache():
+    """
+    Returns the process wide `SourceMapViewCache`, or `None` if it is
+    disabled through ``SENTRY_SOURCEMAP_VIEW_CACHE_SIZE``.
+    """
+    global _sourcemap_view_cache
+
+    if _sourcemap_view_cache is None:
+        from django.conf import settings
+
+        max_size = settings.SENTRY_SOURCEMAP_VIEW_CACHE_SIZE
+        if not max_size:
+            return None
+
+        with _sourcemap_view_cache_lock:
+            if _sourcemap_view_cache is None:
+                _sourcemap_view_cache = SourceMapViewCache(max_size)
+
+    return _sourcemap_view_cache
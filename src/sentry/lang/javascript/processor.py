@@ -6,6 +6,7 @@ import logging
 import re
 import sys
 import base64
+import hashlib
 import six
 import zlib
 
@@ -36,7 +37,7 @@ from sentry.utils import metrics
 from sentry.utils.urls import non_standard_url_join
 from sentry.stacktraces.processing import StacktraceProcessor
 
-from .cache import SourceCache, SourceMapCache
+from .cache import SourceCache, SourceMapCache, get_sourcemap_view_cache
 
 # number of surrounding lines (on each side) to fetch
 LINES_OF_CONTEXT = 5
@@ -403,13 +404,31 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             url, project=project, release=release, dist=dist, allow_scraping=allow_scraping
         )
         body = result.body
+
+    view_cache = get_sourcemap_view_cache()
+    if view_cache is not None:
+        cache_key = (
+            release.id if release else None,
+            dist.name if dist else None,
+            None if is_data_uri(url) else url,
+            hashlib.sha1(body).hexdigest(),
+        )
+        sourcemap_view = view_cache.get(cache_key)
+        if sourcemap_view is not None:
+            return sourcemap_view
+
     try:
-        return SourceMapView.from_json_bytes(body)
+        with metrics.timer("sourcemaps.parse"):
+            sourcemap_view = SourceMapView.from_json_bytes(body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(six.text_type(exc), exc_info=True)
         raise UnparseableSourcemap({"url": http.expose_url(url)})
 
+    if view_cache is not None:
+        view_cache.set(cache_key, sourcemap_view, len(body))
+    return sourcemap_view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import time
+
 from django.core.signals import request_finished
 
 from sentry.app import env
@@ -9,6 +11,9 @@ class SentryEnvMiddleware(object):
     def process_request(self, request):
         # bind request to env
         env.request = request
+        # request deadlines (see `sentry.utils.snuba.get_request_deadline`)
+        # are measured from here
+        request._request_start_time = time.time()
 
 
 def clear_request(**kwargs):
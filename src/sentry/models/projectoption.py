@@ -1,5 +1,7 @@
 from __future__ import absolute_import, print_function
 
+import six
+
 from django.db import models
 
 from sentry import projectoptions
@@ -54,6 +56,46 @@ class ProjectOptionManager(OptionManager):
                 self._option_cache[cache_key] = result
         return self._option_cache.get(cache_key, {})
 
+    def get_all_values_bulk(self, projects):
+        """
+        Returns the options of many projects keyed by project id. Options that
+        are not cached are loaded with a single cache lookup and a single
+        query.
+        """
+        project_ids = [
+            project.id if isinstance(project, models.Model) else project for project in projects
+        ]
+        missing = [
+            self._make_key(project_id)
+            for project_id in project_ids
+            if self._make_key(project_id) not in self._option_cache
+        ]
+
+        if missing:
+            cached = cache.get_many(missing)
+            self._option_cache.update(cached)
+
+            uncached_ids = [
+                project_id
+                for project_id in project_ids
+                if self._make_key(project_id) not in self._option_cache
+            ]
+            if uncached_ids:
+                results = {project_id: {} for project_id in uncached_ids}
+                for option in self.filter(project__in=uncached_ids):
+                    results[option.project_id][option.key] = option.value
+                results = {
+                    self._make_key(project_id): result
+                    for project_id, result in six.iteritems(results)
+                }
+                cache.set_many(results)
+                self._option_cache.update(results)
+
+        return {
+            project_id: self._option_cache.get(self._make_key(project_id), {})
+            for project_id in project_ids
+        }
+
     def reload_cache(self, project_id, update_reason):
         schedule_update_config_cache(
             project_id=project_id, generate=True, update_reason=update_reason
@@ -10,7 +10,7 @@ from django.utils import timezone
 
 from sentry.db.models import Model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
-from sentry.ownership.grammar import load_schema
+from sentry.ownership.grammar import load_compiled_schema
 from sentry.utils.cache import cache
 from functools import reduce
 
@@ -128,13 +128,14 @@ class ProjectOwnership(Model):
 
     @classmethod
     def _matching_ownership_rules(cls, ownership, project_id, data):
-        rules = []
-        if ownership.schema is not None:
-            for rule in load_schema(ownership.schema):
-                if rule.test(data):
-                    rules.append(rule)
-
-        return rules
+        if ownership.schema is None:
+            return []
+        # Saved rules are versioned by their last update, which avoids
+        # serializing the schema for every event.
+        version = None
+        if ownership.id is not None:
+            version = (ownership.id, ownership.last_updated)
+        return load_compiled_schema(ownership.schema, version=version).test(data)
 
 
 def resolve_actors(owners, project_id):
@@ -8,6 +8,7 @@ from uuid import uuid4
 
 from django.core.cache import caches, InvalidCacheBackendError
 
+from sentry.nodestore.localcache import get_local_cache
 from sentry.utils.cache import memoize
 from sentry.utils.services import Service
 
@@ -95,28 +96,66 @@ class NodeStorage(local, Service):
         raise NotImplementedError
 
     def _get_cache_item(self, id):
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            data = local_cache.get(id)
+            if data is not None:
+                return data
+
         if self.cache:
-            return self.cache.get(id)
+            data = self.cache.get(id)
+            if local_cache is not None and data:
+                local_cache.set(id, data)
+            return data
 
     def _get_cache_items(self, id_list):
+        items = {}
+
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            items = local_cache.get_many(id_list)
+            if len(items) == len(id_list):
+                return items
+
         if self.cache:
-            return self.cache.get_many(id_list)
-        return {}
+            cache_items = self.cache.get_many([id for id in id_list if id not in items])
+            if local_cache is not None:
+                local_cache.set_many(cache_items)
+            items.update(cache_items)
+
+        return items
 
     def _set_cache_item(self, id, data):
+        local_cache = get_local_cache()
+        if local_cache is not None and data:
+            local_cache.set(id, data)
+
         if self.cache and data:
             self.cache.set(id, data)
 
     def _set_cache_items(self, items):
         cacheable_items = {k: v for k, v in six.iteritems(items) if v}
+
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.set_many(cacheable_items)
+
         if self.cache:
             self.cache.set_many(cacheable_items)
 
     def _delete_cache_item(self, id):
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.delete(id)
+
         if self.cache:
             self.cache.delete(id)
 
     def _delete_cache_items(self, id_list):
+        local_cache = get_local_cache()
+        if local_cache is not None:
+            local_cache.delete_many(id_list)
+
         if self.cache:
             self.cache.delete_many(id_list)
 
@@ -0,0 +1,161 @@
+"""
+Codecs for the node data stored by the Django node storage.
+
+Values written by the default ``zlib`` codec are a base64 encoded, zlib
+compressed pickle without any header, which is the format of
+`GzippedDictField`. All other codecs prefix the value with a header that
+names the codec (including its version) and the compression dictionary:
+
+    $<codec id>$<dictionary id>$<base64 payload>
+
+Base64 never contains ``$``, so values without a header can always be read
+as legacy values.
+"""
+
+from __future__ import absolute_import
+
+import base64
+import six
+
+from sentry.exceptions import InvalidConfiguration
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress, decompress
+
+try:
+    import zstandard
+
+    has_zstandard = True
+except ImportError:
+    has_zstandard = False
+
+HEADER_MARKER = u"$"
+
+# Compression dictionaries by id, needed to decode values that were
+# compressed with a dictionary.
+_dictionaries = {}
+
+
+class NodeCodec(object):
+    id = None
+
+    def encode(self, data):
+        """
+        Returns the text that should be stored for ``data``.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def decode_payload(cls, dictionary_id, payload):
+        """
+        Decodes the payload of a value that was written by this codec.
+        """
+        raise NotImplementedError
+
+
+class ZlibCodec(NodeCodec):
+    """
+    The legacy format, a zlib compressed pickle.
+    """
+
+    id = "zlib"
+
+    def encode(self, data):
+        return compress(pickle.dumps(data))
+
+    @classmethod
+    def decode_payload(cls, dictionary_id, payload):
+        return pickle.loads(decompress(payload))
+
+
+class ZstdCodec(NodeCodec):
+    """
+    Zstandard compressed pickles, optionally with a compression dictionary
+    per platform.
+
+    ``dictionaries`` maps platforms to files with dictionaries as written by
+    ``sentry nodestore train-dictionary``.
+    """
+
+    id = "zstd1"
+
+    def __init__(self, level=3, dictionaries=None):
+        if not has_zstandard:
+            raise InvalidConfiguration("The zstd codec requires the zstandard package.")
+
+        self.level = level
+        self.dictionaries = {
+            platform: load_dictionary(path) for platform, path in six.iteritems(dictionaries or {})
+        }
+
+    def encode(self, data):
+        dictionary = self.dictionaries.get(data.get("platform"))
+        compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+        payload = compressor.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+        return u"{marker}{codec}{marker}{dictionary}{marker}{payload}".format(
+            marker=HEADER_MARKER,
+            codec=self.id,
+            dictionary=dictionary.dict_id() if dictionary is not None else u"",
+            payload=base64.b64encode(payload).decode("utf-8"),
+        )
+
+    @classmethod
+    def decode_payload(cls, dictionary_id, payload):
+        if not has_zstandard:
+            raise InvalidConfiguration("The zstd codec requires the zstandard package.")
+
+        dictionary = None
+        if dictionary_id:
+            try:
+                dictionary = _dictionaries[dictionary_id]
+            except KeyError:
+                raise ValueError("Unknown compression dictionary: %s" % (dictionary_id,))
+
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return pickle.loads(decompressor.decompress(base64.b64decode(payload)))
+
+
+CODECS = {"zlib": ZlibCodec, "zstd": ZstdCodec}
+
+_codecs_by_id = {codec.id: codec for codec in six.itervalues(CODECS)}
+
+
+def get_codec(name, **options):
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise InvalidConfiguration("Unknown nodestore codec: %s" % (name,))
+    return codec(**options)
+
+
+def load_dictionary(path):
+    with open(path, "rb") as f:
+        dictionary = zstandard.ZstdCompressionDict(f.read())
+
+    _dictionaries[six.text_type(dictionary.dict_id())] = dictionary
+    return dictionary
+
+
+def get_header(value):
+    """
+    Returns the ``(codec id, dictionary id)`` of a stored value.
+    """
+    if not value.startswith(HEADER_MARKER):
+        return ZlibCodec.id, u""
+
+    _, codec_id, dictionary_id, _ = value.split(HEADER_MARKER, 3)
+    return codec_id, dictionary_id
+
+
+def decode(value):
+    if not value.startswith(HEADER_MARKER):
+        return ZlibCodec.decode_payload(u"", value)
+
+    _, codec_id, dictionary_id, payload = value.split(HEADER_MARKER, 3)
+
+    try:
+        codec = _codecs_by_id[codec_id]
+    except KeyError:
+        raise ValueError("Unknown nodestore codec: %s" % (codec_id,))
+
+    return codec.decode_payload(dictionary_id, payload)
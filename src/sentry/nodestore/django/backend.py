@@ -2,15 +2,38 @@ from __future__ import absolute_import
 
 import math
 
+from django.db.models import Value
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import get_codec
 
 from .models import Node
 
 
 class DjangoNodeStorage(NodeStorage):
+    """
+    A node storage backed by the ``nodestore_node`` table.
+
+    >>> DjangoNodeStorage(
+    ...     codec='zstd',
+    ...     codec_options={'level': 3, 'dictionaries': {'python': '/path/to/python.dict'}},
+    ... )
+
+    The codec only affects how nodes are written, values written with any
+    codec can always be read. Use ``sentry nodestore reencode`` to rewrite
+    existing nodes after changing it.
+    """
+
+    def __init__(self, codec="zlib", codec_options=None):
+        self.codec = get_codec(codec, **(codec_options or {}))
+
+    def _encode(self, data):
+        # Pass the encoded value as an expression, so that the model field
+        # does not serialize it a second time.
+        return Value(self.codec.encode(data))
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
         self._delete_cache_item(id)
@@ -42,7 +65,9 @@ class DjangoNodeStorage(NodeStorage):
         self._delete_cache_items(id_list)
 
     def set(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": data, "timestamp": timezone.now()})
+        create_or_update(
+            Node, id=id, values={"data": self._encode(data), "timestamp": timezone.now()}
+        )
         self._set_cache_item(id, data)
 
     def cleanup(self, cutoff_timestamp):
@@ -1,9 +1,31 @@
 from __future__ import absolute_import
 
+import logging
+import six
+
 from django.db import models
 from django.utils import timezone
 
 from sentry.db.models import BaseModel, GzippedDictField, sane_repr
+from sentry.nodestore.codecs import HEADER_MARKER, decode
+
+logger = logging.getLogger("sentry")
+
+
+class NodeDataField(GzippedDictField):
+    """
+    A `GzippedDictField` that also reads values written by any of the codecs
+    in `sentry.nodestore.codecs`.
+    """
+
+    def to_python(self, value):
+        if isinstance(value, six.string_types) and value.startswith(HEADER_MARKER):
+            try:
+                return decode(value)
+            except Exception as e:
+                logger.exception(e)
+                return {}
+        return super(NodeDataField, self).to_python(value)
 
 
 class Node(BaseModel):
@@ -12,7 +34,7 @@ class Node(BaseModel):
     id = models.CharField(max_length=40, primary_key=True)
     # TODO(dcramer): this being pickle and not JSON has the ability to cause
     # hard errors as it accepts other serialization than native JSON
-    data = GzippedDictField()
+    data = NodeDataField()
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     __repr__ = sane_repr("timestamp")
@@ -0,0 +1,90 @@
+from __future__ import absolute_import
+
+import threading
+
+from sentry.utils import metrics
+from sentry.utils.compat import pickle
+from sentry.utils.lru import LRUCache
+
+
+class LocalNodeCache(object):
+    """
+    A per-process `LRUCache` for node data, bounded by the total size of the
+    cached payloads in bytes.
+
+    Values are stored pickled: this gives us their size for free and makes
+    sure callers never share (and mutate) the same dictionary. Entries expire
+    after ``ttl`` seconds, which bounds how long a node deleted or changed by
+    another process can be served from here.
+    """
+
+    def __init__(self, max_size, ttl):
+        self._items = LRUCache(max_size, ttl=ttl, get_size=len)
+
+    @property
+    def size(self):
+        return self._items.size
+
+    def get(self, id):
+        return self.get_many([id]).get(id)
+
+    def get_many(self, id_list):
+        payloads = self._items.get_many(id_list)
+
+        if payloads:
+            metrics.incr("nodestore.local_cache.hit", amount=len(payloads), skip_internal=True)
+        if len(payloads) < len(id_list):
+            metrics.incr(
+                "nodestore.local_cache.miss",
+                amount=len(id_list) - len(payloads),
+                skip_internal=True,
+            )
+
+        return {id: pickle.loads(payload) for id, payload in payloads.items()}
+
+    def set(self, id, data):
+        self.set_many({id: data})
+
+    def set_many(self, items):
+        payloads = {
+            id: pickle.dumps(data, pickle.HIGHEST_PROTOCOL) for id, data in items.items() if data
+        }
+        evicted = self._items.set_many(payloads)
+        if evicted:
+            metrics.incr("nodestore.local_cache.evicted", amount=evicted, skip_internal=True)
+
+    def delete(self, id):
+        self.delete_many([id])
+
+    def delete_many(self, id_list):
+        self._items.delete_many(id_list)
+
+    def clear(self):
+        self._items.clear()
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+    """
+    Returns the process wide `LocalNodeCache`, or `None` if it is disabled
+    through ``SENTRY_NODESTORE_LOCAL_CACHE_SIZE``.
+    """
+    global _local_cache
+
+    if _local_cache is None:
+        from django.conf import settings
+
+        max_size = settings.SENTRY_NODESTORE_LOCAL_CACHE_SIZE
+        if not max_size:
+            return None
+
+        with _local_cache_lock:
+            if _local_cache is None:
+                _local_cache = LocalNodeCache(
+                    max_size=max_size, ttl=settings.SENTRY_NODESTORE_LOCAL_CACHE_TTL
+                )
+
+    return _local_cache
@@ -1,15 +1,26 @@
 from __future__ import absolute_import
 
+import six
+
 from collections import namedtuple
 from parsimonious.grammar import Grammar, NodeVisitor
 from parsimonious.exceptions import ParseError  # noqa
+from sentry.utils import json
+from sentry.utils.compat import functools
+from sentry.utils.hashlib import md5_text
 from sentry.utils.safe import get_path
 from sentry.utils.glob import glob_match
 
-__all__ = ("parse_rules", "dump_schema", "load_schema")
+__all__ = ("parse_rules", "dump_schema", "load_schema", "load_compiled_schema", "RuleIndex")
 
 VERSION = 1
 
+# Characters that end the literal prefix of a pattern.
+GLOB_SPECIAL_CHARS = frozenset("*?[]{}!\\")
+
+# How many compiled schemas are kept per process.
+COMPILED_SCHEMA_CACHE_SIZE = 100
+
 # Grammar is defined in EBNF syntax.
 ownership_grammar = Grammar(
     r"""
@@ -210,3 +221,165 @@ def load_schema(schema):
     if schema["$version"] != VERSION:
         raise RuntimeError("Invalid schema $version: %r" % schema["$version"])
     return [Rule.load(r) for r in schema["rules"]]
+
+
+def _literal_prefix(pattern):
+    """
+    Returns the lowercased part of a pattern before its first special or
+    non-ASCII character, which every value matching the pattern starts with.
+    """
+    prefix = []
+    for char in pattern:
+        if char in GLOB_SPECIAL_CHARS or ord(char) > 127:
+            break
+        prefix.append(char)
+    return u"".join(prefix).lower()
+
+
+def _normalize_value(value, path_normalize=False):
+    """
+    Returns the value in the form used to look up rules by prefix, or `None`
+    if the value cannot be looked up and has to be tested against all rules.
+    """
+    if not isinstance(value, six.string_types):
+        return None
+    try:
+        value.encode("ascii")
+    except UnicodeError:
+        return None
+    if path_normalize:
+        value = value.replace("\\", "/")
+    return value.lower()
+
+
+class _PrefixTrie(object):
+    """
+    Maps the directories of the literal prefixes of patterns to the rules
+    using them, so that a value is only tested against the rules with a
+    prefix it can start with.
+    """
+
+    def __init__(self):
+        self.root = ({}, [])
+        self.all = []
+
+    def add(self, prefix, rule_index):
+        children, rules = self.root
+        for segment in prefix.split("/")[:-1]:
+            children, rules = children.setdefault(segment, ({}, []))
+        rules.append(rule_index)
+        self.all.append(rule_index)
+
+    def get_candidates(self, value):
+        if value is None:
+            return self.all
+
+        children, rules = self.root
+        candidates = list(rules)
+        for segment in value.split("/")[:-1]:
+            node = children.get(segment)
+            if node is None:
+                break
+            children, rules = node
+            candidates.extend(rules)
+        return candidates
+
+
+class RuleIndex(object):
+    """
+    The rules of an ownership schema, indexed so that they can be tested
+    against an event in a single pass over its frames.
+
+    Rules are only tested if the literal prefix of their pattern matches the
+    value, the pattern itself is still matched with `glob_match`.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.path_rules = _PrefixTrie()
+        self.url_rules = _PrefixTrie()
+        self.other_rules = []
+
+        for index, rule in enumerate(rules):
+            if rule.matcher.type == "path":
+                self.path_rules.add(_literal_prefix(rule.matcher.pattern), index)
+            elif rule.matcher.type == "url":
+                self.url_rules.add(_literal_prefix(rule.matcher.pattern), index)
+            else:
+                self.other_rules.append(index)
+
+    def test(self, data):
+        """
+        Returns the rules matching the event ``data``, in the order of the
+        schema.
+        """
+        matched = set(index for index in self.other_rules if self.rules[index].test(data))
+
+        try:
+            url = data["request"]["url"]
+        except KeyError:
+            url = None
+        if url:
+            for index in self.url_rules.get_candidates(_normalize_value(url)):
+                if glob_match(url, self.rules[index].matcher.pattern, ignorecase=True):
+                    matched.add(index)
+
+        filenames = set()
+        for frame in _iter_frames(data):
+            filename = frame.get("filename") or frame.get("abs_path")
+            if not filename or filename in filenames:
+                continue
+            filenames.add(filename)
+
+            for index in self.path_rules.get_candidates(
+                _normalize_value(filename, path_normalize=True)
+            ):
+                if index not in matched and glob_match(
+                    filename,
+                    self.rules[index].matcher.pattern,
+                    ignorecase=True,
+                    path_normalize=True,
+                ):
+                    matched.add(index)
+
+        return [self.rules[index] for index in sorted(matched)]
+
+
+class _CompiledSchemaKey(object):
+    """
+    Passes a schema to `_compile`, comparing and hashing by ``key`` alone so
+    that the schema itself never has to be hashed.
+    """
+
+    __slots__ = ("key", "schema")
+
+    def __init__(self, key, schema):
+        self.key = key
+        self.schema = schema
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+
+@functools.lru_cache(maxsize=COMPILED_SCHEMA_CACHE_SIZE)
+def _compile(schema_key):
+    return RuleIndex(load_schema(schema_key.schema))
+
+
+def load_compiled_schema(schema, version=None):
+    """
+    Convert a JSON schema into a `RuleIndex`. Indexes are kept per process
+    and keyed by ``version``, which has to change whenever the schema does,
+    or by the contents of the schema if no version is given.
+    """
+    if version is not None:
+        key = version
+    else:
+        key = md5_text(json.dumps(schema)).hexdigest()
+    return _compile(_CompiledSchemaKey(key, schema))
@@ -14,6 +14,7 @@ from sentry.grouping.api import get_grouping_config_dict_for_project
 from sentry.interfaces.security import DEFAULT_DISALLOWED_SOURCES
 from sentry.message_filters import get_all_filters
 from sentry.models.organizationoption import OrganizationOption
+from sentry.models.projectoption import ProjectOption
 from sentry.utils.safe import safe_execute
 from sentry.utils.data_filters import FilterTypes, FilterStatKeys, get_filter_key
 from sentry.utils.http import get_origins
@@ -78,7 +79,77 @@ def get_quotas(project, keys=None):
     return [quota.to_json() for quota in quotas.get_quotas(project, keys=keys)]
 
 
-def get_project_config(project, org_options=None, full_config=True, project_keys=None):
+def get_organization_config(organization, org_options):
+    """
+    Returns the settings of an organization that are shared by the configs of
+    all its projects, to be passed to `get_project_config` as ``org_config``.
+    """
+    return {
+        "piiConfig": _decode_pii_config(org_options.get("sentry:relay_pii_config")),
+        "eventRetention": quotas.get_event_retention(organization),
+    }
+
+
+def get_project_configs_bulk(projects, full_config=True):
+    """
+    Constructs the ProjectConfig information of many projects at once.
+
+    The options and keys of all projects are loaded with a few queries, and
+    the settings of every organization are computed once.
+
+    :return: a dict of ProjectConfig objects keyed by project id
+    """
+    from sentry.models import Organization, ProjectKey
+
+    projects = list(projects)
+    if not projects:
+        return {}
+
+    organizations = {
+        org.id: org
+        for org in Organization.objects.get_many_from_cache(
+            set(project.organization_id for project in projects)
+        )
+    }
+    org_options = {}
+    org_configs = {}
+    for org_id, organization in six.iteritems(organizations):
+        org_options[org_id] = OrganizationOption.objects.get_all_values(org_id)
+        if full_config:
+            org_configs[org_id] = get_organization_config(organization, org_options[org_id])
+
+    project_ids = [project.id for project in projects]
+    ProjectOption.objects.get_all_values_bulk(project_ids)
+
+    project_keys = {}
+    for key in ProjectKey.objects.filter(project_id__in=project_ids):
+        project_keys.setdefault(key.project_id, []).append(key)
+
+    configs = {}
+    for project in projects:
+        organization = organizations.get(project.organization_id)
+        if organization is None:
+            configs[project.id] = ProjectConfig(project, disabled=True)
+            continue
+
+        # Prevent the organization from being fetched again, e.g. in quotas.
+        project.organization = organization
+        project._organization_cache = organization
+
+        configs[project.id] = get_project_config(
+            project,
+            org_options=org_options[organization.id],
+            full_config=full_config,
+            project_keys=project_keys.get(project.id, []),
+            org_config=org_configs.get(organization.id),
+        )
+
+    return configs
+
+
+def get_project_config(
+    project, org_options=None, full_config=True, project_keys=None, org_config=None
+):
     """
     Constructs the ProjectConfig information.
 
@@ -94,6 +165,8 @@ def get_project_config(project, org_options=None, full_config=True, project_keys
         org_options. However, if no project keys are provided it is assumed
         that the config does not need to contain auth information (this is the
         case when used in python's StoreView)
+    :param org_config: Inject the preloaded organization settings returned by
+        `get_organization_config`, for faster loading of many projects.
 
     :return: a ProjectConfig object for the given project
     """
@@ -107,6 +180,8 @@ def get_project_config(project, org_options=None, full_config=True, project_keys
 
     if org_options is None:
         org_options = OrganizationOption.objects.get_all_values(project.organization_id)
+    if org_config is None:
+        org_config = {}
 
     with Hub.current.start_span(op="get_public_config"):
         now = datetime.utcnow().replace(tzinfo=utc)
@@ -120,7 +195,7 @@ def get_project_config(project, org_options=None, full_config=True, project_keys
             "config": {
                 "allowedDomains": list(get_origins(project)),
                 "trustedRelays": org_options.get("sentry:trusted-relays", []),
-                "piiConfig": _get_pii_config(project),
+                "piiConfig": _get_pii_config(project, org_config),
                 "datascrubbingSettings": _get_datascrubbing_settings(project, org_options),
             },
             "organizationId": project.organization_id,
@@ -136,7 +211,10 @@ def get_project_config(project, org_options=None, full_config=True, project_keys
     with Hub.current.start_span(op="get_grouping_config_dict_for_project"):
         cfg["config"]["groupingConfig"] = get_grouping_config_dict_for_project(project)
     with Hub.current.start_span(op="get_event_retention"):
-        cfg["config"]["eventRetention"] = quotas.get_event_retention(project.organization)
+        if "eventRetention" in org_config:
+            cfg["config"]["eventRetention"] = org_config["eventRetention"]
+        else:
+            cfg["config"]["eventRetention"] = quotas.get_event_retention(project.organization)
     with Hub.current.start_span(op="get_all_quotas"):
         cfg["config"]["quotas"] = get_quotas(project, keys=project_keys)
 
@@ -260,10 +338,18 @@ class ProjectConfig(_ConfigBase):
         super(ProjectConfig, self).__init__(**kwargs)
 
 
-def _get_pii_config(project):
-    def _decode(value):
-        if value:
-            return safe_execute(utils.json.loads, value)
+def _decode_pii_config(value):
+    if value:
+        return safe_execute(utils.json.loads, value)
+
+
+def _get_pii_config(project, org_config=None):
+    if org_config and "piiConfig" in org_config:
+        org_pii_config = org_config["piiConfig"]
+    else:
+        org_pii_config = _decode_pii_config(
+            project.organization.get_option("sentry:relay_pii_config")
+        )
 
     # Order of merging is important here. We want to apply organization rules
     # before project rules. For example:
@@ -279,8 +365,8 @@ def _get_pii_config(project):
     # here.
     return merge_pii_configs(
         [
-            ("organization:", _decode(project.organization.get_option("sentry:relay_pii_config"))),
-            ("project:", _decode(project.get_option("sentry:relay_pii_config"))),
+            ("organization:", org_pii_config),
+            ("project:", _decode_pii_config(project.get_option("sentry:relay_pii_config"))),
         ]
     )
 
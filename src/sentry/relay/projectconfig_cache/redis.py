@@ -4,11 +4,15 @@ import six
 
 from sentry.relay.projectconfig_cache.base import ProjectConfigCache
 from sentry.utils import json
+from sentry.utils.iterators import chunked
 from sentry.utils.redis import get_dynamic_cluster_from_options, validate_dynamic_cluster
 
 
 REDIS_CACHE_TIMEOUT = 3600  # 1 hr
 
+# Number of configs written or deleted per pipeline.
+PIPELINE_CHUNK_SIZE = 500
+
 
 class RedisProjectConfigCache(ProjectConfigCache):
     def __init__(self, **options):
@@ -29,29 +33,30 @@ class RedisProjectConfigCache(ProjectConfigCache):
         else:
             return self.cluster.get_local_client_for_key(routing_key)
 
-    def set_many(self, configs):
-        for project_id, config in six.iteritems(configs):
-            # XXX(markus): Figure out how to do pipelining here. We may have
-            # multiple routing keys (-> multiple clients).
-            #
-            # We cannot route by org, because Relay does not know the org when
-            # fetching.
+    def __pipeline(self):
+        # Commands are sent in batches. Redis cluster pipelines and rb's
+        # fanout both route every command to the node owning its key, as we
+        # cannot route by org (Relay does not know the org when fetching).
+        if self.is_redis_cluster:
+            return self.cluster.pipeline(transaction=False)
+        return self.cluster.map()
 
-            key = self.__get_redis_key(project_id)
-            client = self.__get_redis_client(key)
-            client.setex(key, REDIS_CACHE_TIMEOUT, json.dumps(config))
+    def set_many(self, configs):
+        for chunk in chunked(six.iteritems(configs), PIPELINE_CHUNK_SIZE):
+            with self.__pipeline() as client:
+                for project_id, config in chunk:
+                    key = self.__get_redis_key(project_id)
+                    client.setex(key, REDIS_CACHE_TIMEOUT, json.dumps(config))
+                if self.is_redis_cluster:
+                    client.execute()
 
     def delete_many(self, project_ids):
-        for project_id in project_ids:
-            # XXX(markus): Figure out how to do pipelining here. We may have
-            # multiple routing keys (-> multiple clients).
-            #
-            # We cannot route by org, because Relay does not know the org when
-            # fetching.
-
-            key = self.__get_redis_key(project_id)
-            client = self.__get_redis_client(key)
-            client.delete(key)
+        for chunk in chunked(project_ids, PIPELINE_CHUNK_SIZE):
+            with self.__pipeline() as client:
+                for project_id in chunk:
+                    client.delete(self.__get_redis_key(project_id))
+                if self.is_redis_cluster:
+                    client.execute()
 
     def get(self, project_id):
         key = self.__get_redis_key(project_id)
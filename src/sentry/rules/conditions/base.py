@@ -6,5 +6,9 @@ from sentry.rules.base import RuleBase
 class EventCondition(RuleBase):
     rule_type = "condition/event"
 
+    # Whether the condition queries other services. Expensive conditions are
+    # evaluated after all others of a rule.
+    is_expensive = False
+
     def passes(self, event, state):
         raise NotImplementedError
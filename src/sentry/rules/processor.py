@@ -12,6 +12,7 @@ from random import randrange
 from sentry import analytics
 from sentry.models import GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
+from sentry.rules.conditions.event_frequency import BaseEventFrequencyCondition
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
 
@@ -33,11 +34,18 @@ class RuleProcessor(object):
 
         self.grouped_futures = {}
 
+        # Results of the frequency queries made while applying the rules, so
+        # that rules with the same frequency condition only query it once.
+        self.rate_cache = {}
+
     def get_rules(self):
         return Rule.get_for_project(self.project.id)
 
+    def get_rule_status_cache_key(self, rule):
+        return "grouprulestatus:1:%s" % hash_values([self.group.id, rule.id])
+
     def get_rule_status(self, rule):
-        key = "grouprulestatus:1:%s" % hash_values([self.group.id, rule.id])
+        key = self.get_rule_status_cache_key(rule)
         rule_status = cache.get(key)
         if rule_status is None:
             rule_status, _ = GroupRuleStatus.objects.get_or_create(
@@ -46,13 +54,54 @@ class RuleProcessor(object):
             cache.set(key, rule_status, 300)
         return rule_status
 
+    def get_rule_statuses(self, rule_list):
+        """
+        Returns a dict of the ``GroupRuleStatus`` of each rule by rule id,
+        loading all statuses that are not cached with a single query.
+        """
+        keys = {rule.id: self.get_rule_status_cache_key(rule) for rule in rule_list}
+        cached = cache.get_many(list(keys.values()))
+
+        statuses = {}
+        missing = []
+        for rule in rule_list:
+            rule_status = cached.get(keys[rule.id])
+            if rule_status is None:
+                missing.append(rule)
+            else:
+                statuses[rule.id] = rule_status
+
+        if not missing:
+            return statuses
+
+        for rule_status in GroupRuleStatus.objects.filter(
+            group=self.group, rule__in=[rule.id for rule in missing]
+        ):
+            statuses[rule_status.rule_id] = rule_status
+
+        for rule in missing:
+            if rule.id not in statuses:
+                statuses[rule.id], _ = GroupRuleStatus.objects.get_or_create(
+                    rule=rule, group=self.group, defaults={"project": self.project}
+                )
+
+        cache.set_many({keys[rule.id]: statuses[rule.id] for rule in missing}, 300)
+        return statuses
+
+    def is_expensive_condition(self, condition):
+        return getattr(rules.get(condition["id"]), "is_expensive", False)
+
     def condition_matches(self, condition, state, rule):
         condition_cls = rules.get(condition["id"])
         if condition_cls is None:
             self.logger.warn("Unregistered condition %r", condition["id"])
             return
 
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
+        kwargs = {}
+        if issubclass(condition_cls, BaseEventFrequencyCondition):
+            kwargs["rate_cache"] = self.rate_cache
+
+        condition_inst = condition_cls(self.project, data=condition, rule=rule, **kwargs)
         return safe_execute(condition_inst.passes, self.event, state, _with_transaction=False)
 
     def get_state(self):
@@ -63,23 +112,24 @@ class RuleProcessor(object):
             has_reappeared=self.has_reappeared,
         )
 
-    def apply_rule(self, rule):
+    def is_applicable(self, rule):
+        # XXX(dcramer): if theres no condition should we really skip it,
+        # or should we just apply it blindly?
+        if not rule.data.get("conditions"):
+            return False
+
+        return rule.environment_id is None or self.event.get_environment().id == rule.environment_id
+
+    def apply_rule(self, rule, status=None):
         match = rule.data.get("action_match") or Rule.DEFAULT_ACTION_MATCH
         condition_list = rule.data.get("conditions", ())
         frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
 
-        # XXX(dcramer): if theres no condition should we really skip it,
-        # or should we just apply it blindly?
-        if not condition_list:
-            return
-
-        if (
-            rule.environment_id is not None
-            and self.event.get_environment().id != rule.environment_id
-        ):
+        if not self.is_applicable(rule):
             return
 
-        status = self.get_rule_status(rule)
+        if status is None:
+            status = self.get_rule_status(rule)
 
         now = timezone.now()
         freq_offset = now - timedelta(minutes=frequency)
@@ -89,6 +139,9 @@ class RuleProcessor(object):
 
         state = self.get_state()
 
+        # Conditions which query other services are evaluated last, as the
+        # cheaper ones often decide the rule on their own.
+        condition_list = sorted(condition_list, key=self.is_expensive_condition)
         condition_iter = (self.condition_matches(c, state, rule) for c in condition_list)
 
         if match == "all":
@@ -145,6 +198,9 @@ class RuleProcessor(object):
 
     def apply(self):
         self.grouped_futures.clear()
-        for rule in self.get_rules():
-            self.apply_rule(rule)
+        self.rate_cache.clear()
+        applicable_rules = [rule for rule in self.get_rules() if self.is_applicable(rule)]
+        statuses = self.get_rule_statuses(applicable_rules)
+        for rule in applicable_rules:
+            self.apply_rule(rule, status=statuses[rule.id])
         return six.itervalues(self.grouped_futures)
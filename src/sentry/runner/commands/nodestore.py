@@ -0,0 +1,110 @@
+from __future__ import absolute_import, print_function
+
+import click
+from sentry.runner.decorators import configuration
+
+
+@click.group()
+def nodestore():
+    "Manage the Django node storage."
+
+
+def get_django_nodestore():
+    from django.conf import settings
+    from sentry.nodestore.django import DjangoNodeStorage
+    from sentry.utils.imports import import_string
+
+    backend = import_string(settings.SENTRY_NODESTORE)
+    if not issubclass(backend, DjangoNodeStorage):
+        raise click.ClickException("The configured nodestore is not a DjangoNodeStorage.")
+
+    return backend(**settings.SENTRY_NODESTORE_OPTIONS)
+
+
+@nodestore.command()
+@click.option("--batch-size", default=500, show_default=True, help="Nodes to rewrite per query.")
+@click.option("--limit", type=int, default=None, help="Stop after this many nodes.")
+@configuration
+def reencode(batch_size, limit):
+    """Rewrite nodes with the configured codec.
+
+    Nodes that are already stored with the configured codec (and
+    compression dictionary) are left untouched. The command can be
+    interrupted and restarted at any time.
+    """
+    from django.db.models import Value
+    from sentry.nodestore.codecs import decode, get_header
+    from sentry.nodestore.django.models import Node
+
+    ns = get_django_nodestore()
+
+    last_id = ""
+    seen = rewritten = 0
+
+    while limit is None or seen < limit:
+        size = batch_size if limit is None else min(batch_size, limit - seen)
+        rows = list(
+            Node.objects.filter(id__gt=last_id).order_by("id").values_list("id", "data")[:size]
+        )
+        if not rows:
+            break
+
+        for node_id, value in rows:
+            seen += 1
+            last_id = node_id
+            if not value:
+                continue
+
+            encoded = ns.codec.encode(decode(value))
+            if get_header(encoded) == get_header(value):
+                continue
+
+            # Only touch the row if nobody changed it in the meantime.
+            rewritten += Node.objects.filter(id=node_id, data=Value(value)).update(
+                data=Value(encoded)
+            )
+
+        click.echo("Rewrote %d of %d nodes (last id: %s)" % (rewritten, seen, last_id))
+
+
+@nodestore.command("train-dictionary")
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+@click.option("--platform", required=True, help="Only sample nodes of this platform.")
+@click.option("--samples", default=10000, show_default=True, help="Number of nodes to sample.")
+@click.option("--size", default=112640, show_default=True, help="Size of the dictionary in bytes.")
+@configuration
+def train_dictionary(output, platform, samples, size):
+    """Train a zstd compression dictionary from recent nodes.
+
+    The dictionary is written to OUTPUT and can be configured for the
+    platform in the ``dictionaries`` option of the zstd codec.
+    """
+    from sentry.nodestore.codecs import decode, has_zstandard
+    from sentry.nodestore.django.models import Node
+    from sentry.utils.compat import pickle
+
+    if not has_zstandard:
+        raise click.ClickException("Training dictionaries requires the zstandard package.")
+
+    import zstandard
+
+    training_data = []
+    values = Node.objects.order_by("-timestamp").values_list("data", flat=True)
+    for value in values.iterator():
+        if len(training_data) >= samples:
+            break
+        if not value:
+            continue
+
+        data = decode(value)
+        if data.get("platform") == platform:
+            training_data.append(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    if not training_data:
+        raise click.ClickException("No nodes found for platform %s." % platform)
+
+    dictionary = zstandard.train_dictionary(size, training_data)
+    with open(output, "wb") as f:
+        f.write(dictionary.as_bytes())
+
+    click.echo("Trained dictionary %s from %d nodes" % (dictionary.dict_id(), len(training_data)))
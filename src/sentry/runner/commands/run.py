@@ -304,6 +304,12 @@ def cron(**options):
     type=click.Choice(["earliest", "latest"]),
     help="Position in the commit log topic to begin reading from when no prior offset has been recorded.",
 )
+@click.option(
+    "--batch-timeout",
+    default=None,
+    type=float,
+    help="Enqueue tasks in batches, collecting messages for up to this many seconds (or until the commit batch size is reached) before enqueueing their tasks and committing offsets.",
+)
 @log_options()
 @configuration
 def post_process_forwarder(**options):
@@ -317,6 +323,7 @@ def post_process_forwarder(**options):
             synchronize_commit_group=options["synchronize_commit_group"],
             commit_batch_size=options["commit_batch_size"],
             initial_offset_reset=options["initial_offset_reset"],
+            batch_timeout=options["batch_timeout"],
         )
     except ForwarderNotRequired:
         sys.stdout.write(
@@ -431,7 +438,13 @@ def batching_kafka_options(group):
     "--concurrency",
     type=int,
     default=1,
-    help="Spawn this many threads to process messages. Defaults to 1.",
+    help="Spawn this many threads (or processes) to process messages. Defaults to 1.",
+)
+@click.option(
+    "--use-processes",
+    default=False,
+    is_flag=True,
+    help="Process messages in a pool of worker processes instead of threads.",
 )
 @configuration
 def ingest_consumer(consumer_types, all_consumer_types, **options):
@@ -6,6 +6,7 @@ from django.conf import settings
 
 from sentry.interfaces.stacktrace import Frame
 from sentry.similarity.backends.dummy import DummyIndexBackend
+from sentry.similarity.backends.inmemory import InMemoryMinHashIndexBackend
 from sentry.similarity.backends.metrics import MetricsWrapper
 from sentry.similarity.backends.redis import RedisScriptMinHashIndexBackend
 from sentry.similarity.encoder import Encoder
@@ -60,6 +61,17 @@ def get_frame_attributes(frame):
 
 
 def _make_index_backend(cluster=None):
+    # Options (such as ``snapshot_path``) for keeping the index in the memory
+    # of the current process instead of redis.
+    local_options = getattr(settings, "SENTRY_SIMILARITY_INDEX_LOCAL_OPTIONS", None)
+    if not cluster and local_options is not None:
+        return MetricsWrapper(
+            InMemoryMinHashIndexBackend(
+                MinHashSignatureBuilder(16, 0xFFFF), 8, 60 * 60 * 24 * 30, 3, 5000, **local_options
+            ),
+            scope_tag_name=None,
+        )
+
     if not cluster:
         cluster_id = getattr(settings, "SENTRY_SIMILARITY_INDEX_REDIS_CLUSTER", "similarity")
 
@@ -0,0 +1,500 @@
+from __future__ import absolute_import
+
+import itertools
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import msgpack
+import six
+
+from sentry.similarity.backends.abstract import AbstractIndexBackend
+from sentry.similarity.backends.redis import as_search_result, band
+from sentry.utils.compat import pickle
+from sentry.utils.iterators import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class ScopeIndex(object):
+    """
+    The MinHash buckets of a single scope.
+
+    This follows the data layout of ``similarity/index.lua``:
+
+    - ``frequencies`` maps ``(index, key)`` to a ``[bands, expiration]`` pair,
+      where ``bands`` contains the bucket counts of every band,
+    - ``members`` maps ``(index, band, bucket)`` to the keys recorded in that
+      bucket, grouped by the time interval they were recorded in.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frequencies = {}
+        self.members = defaultdict(lambda: defaultdict(set))
+
+    def __getstate__(self):
+        return {
+            "frequencies": self.frequencies,
+            "members": {
+                coordinate: dict(intervals) for coordinate, intervals in six.iteritems(self.members)
+            },
+        }
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.frequencies = state["frequencies"]
+        for coordinate, intervals in six.iteritems(state["members"]):
+            self.members[coordinate].update(intervals)
+
+
+class InMemoryMinHashIndexBackend(AbstractIndexBackend):
+    """
+    A MinHash index that is kept in the memory of the current process.
+
+    It implements the same scoring as `RedisScriptMinHashIndexBackend` and
+    produces and accepts the same ``export``/``import_`` payloads, so data can
+    be moved between both backends. Every scope is locked independently.
+
+    If ``snapshot_path`` is set, the index is loaded from that file on startup
+    and written back to it at most every ``snapshot_interval`` seconds after
+    it was modified (or when `snapshot` is called.)
+    """
+
+    def __init__(
+        self,
+        signature_builder,
+        bands,
+        interval,
+        retention,
+        candidate_set_limit,
+        snapshot_path=None,
+        snapshot_interval=300,
+    ):
+        self.signature_builder = signature_builder
+        self.bands = bands
+        self.interval = interval
+        self.retention = retention
+        self.candidate_set_limit = candidate_set_limit
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self.__scopes = {}
+        self.__scopes_lock = threading.Lock()
+        self.__last_snapshot = time.time()
+
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            self.load_snapshot()
+
+    def __get_scope(self, scope):
+        index = self.__scopes.get(scope)
+        if index is None:
+            with self.__scopes_lock:
+                index = self.__scopes.setdefault(scope, ScopeIndex())
+        return index
+
+    def __get_scopes(self, scope):
+        # "*" addresses every scope, same as the key pattern of the redis
+        # backend.
+        with self.__scopes_lock:
+            if scope == "*":
+                return list(self.__scopes.values())
+            index = self.__scopes.get(scope)
+            return [index] if index is not None else []
+
+    # Snapshots
+
+    def snapshot(self):
+        """
+        Writes the entire index to ``snapshot_path``.
+        """
+        with self.__scopes_lock:
+            scopes = list(self.__scopes.items())
+
+        state = {}
+        for scope, index in scopes:
+            with index.lock:
+                state[scope] = pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+
+        # Write to a temporary file first, so that a crash never leaves a
+        # truncated snapshot behind.
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        fd, path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(path, self.snapshot_path)
+
+        self.__last_snapshot = time.time()
+
+    def load_snapshot(self):
+        with open(self.snapshot_path, "rb") as f:
+            state = pickle.load(f)
+
+        with self.__scopes_lock:
+            self.__scopes = {scope: pickle.loads(value) for scope, value in six.iteritems(state)}
+
+    def __maybe_snapshot(self):
+        if self.snapshot_path is None:
+            return
+
+        if time.time() - self.__last_snapshot >= self.snapshot_interval:
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Failed to write similarity index snapshot")
+
+    # Time Series Sets
+
+    def __get_window(self, timestamp):
+        current = int(timestamp // self.interval)
+        return range(current - self.retention, current + 1)
+
+    def __get_members(self, index, coordinate, timestamp):
+        intervals = index.members.get(coordinate)
+        if not intervals:
+            return set()
+
+        results = set()
+        for i in self.__get_window(timestamp):
+            for member in intervals.get(i, ()):
+                results.add(member)
+                if len(results) >= self.candidate_set_limit:
+                    return results
+        return results
+
+    def __add_member(self, index, coordinate, key, timestamp):
+        current = int(timestamp // self.interval)
+        intervals = index.members[coordinate]
+        intervals[current].add(key)
+
+        # Drop intervals that fell out of the retention window.
+        for i in [i for i in intervals if i < current - self.retention]:
+            del intervals[i]
+
+    def __remove_member(self, index, coordinate, key, timestamp):
+        intervals = index.members.get(coordinate)
+        if not intervals:
+            return
+
+        for i in self.__get_window(timestamp):
+            members = intervals.get(i)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del intervals[i]
+
+        if not intervals:
+            del index.members[coordinate]
+
+    def __swap_member(self, index, coordinate, old, new, timestamp):
+        intervals = index.members.get(coordinate)
+        if not intervals:
+            return
+
+        for i in self.__get_window(timestamp):
+            members = intervals.get(i)
+            if members is not None and old in members:
+                members.remove(old)
+                members.add(new)
+
+    def __export_member(self, index, coordinate, key, timestamp):
+        intervals = index.members.get(coordinate, {})
+        return [i for i in self.__get_window(timestamp) if key in intervals.get(i, ())]
+
+    # Frequencies
+
+    def __build_frequencies(self, features):
+        if not features:
+            return [{} for _ in range(self.bands)]
+
+        return [
+            {",".join(map("{}".format, bucket)): 1}
+            for bucket in band(self.bands, self.signature_builder(features))
+        ]
+
+    def __get_frequencies(self, index, idx, key, timestamp):
+        item = index.frequencies.get((idx, key))
+        if item is None:
+            return None
+
+        frequencies, expiration = item
+        if expiration <= timestamp:
+            del index.frequencies[(idx, key)]
+            return None
+
+        return frequencies
+
+    def __add_frequencies(self, index, idx, key, frequencies, expiration):
+        item = index.frequencies.get((idx, key))
+        if item is None:
+            if not any(frequencies):
+                return  # nothing to store
+            item = index.frequencies[(idx, key)] = [[{} for _ in range(self.bands)], expiration]
+
+        for buckets, counts in zip(item[0], frequencies):
+            for bucket, count in six.iteritems(counts):
+                buckets[bucket] = buckets.get(bucket, 0) + count
+        item[1] = expiration
+
+    def __iter_coordinates(self, idx, frequencies):
+        for band_idx, buckets in enumerate(frequencies):
+            for bucket in buckets:
+                yield (idx, band_idx, bucket)
+
+    # Searching
+
+    def __calculate_similarity(self, item_frequencies, candidate_frequencies):
+        if not item_frequencies[0] and not candidate_frequencies[0]:
+            return -1.0
+        elif not item_frequencies[0] or not candidate_frequencies[0]:
+            return -2.0
+
+        def scale_to_total(values):
+            total = float(sum(values.values()))
+            return {k: v / total for k, v in six.iteritems(values)}
+
+        scores = []
+        for item, candidate in zip(item_frequencies, candidate_frequencies):
+            item, candidate = scale_to_total(item), scale_to_total(candidate)
+            distance = sum(
+                abs(item.get(k, 0) - candidate.get(k, 0)) for k in set(item) | set(candidate)
+            )
+            scores.append(1 - (distance / 2))
+        return sum(scores) / len(scores)
+
+    def __fetch_candidates(self, index, idx, frequencies, timestamp):
+        candidates = defaultdict(set)
+        for coordinate in self.__iter_coordinates(idx, frequencies):
+            for member in self.__get_members(index, coordinate, timestamp):
+                candidates[member].add(coordinate[1])
+        return {candidate: len(bands) for candidate, bands in six.iteritems(candidates)}
+
+    def __search(self, index, parameters, limit, timestamp):
+        possible_candidates = defaultdict(dict)
+        for i, (idx, threshold, frequencies) in enumerate(parameters):
+            for candidate, hits in six.iteritems(
+                self.__fetch_candidates(index, idx, frequencies, timestamp)
+            ):
+                if hits >= threshold:
+                    possible_candidates[candidate][i] = hits
+
+        def get_ranking_key(candidate):
+            # Like the script, only the hits of the leading consecutive
+            # indexes are taken into account for ranking.
+            hits = list(
+                itertools.takewhile(
+                    lambda value: value is not None,
+                    (possible_candidates[candidate].get(i) for i in range(len(parameters))),
+                )
+            )
+            return (
+                -(float(sum(hits)) / len(hits) if hits else 0),
+                -len(hits),
+                candidate,
+            )
+
+        candidates = list(possible_candidates)
+        if limit is not None and limit >= 0 and len(candidates) > limit:
+            candidates = sorted(candidates, key=get_ranking_key)[:limit]
+
+        empty = [{} for _ in range(self.bands)]
+        results = []
+        for candidate in candidates:
+            scores = []
+            for idx, _, frequencies in parameters:
+                candidate_frequencies = self.__get_frequencies(index, idx, candidate, timestamp)
+                scores.append(
+                    self.__calculate_similarity(frequencies, candidate_frequencies or empty)
+                )
+            results.append((candidate, scores))
+
+        return as_search_result(results)
+
+    # Index API
+
+    def classify(self, scope, items, limit=None, timestamp=None):
+        return self.classify_many(scope, [items], limit, timestamp)[0]
+
+    def classify_many(self, scope, requests, limit=None, timestamp=None):
+        """
+        Classifies several events at once, returning the results in the order
+        of ``requests``, which contains ``items`` as passed to `classify`.
+        """
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        parameters = [
+            [
+                (idx, threshold, self.__build_frequencies(features))
+                for idx, threshold, features in items
+            ]
+            for items in requests
+        ]
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            return [self.__search(index, p, limit, timestamp) for p in parameters]
+
+    def compare(self, scope, key, items, limit=None, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        empty = [{} for _ in range(self.bands)]
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            parameters = [
+                (idx, threshold, self.__get_frequencies(index, idx, key, timestamp) or empty)
+                for idx, threshold in items
+            ]
+            return self.__search(index, parameters, limit, timestamp)
+
+    def record(self, scope, key, items, timestamp=None):
+        if not items:
+            return  # nothing to do
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        expiration = timestamp + self.interval * self.retention
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            for idx, features in items:
+                frequencies = self.__build_frequencies(features)
+                self.__add_frequencies(index, idx, key, frequencies, expiration)
+                for coordinate in self.__iter_coordinates(idx, frequencies):
+                    self.__add_member(index, coordinate, key, timestamp)
+
+        self.__maybe_snapshot()
+        return [None] * len(items)
+
+    def merge(self, scope, destination, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            for idx, source in items:
+                assert source != destination, "cannot merge destination into itself"
+
+                item = index.frequencies.pop((idx, source), None)
+                if item is None or item[1] <= timestamp:
+                    continue
+
+                frequencies, expiration = item
+                existing = index.frequencies.get((idx, destination))
+                if existing is not None and existing[1] > expiration:
+                    expiration = existing[1]
+                self.__add_frequencies(index, idx, destination, frequencies, expiration)
+
+                for coordinate in self.__iter_coordinates(idx, frequencies):
+                    self.__swap_member(index, coordinate, source, destination, timestamp)
+
+        self.__maybe_snapshot()
+
+    def delete(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            for idx, key in items:
+                item = index.frequencies.pop((idx, key), None)
+                if item is None:
+                    continue
+
+                for coordinate in self.__iter_coordinates(idx, item[0]):
+                    self.__remove_member(index, coordinate, key, timestamp)
+
+        self.__maybe_snapshot()
+
+    def scan(self, scope, indices, batch=1000, timestamp=None):
+        """
+        Yields ``(index, keys)`` for all keys recorded in the given indices,
+        in chunks of up to ``batch`` keys.
+        """
+        for index in self.__get_scopes(scope):
+            with index.lock:
+                keys = defaultdict(list)
+                for idx, key in index.frequencies:
+                    if idx in indices:
+                        keys[idx].append(key)
+
+            for idx, values in six.iteritems(keys):
+                for chunk in chunked(values, batch):
+                    yield idx, chunk
+
+    def flush(self, scope, indices, batch=1000, timestamp=None):
+        for index in self.__get_scopes(scope):
+            with index.lock:
+                for item in [item for item in index.frequencies if item[0] in indices]:
+                    del index.frequencies[item]
+                for coordinate in [c for c in index.members if c[0] in indices]:
+                    del index.members[coordinate]
+
+        self.__maybe_snapshot()
+
+    def export(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        results = []
+        index = self.__get_scope(scope)
+        with index.lock:
+            for idx, key in items:
+                frequencies = self.__get_frequencies(index, idx, key, timestamp)
+                if frequencies is None:
+                    results.append(msgpack.packb([]))
+                    continue
+
+                data = []
+                for band_idx, buckets in enumerate(frequencies):
+                    data.append(
+                        {
+                            bucket: [
+                                count,
+                                self.__export_member(
+                                    index, (idx, band_idx, bucket), key, timestamp
+                                ),
+                            ]
+                            for bucket, count in six.iteritems(buckets)
+                        }
+                    )
+
+                results.append(msgpack.packb([data, index.frequencies[(idx, key)][1]]))
+
+        return results
+
+    def import_(self, scope, items, timestamp=None):
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        index = self.__get_scope(scope)
+        with index.lock:
+            for idx, key, data in items:
+                data = msgpack.unpackb(data)
+                if not data:
+                    continue
+
+                data, expiration = data
+                frequencies = []
+                for band_idx, buckets in enumerate(data):
+                    # Empty bands are packed as arrays by the redis backend.
+                    buckets = buckets or {}
+                    frequencies.append({})
+                    for bucket, (count, intervals) in six.iteritems(buckets):
+                        if isinstance(bucket, six.binary_type):
+                            bucket = bucket.decode("utf-8")
+                        frequencies[band_idx][bucket] = count
+                        members = index.members[(idx, band_idx, bucket)]
+                        for i in intervals:
+                            members[i].add(key)
+
+                self.__add_frequencies(index, idx, key, frequencies, expiration)
+
+        self.__maybe_snapshot()
+        return [None] * len(items)
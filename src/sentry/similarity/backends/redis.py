@@ -22,6 +22,30 @@ def flatten(value):
     return list(itertools.chain.from_iterable(value))
 
 
+def as_search_result(results):
+    score_replacements = {
+        -1.0: None,  # both items don't have the feature (no comparison)
+        -2.0: 0,  # one item doesn't have the feature (totally dissimilar)
+    }
+
+    def decode_search_result(result):
+        key, scores = result
+        return (key, map(lambda score: score_replacements.get(score, score), map(float, scores)))
+
+    def get_comparison_key(result):
+        key, scores = result
+
+        scores = [score for score in scores if score is not None]
+
+        return (
+            sum(scores) / len(scores) * -1,  # average score, descending
+            len(scores) * -1,  # number of indexes with scores, descending
+            key,  # lexicographical sort on key, ascending
+        )
+
+    return sorted(map(decode_search_result, results), key=get_comparison_key)
+
+
 class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
     def __init__(
         self, cluster, namespace, signature_builder, bands, interval, retention, candidate_set_limit
@@ -50,32 +74,6 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
         # all redis operations.
         return index(self.cluster, [scope], args)
 
-    def _as_search_result(self, results):
-        score_replacements = {
-            -1.0: None,  # both items don't have the feature (no comparison)
-            -2.0: 0,  # one item doesn't have the feature (totally dissimilar)
-        }
-
-        def decode_search_result(result):
-            key, scores = result
-            return (
-                key,
-                map(lambda score: score_replacements.get(score, score), map(float, scores)),
-            )
-
-        def get_comparison_key(result):
-            key, scores = result
-
-            scores = [score for score in scores if score is not None]
-
-            return (
-                sum(scores) / len(scores) * -1,  # average score, descending
-                len(scores) * -1,  # number of indexes with scores, descending
-                key,  # lexicographical sort on key, ascending
-            )
-
-        return sorted(map(decode_search_result, results), key=get_comparison_key)
-
     def classify(self, scope, items, limit=None, timestamp=None):
         if timestamp is None:
             timestamp = int(time.time())
@@ -96,7 +94,7 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
             arguments.extend([idx, threshold])
             arguments.extend(self._build_signature_arguments(features))
 
-        return self._as_search_result(self.__index(scope, arguments))
+        return as_search_result(self.__index(scope, arguments))
 
     def compare(self, scope, key, items, limit=None, timestamp=None):
         if timestamp is None:
@@ -118,7 +116,7 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
         for idx, threshold in items:
             arguments.extend([idx, threshold])
 
-        return self._as_search_result(self.__index(scope, arguments))
+        return as_search_result(self.__index(scope, arguments))
 
     def record(self, scope, key, items, timestamp=None):
         if not items:
@@ -0,0 +1,107 @@
+from __future__ import absolute_import
+
+import threading
+
+import six
+
+from sentry.utils.cache import cache
+from sentry.utils.lru import LRUCache
+
+__all__ = ["FrameCache", "LocalFrameCache", "get_local_frame_cache"]
+
+# How long processed frames are kept in the shared cache.
+FRAME_CACHE_TIMEOUT = 3600
+
+# Marks keys that are known to be missing from the shared cache.
+MISSING = object()
+
+
+class LocalFrameCache(LRUCache):
+    """
+    A per-process LRU cache in front of the shared frame cache.
+
+    Values are kept for ``timeout`` seconds. Keys that were missing from the
+    shared cache are remembered for ``negative_timeout`` seconds, so that
+    frames which are never cached (or always fail to process) do not cause
+    a cache round-trip for every event.
+    """
+
+    def __init__(self, max_size, timeout=300, negative_timeout=60):
+        super(LocalFrameCache, self).__init__(max_size, ttl=timeout)
+        self.negative_timeout = negative_timeout
+
+    def set_missing(self, keys):
+        self.set_many(dict.fromkeys(keys, MISSING), ttl=self.negative_timeout)
+
+
+class FrameCache(object):
+    """
+    Batches lookups and writes of processed frames for a single processing
+    task.
+
+    Lookups go to the local cache first and fetch all remaining keys from the
+    shared cache with a single ``get_many``. Writes are buffered until
+    `flush` sends them with a single ``set_many``.
+    """
+
+    def __init__(self, local_cache=None, timeout=FRAME_CACHE_TIMEOUT):
+        self.local_cache = local_cache
+        self.timeout = timeout
+        self.pending = {}
+
+    def get_many(self, keys):
+        """
+        Returns the cached values of ``keys``. Missing keys are not part of
+        the result.
+        """
+        keys = list(keys)
+        rv = {}
+
+        if self.local_cache is not None and keys:
+            rv = self.local_cache.get_many(keys)
+            keys = [key for key in keys if key not in rv]
+
+        if keys:
+            found = cache.get_many(keys)
+            rv.update(found)
+            if self.local_cache is not None:
+                self.local_cache.set_many(found)
+                self.local_cache.set_missing(key for key in keys if key not in found)
+
+        return {key: value for key, value in six.iteritems(rv) if value is not MISSING}
+
+    def set(self, key, value):
+        self.pending[key] = value
+        if self.local_cache is not None:
+            self.local_cache.set_many({key: value})
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        cache.set_many(pending, self.timeout)
+
+
+_local_frame_cache = None
+_local_frame_cache_lock = threading.Lock()
+
+
+def get_local_frame_cache():
+    """
+    Returns the process wide `LocalFrameCache`, or `None` if it is disabled
+    through ``SENTRY_STACKTRACE_FRAME_CACHE_LOCAL_SIZE``.
+    """
+    global _local_frame_cache
+
+    if _local_frame_cache is None:
+        from django.conf import settings
+
+        max_size = settings.SENTRY_STACKTRACE_FRAME_CACHE_LOCAL_SIZE
+        if not max_size:
+            return None
+
+        with _local_frame_cache_lock:
+            if _local_frame_cache is None:
+                _local_frame_cache = LocalFrameCache(max_size)
+
+    return _local_frame_cache
@@ -8,6 +8,8 @@ from django.utils import timezone
 from collections import namedtuple, OrderedDict
 
 from sentry.models import Project, Release
+from sentry.stacktraces.cache import FrameCache, get_local_frame_cache
+from sentry.utils import metrics
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import get_path, safe_execute
@@ -33,6 +35,7 @@ class ProcessableFrame(object):
         self.data = None
         self.cache_key = None
         self.cache_value = None
+        self.frame_cache = None
         self.processable_frames = processable_frames
 
     def __repr__(self):
@@ -57,6 +60,7 @@ class ProcessableFrame(object):
         self.processable_frames = None
         self.stacktrace_info = None
         self.processor = None
+        self.frame_cache = None
 
     @property
     def previous_frame(self):
@@ -67,7 +71,10 @@ class ProcessableFrame(object):
 
     def set_cache_value(self, value):
         if self.cache_key is not None:
-            cache.set(self.cache_key, value, 3600)
+            if self.frame_cache is not None:
+                self.frame_cache.set(self.cache_key, value)
+            else:
+                cache.set(self.cache_key, value, 3600)
             return True
         return False
 
@@ -82,9 +89,14 @@ class ProcessableFrame(object):
 
 
 class StacktraceProcessingTask(object):
-    def __init__(self, processable_stacktraces, processors):
+    def __init__(self, processable_stacktraces, processors, frame_cache=None):
         self.processable_stacktraces = processable_stacktraces
         self.processors = processors
+        self.frame_cache = frame_cache
+
+    def flush_frame_cache(self):
+        if self.frame_cache is not None:
+            self.frame_cache.flush()
 
     def close(self):
         for frame in self.iter_processable_frames():
@@ -396,6 +408,9 @@ def process_single_stacktrace(processing_task, stacktrace_info, processable_fram
             raw_frames.append(bare_frame)
         all_errors.extend(errors or ())
 
+    # Write back all frames cached by the processors at once.
+    processing_task.flush_frame_cache()
+
     return (
         processed_frames if changed_processed else None,
         raw_frames if changed_raw else None,
@@ -443,11 +458,10 @@ def get_crash_frame_from_event_data(data, frame_filter=None):
         return default
 
 
-def lookup_frame_cache(keys):
-    rv = {}
-    for key in keys:
-        rv[key] = cache.get(key)
-    return rv
+def lookup_frame_cache(keys, frame_cache=None):
+    if frame_cache is None:
+        frame_cache = FrameCache()
+    return frame_cache.get_many(keys)
 
 
 def get_stacktrace_processing_task(infos, processors):
@@ -456,6 +470,7 @@ def get_stacktrace_processing_task(infos, processors):
     """
     by_processor = {}
     to_lookup = {}
+    frame_cache = FrameCache(local_cache=get_local_frame_cache())
 
     # by_stacktrace_info requires stable sorting as it is used in
     # StacktraceProcessingTask.iter_processable_stacktraces. This is important
@@ -465,20 +480,41 @@ def get_stacktrace_processing_task(infos, processors):
     for info in infos:
         processable_frames = get_processable_frames(info, processors)
         for processable_frame in processable_frames:
+            processable_frame.frame_cache = frame_cache
             processable_frame.processor.preprocess_frame(processable_frame)
             by_processor.setdefault(processable_frame.processor, []).append(processable_frame)
             by_stacktrace_info.setdefault(processable_frame.stacktrace_info, []).append(
                 processable_frame
             )
             if processable_frame.cache_key is not None:
-                to_lookup[processable_frame.cache_key] = processable_frame
-
-    frame_cache = lookup_frame_cache(to_lookup)
-    for cache_key, processable_frame in six.iteritems(to_lookup):
-        processable_frame.cache_value = frame_cache.get(cache_key)
+                to_lookup.setdefault(processable_frame.cache_key, []).append(processable_frame)
+
+    with metrics.timer("stacktraces.frame_cache.lookup"):
+        cached = lookup_frame_cache(to_lookup, frame_cache=frame_cache)
+
+    hits = {}
+    misses = {}
+    for cache_key, frames in six.iteritems(to_lookup):
+        cache_value = cached.get(cache_key)
+        for processable_frame in frames:
+            processable_frame.cache_value = cache_value
+            processor_name = type(processable_frame.processor).__name__
+            counter = misses if cache_value is None else hits
+            counter[processor_name] = counter.get(processor_name, 0) + 1
+
+    for metric, counter in (("hit", hits), ("miss", misses)):
+        for processor_name, count in six.iteritems(counter):
+            metrics.incr(
+                "stacktraces.frame_cache.%s" % metric,
+                amount=count,
+                tags={"processor": processor_name},
+                skip_internal=True,
+            )
 
     return StacktraceProcessingTask(
-        processable_stacktraces=by_stacktrace_info, processors=by_processor
+        processable_stacktraces=by_stacktrace_info,
+        processors=by_processor,
+        frame_cache=frame_cache,
     )
 
 
@@ -546,6 +582,7 @@ def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
                 changed = True
 
     finally:
+        processing_task.flush_frame_cache()
         for processor in processors:
             processor.close()
         processing_task.close()
@@ -59,6 +59,7 @@ class TagStorage(Service):
             "get_group_tag_value_iter",
             "get_group_tag_value_qs",
             "get_group_seen_values_for_environments",
+            "get_groups_seen_stats",
         ]
     )
 
@@ -317,3 +318,22 @@ class TagStorage(Service):
         self, project_ids, group_id_list, environment_ids, start=None, end=None
     ):
         raise NotImplementedError
+
+    def get_groups_seen_stats(
+        self, project_ids, group_ids, environment_ids, start=None, end=None, deadline=None
+    ):
+        """
+        >>> get_groups_seen_stats([1, 2], [2, 3], [4, 5])
+        Returns the results of `get_group_seen_values_for_environments` and
+        `get_groups_user_counts`, and whether they are incomplete, as a tuple.
+        Backends may fetch both at the same time, and stop waiting for them at
+        `deadline`, in which case the missing stats are left out and the last
+        value is `True`.
+        """
+        seen_values = self.get_group_seen_values_for_environments(
+            project_ids, group_ids, environment_ids, start=start, end=end
+        )
+        user_counts = self.get_groups_user_counts(
+            project_ids, group_ids, environment_ids, start=start, end=end
+        )
+        return seen_values, user_counts, False
@@ -493,17 +493,13 @@ class SnubaTagStorage(TagStorage):
         user=None,
         keys=None,
         value_limit=TOP_VALUES_DEFAULT_LIMIT,
+        deadline=None,
         **kwargs
     ):
         # Similar to __get_tag_key_and_top_values except we get the top values
         # for all the keys provided. value_limit in this case means the number
         # of top values for each key, so the total rows returned should be
         # num_keys * limit.
-
-        # First get totals and unique counts by key.
-        keys_with_counts = self.get_group_tag_keys(project_id, group_id, environment_ids, keys=keys)
-
-        # Then get the top values with first_seen/last_seen/count for each
         filters = {"project_id": get_project_list(project_id)}
         if environment_ids:
             filters["environment"] = environment_ids
@@ -511,6 +507,19 @@ class SnubaTagStorage(TagStorage):
             filters["tags_key"] = keys
         if group_id is not None:
             filters["group_id"] = [group_id]
+
+        # Totals by key, and the top values with first_seen/last_seen/count for
+        # each, are queried at the same time.
+        default_start, default_end = default_start_end_dates()
+        keys_params = snuba.SnubaQueryParams(
+            start=default_start,
+            end=default_end,
+            groupby=["tags_key"],
+            filter_keys=dict(filters),
+            aggregations=[["count()", "", "count"]],
+            orderby="-count",
+        )
+
         conditions = kwargs.get("conditions", [])
         aggregations = kwargs.get("aggregations", [])
         aggregations += [
@@ -518,17 +527,40 @@ class SnubaTagStorage(TagStorage):
             ["min", SEEN_COLUMN, "first_seen"],
             ["max", SEEN_COLUMN, "last_seen"],
         ]
-
-        values_by_key = snuba.query(
+        values_params = snuba.SnubaQueryParams(
             start=kwargs.get("start"),
             end=kwargs.get("end"),
             groupby=["tags_key", "tags_value"],
             conditions=conditions,
-            filter_keys=filters,
+            filter_keys=dict(filters),
             aggregations=aggregations,
             orderby="-count",
             limitby=[value_limit, "tags_key"],
-            referrer="tagstore.__get_tag_keys_and_top_values",
+        )
+
+        try:
+            # Keys are returned without top values if those are not ready by
+            # the deadline.
+            keys_result, values_result = snuba.bulk_raw_query(
+                [keys_params, values_params],
+                referrer="tagstore.__get_tag_keys_and_top_values",
+                deadline=deadline,
+                allow_partial=True,
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            return set()
+
+        if group_id is None:
+            key_ctor = TagKey
+        else:
+            key_ctor = functools.partial(GroupTagKey, group_id=group_id)
+        keys_with_counts = set(
+            key_ctor(key=row["tags_key"], count=row["count"]) for row in keys_result["data"]
+        )
+        values_by_key = snuba.nest_groups(
+            values_result["data"],
+            ["tags_key", "tags_value"],
+            [aggregation[2] for aggregation in aggregations],
         )
 
         # Then supplement the key objects with the top values for each.
@@ -678,6 +710,54 @@ class SnubaTagStorage(TagStorage):
         )
         return defaultdict(int, {k: v for k, v in result.items() if v})
 
+    def get_groups_seen_stats(
+        self, project_ids, group_ids, environment_ids, start=None, end=None, deadline=None
+    ):
+        filters = {"project_id": project_ids, "group_id": group_ids}
+        if environment_ids:
+            filters["environment"] = environment_ids
+
+        seen_params = snuba.SnubaQueryParams(
+            start=start,
+            end=end,
+            groupby=["group_id"],
+            filter_keys=dict(filters),
+            aggregations=[
+                ["count()", "", "times_seen"],
+                ["min", SEEN_COLUMN, "first_seen"],
+                ["max", SEEN_COLUMN, "last_seen"],
+            ],
+        )
+        user_params = snuba.SnubaQueryParams(
+            start=start,
+            end=end,
+            groupby=["group_id"],
+            filter_keys=dict(filters),
+            aggregations=[["uniq", "tags[sentry:user]", "count"]],
+        )
+
+        try:
+            seen_result, user_result = snuba.bulk_raw_query(
+                [seen_params, user_params],
+                referrer="tagstore.get_groups_seen_stats",
+                deadline=deadline,
+                allow_partial=True,
+            )
+        except (snuba.QueryOutsideRetentionError, snuba.QueryOutsideGroupActivityError):
+            return {}, defaultdict(int), False
+
+        timed_out = bool(seen_result.get("timed_out") or user_result.get("timed_out"))
+        seen_values = {
+            row["group_id"]: fix_tag_value_data(
+                {key: row[key] for key in ("times_seen", "first_seen", "last_seen")}
+            )
+            for row in seen_result["data"]
+        }
+        user_counts = defaultdict(
+            int, {row["group_id"]: row["count"] for row in user_result["data"] if row["count"]}
+        )
+        return seen_values, user_counts, timed_out
+
     def get_tag_value_paginator(
         self,
         project_id,
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import logging
+import time
 from uuid import uuid4
 
 from django.apps import apps
@@ -12,6 +14,8 @@ from sentry.exceptions import DeleteAborted
 from sentry.signals import pending_delete
 from sentry.tasks.base import instrumented_task, retry
 
+logger = logging.getLogger("sentry.deletions.async")
+
 # in prod we run with infinite retries to recover from errors
 # in debug/development, we assume these tasks generally shouldn't fail
 MAX_RETRIES = 1 if settings.DEBUG else None
@@ -74,6 +78,263 @@ def run_deletion(deletion_id):
     deletion.delete()
 
 
+def _get_deletion_root(app_label, model_name, object_id):
+    model = apps.get_model(app_label, model_name)
+    try:
+        instance = model.objects.get(id=object_id)
+    except model.DoesNotExist:
+        return None
+
+    if getattr(instance, "status", None) == ObjectStatus.VISIBLE:
+        raise DeleteAborted
+    return instance
+
+
+def _is_pending_shard(checkpoint, stage, shard_key):
+    return checkpoint["stage"] == stage and shard_key in (checkpoint["pending"] or ())
+
+
+def _restart_sharded_deletion(instance, transaction_id=None, actor_id=None):
+    # Without the checkpoint it is unknown which stages are done, so the
+    # deletion starts over with the first one. Stages that already finished
+    # have nothing left to delete.
+    logger.warning(
+        "object.delete.checkpoint_missing",
+        extra={
+            "object_id": instance.id,
+            "transaction_id": transaction_id,
+            "model": type(instance).__name__,
+        },
+    )
+    schedule_sharded_deletion(instance, transaction_id=transaction_id, actor_id=actor_id)
+
+
+def schedule_sharded_deletion(instance, transaction_id=None, actor_id=None, countdown=None):
+    run_sharded_deletion.apply_async(
+        kwargs={
+            "app_label": instance._meta.app_label,
+            "model_name": type(instance).__name__,
+            "object_id": instance.id,
+            "transaction_id": transaction_id,
+            "actor_id": actor_id,
+        },
+        countdown=countdown,
+    )
+
+
+@instrumented_task(
+    name="sentry.tasks.deletion.run_sharded_deletion",
+    queue="cleanup",
+    default_retry_delay=60 * 5,
+    max_retries=MAX_RETRIES,
+)
+@retry(exclude=(DeleteAborted,))
+def run_sharded_deletion(
+    app_label, model_name, object_id, transaction_id=None, actor_id=None, **kwargs
+):
+    """
+    Deletes the child relations of an object in stages of parallel shards
+    (see `sentry.deletions.scheduler`), and the object itself once all stages
+    are done. This task starts every stage, and is called again by the last
+    shard of a stage to finish.
+    """
+    from sentry import deletions
+    from sentry.app import locks
+    from sentry.deletions import scheduler
+    from sentry.utils.retries import TimedRetryPolicy
+
+    transaction_id = transaction_id or uuid4().hex
+
+    try:
+        instance = _get_deletion_root(app_label, model_name, object_id)
+    except DeleteAborted:
+        scheduler.clear_checkpoint(app_label, model_name, object_id)
+        raise
+
+    if instance is None:
+        scheduler.clear_checkpoint(app_label, model_name, object_id)
+        return
+
+    task = deletions.get(
+        model=type(instance),
+        query={"id": object_id},
+        transaction_id=transaction_id,
+        actor_id=actor_id,
+    )
+    task.mark_deletion_in_progress([instance])
+
+    lock = locks.get(scheduler.get_checkpoint_key(app_label, model_name, object_id), duration=10)
+    with TimedRetryPolicy(10)(lock.acquire):
+        checkpoint = scheduler.get_checkpoint(app_label, model_name, object_id)
+        if checkpoint is None:
+            checkpoint = {
+                "num_shards": settings.SENTRY_DELETIONS_NUM_SHARDS,
+                "stage": 0,
+                "pending": None,
+            }
+        elif not checkpoint["pending"]:
+            checkpoint["stage"] += 1
+            checkpoint["pending"] = None
+
+        plan = scheduler.get_deletion_plan(
+            deletions.default_manager,
+            scheduler.get_child_relations(task, instance),
+            checkpoint["num_shards"],
+        )
+
+        shards = []
+        if checkpoint["stage"] < len(plan):
+            shards = plan[checkpoint["stage"]]
+            if checkpoint["pending"] is None:
+                checkpoint["pending"] = [scheduler.get_shard_key(*shard) for shard in shards]
+            else:
+                # A previous attempt already started this stage, resume the
+                # shards which have not finished.
+                shards = [
+                    shard
+                    for shard in shards
+                    if scheduler.get_shard_key(*shard) in checkpoint["pending"]
+                ]
+        else:
+            checkpoint["stage"] = len(plan)
+            checkpoint["pending"] = []
+        scheduler.save_checkpoint(app_label, model_name, object_id, checkpoint)
+
+    if shards:
+        logger.info(
+            "object.delete.stage",
+            extra={
+                "object_id": object_id,
+                "transaction_id": transaction_id,
+                "model": model_name,
+                "stage": checkpoint["stage"],
+                "stages": len(plan),
+                "shards": len(shards),
+            },
+        )
+        for relation_index, shard_id in shards:
+            run_deletion_shard.delay(
+                app_label=app_label,
+                model_name=model_name,
+                object_id=object_id,
+                stage=checkpoint["stage"],
+                relation_index=relation_index,
+                shard_id=shard_id,
+                num_shards=checkpoint["num_shards"] if shard_id is not None else None,
+                transaction_id=transaction_id,
+                actor_id=actor_id,
+            )
+        return
+
+    # All child relations are gone, anything that was added in the meantime
+    # is deleted along with the object.
+    has_more = task.chunk()
+    if has_more:
+        schedule_sharded_deletion(
+            instance, transaction_id=transaction_id, actor_id=actor_id, countdown=15
+        )
+        return
+
+    scheduler.clear_checkpoint(app_label, model_name, object_id)
+
+
+@instrumented_task(
+    name="sentry.tasks.deletion.run_deletion_shard",
+    queue="cleanup",
+    default_retry_delay=60 * 5,
+    max_retries=MAX_RETRIES,
+)
+@retry(exclude=(DeleteAborted,))
+def run_deletion_shard(
+    app_label,
+    model_name,
+    object_id,
+    stage,
+    relation_index,
+    shard_id=None,
+    num_shards=None,
+    transaction_id=None,
+    actor_id=None,
+    **kwargs
+):
+    """
+    Deletes one shard of a child relation of an object that is deleted by
+    `run_sharded_deletion`.
+    """
+    from sentry import deletions
+    from sentry.app import locks
+    from sentry.deletions import scheduler
+    from sentry.utils.retries import TimedRetryPolicy
+
+    instance = _get_deletion_root(app_label, model_name, object_id)
+    if instance is None:
+        return
+
+    shard_key = scheduler.get_shard_key(relation_index, shard_id)
+    checkpoint = scheduler.get_checkpoint(app_label, model_name, object_id)
+    if checkpoint is None:
+        _restart_sharded_deletion(instance, transaction_id=transaction_id, actor_id=actor_id)
+        return
+    if not _is_pending_shard(checkpoint, stage, shard_key):
+        # Another attempt already finished this shard.
+        return
+
+    root_task = deletions.get(
+        model=type(instance),
+        query={"id": object_id},
+        transaction_id=transaction_id,
+        actor_id=actor_id,
+    )
+    relation = scheduler.get_child_relations(root_task, instance)[relation_index]
+    task = deletions.get(
+        transaction_id=transaction_id, actor_id=actor_id, task=relation.task, **relation.params
+    )
+
+    start = time.time()
+    has_more = True
+    delay = 0
+    while has_more and time.time() - start < scheduler.SHARD_TIME_BUDGET:
+        delay = scheduler.get_throttle_delay(task.chunk_size)
+        if delay:
+            break
+        if shard_id is None:
+            has_more = task.chunk()
+        else:
+            has_more = task.chunk(num_shards=num_shards, shard_id=shard_id)
+
+    if has_more:
+        run_deletion_shard.apply_async(
+            kwargs={
+                "app_label": app_label,
+                "model_name": model_name,
+                "object_id": object_id,
+                "stage": stage,
+                "relation_index": relation_index,
+                "shard_id": shard_id,
+                "num_shards": num_shards,
+                "transaction_id": transaction_id,
+                "actor_id": actor_id,
+            },
+            countdown=delay,
+        )
+        return
+
+    lock = locks.get(scheduler.get_checkpoint_key(app_label, model_name, object_id), duration=10)
+    with TimedRetryPolicy(10)(lock.acquire):
+        checkpoint = scheduler.get_checkpoint(app_label, model_name, object_id)
+        if checkpoint is not None:
+            if not _is_pending_shard(checkpoint, stage, shard_key):
+                return
+            checkpoint["pending"].remove(shard_key)
+            scheduler.save_checkpoint(app_label, model_name, object_id, checkpoint)
+
+    if checkpoint is None:
+        _restart_sharded_deletion(instance, transaction_id=transaction_id, actor_id=actor_id)
+    elif not checkpoint["pending"]:
+        # This was the last shard of its stage, start the next one.
+        schedule_sharded_deletion(instance, transaction_id=transaction_id, actor_id=actor_id)
+
+
 @instrumented_task(
     name="sentry.tasks.deletion.revoke_api_tokens",
     queue="cleanup",
@@ -115,7 +376,6 @@ def revoke_api_tokens(object_id, transaction_id=None, timestamp=None, **kwargs):
 )
 @retry(exclude=(DeleteAborted,))
 def delete_organization(object_id, transaction_id=None, actor_id=None, **kwargs):
-    from sentry import deletions
     from sentry.models import Organization, OrganizationStatus
 
     try:
@@ -130,18 +390,9 @@ def delete_organization(object_id, transaction_id=None, actor_id=None, **kwargs)
     if instance.status != OrganizationStatus.DELETION_IN_PROGRESS:
         pending_delete.send(sender=type(instance), instance=instance)
 
-    task = deletions.get(
-        model=Organization,
-        query={"id": object_id},
-        transaction_id=transaction_id or uuid4().hex,
-        actor_id=actor_id,
+    schedule_sharded_deletion(
+        instance, transaction_id=transaction_id or uuid4().hex, actor_id=actor_id
     )
-    has_more = task.chunk()
-    if has_more:
-        delete_organization.apply_async(
-            kwargs={"object_id": object_id, "transaction_id": transaction_id, "actor_id": actor_id},
-            countdown=15,
-        )
 
 
 @instrumented_task(
@@ -181,7 +432,6 @@ def delete_team(object_id, transaction_id=None, **kwargs):
 )
 @retry(exclude=(DeleteAborted,))
 def delete_project(object_id, transaction_id=None, **kwargs):
-    from sentry import deletions
     from sentry.models import Project, ProjectStatus
 
     try:
@@ -192,14 +442,7 @@ def delete_project(object_id, transaction_id=None, **kwargs):
     if instance.status == ProjectStatus.VISIBLE:
         raise DeleteAborted
 
-    task = deletions.get(
-        model=Project, query={"id": object_id}, transaction_id=transaction_id or uuid4().hex
-    )
-    has_more = task.chunk()
-    if has_more:
-        delete_project.apply_async(
-            kwargs={"object_id": object_id, "transaction_id": transaction_id}, countdown=15
-        )
+    schedule_sharded_deletion(instance, transaction_id=transaction_id or uuid4().hex)
 
 
 @instrumented_task(
@@ -1,7 +1,9 @@
 from __future__ import absolute_import
 
 import logging
+import time
 
+from django.apps import apps
 from django.db import DataError, IntegrityError, router, transaction
 from django.db.models import F
 
@@ -9,6 +11,7 @@ from sentry import eventstream
 from sentry.app import tsdb
 from sentry.similarity import features
 from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics, redis
 
 logger = logging.getLogger("sentry.merge")
 delete_logger = logging.getLogger("sentry.deletions.async")
@@ -16,6 +19,49 @@ delete_logger = logging.getLogger("sentry.deletions.async")
 
 EXTRA_MERGE_MODELS = []
 
+# Batches of related rows are resized to take about this long, which keeps
+# the time row locks are held on hot groups short.
+TARGET_BATCH_DURATION = 0.5
+DEFAULT_BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 10000
+
+# How long a `merge_group_relation` task moves rows before it re-enqueues
+# itself.
+TASK_TIME_BUDGET = 10
+
+# The relations that are still being moved are tracked in Redis. The TTL is
+# refreshed whenever a relation finishes.
+MERGE_STATE_TIMEOUT = 60 * 60 * 24
+
+
+def get_merge_models():
+    from sentry.models import (
+        Activity,
+        GroupAssignee,
+        GroupEnvironment,
+        GroupHash,
+        GroupRuleStatus,
+        GroupSubscription,
+        EventAttachment,
+        UserReport,
+        GroupRedirect,
+        GroupMeta,
+    )
+
+    return tuple(EXTRA_MERGE_MODELS) + (
+        Activity,
+        GroupAssignee,
+        GroupEnvironment,
+        GroupHash,
+        GroupRuleStatus,
+        GroupSubscription,
+        EventAttachment,
+        UserReport,
+        GroupRedirect,
+        GroupMeta,
+    )
+
 
 @instrumented_task(
     name="sentry.tasks.merge.merge_groups",
@@ -29,24 +75,11 @@ def merge_groups(
     transaction_id=None,
     recursed=False,
     eventstream_state=None,
+    relations_merged=False,
     **kwargs
 ):
     # TODO(mattrobenolt): Write tests for all of this
-    from sentry.models import (
-        Activity,
-        Group,
-        GroupAssignee,
-        GroupEnvironment,
-        GroupHash,
-        GroupRuleStatus,
-        GroupSubscription,
-        Environment,
-        EventAttachment,
-        UserReport,
-        GroupRedirect,
-        GroupMeta,
-        get_group_with_redirect,
-    )
+    from sentry.models import Group, Environment, GroupRedirect, get_group_with_redirect
 
     if not (from_object_ids and to_object_id):
         logger.error("group.malformed.missing_params", extra={"transaction_id": transaction_id})
@@ -90,19 +123,20 @@ def merge_groups(
             extra={"transaction_id": transaction_id, "old_object_id": from_object_id},
         )
     else:
-        model_list = tuple(EXTRA_MERGE_MODELS) + (
-            Activity,
-            GroupAssignee,
-            GroupEnvironment,
-            GroupHash,
-            GroupRuleStatus,
-            GroupSubscription,
-            EventAttachment,
-            UserReport,
-            GroupRedirect,
-            GroupMeta,
-        )
+        model_list = get_merge_models()
+
+        if not relations_merged:
+            plan = get_merge_plan(model_list, group)
+            if plan:
+                # The related models are moved by parallel tasks. The last one
+                # to finish continues the merge of this group.
+                dispatch_merge_plan(
+                    plan, from_object_ids, new_group, transaction_id, eventstream_state
+                )
+                return
 
+        # Rows that were added while the relations were being merged are
+        # moved here, or planned again if there are too many of them.
         has_more = merge_objects(
             model_list, group, new_group, logger=logger, transaction_id=transaction_id
         )
@@ -220,60 +254,288 @@ def _get_event_environment(event, project, cache):
     return cache[environment_name]
 
 
-def merge_objects(models, group, new_group, limit=1000, logger=None, transaction_id=None):
-    has_more = False
+def get_merge_plan(models, group):
+    """
+    Returns the number of rows to move for every related model that has any,
+    keyed by ``(app_label, model_name)``.
+    """
+    plan = {}
     for model in models:
-        all_fields = [f.name for f in model._meta.get_fields()]
+        _, queryset, _ = _get_group_querysets(model, group)
+        count = queryset.count()
+        if count:
+            plan[(model._meta.app_label, model._meta.model_name)] = count
+    return plan
 
-        # Not all models have a 'project' or 'project_id' field, but we make a best effort
-        # to filter on one if it is available.
-        # Also note that all_fields doesn't contain f.attname
-        # (django ForeignKeys have only attribute "attname" where "_id" is implicitly appended)
-        # but we still want to check for "project_id" because some models define a project_id bigint.
-        has_project = "project_id" in all_fields or "project" in all_fields
 
-        if has_project:
-            project_qs = model.objects.filter(project_id=group.project_id)
-        else:
-            project_qs = model.objects.all()
+def _get_merge_state_key(from_object_id, to_object_id):
+    return u"merge:pending:{}:{}".format(from_object_id, to_object_id)
 
-        has_group = "group" in all_fields
-        if has_group:
-            queryset = project_qs.filter(group=group)
-        else:
-            queryset = project_qs.filter(group_id=group.id)
 
-        for obj in queryset[:limit]:
-            try:
-                with transaction.atomic(using=router.db_for_write(model)):
-                    if has_group:
-                        project_qs.filter(id=obj.id).update(group=new_group)
-                    else:
-                        project_qs.filter(id=obj.id).update(group_id=new_group.id)
-            except IntegrityError:
-                delete = True
-            else:
-                delete = False
-
-            if delete:
-                # Before deleting, we want to merge in counts
-                if hasattr(model, "merge_counts"):
-                    obj.merge_counts(new_group)
-
-                obj_id = obj.id
-                obj.delete()
-
-                if logger is not None:
-                    delete_logger.debug(
-                        "object.delete.executed",
-                        extra={
-                            "object_id": obj_id,
-                            "transaction_id": transaction_id,
-                            "model": model.__name__,
-                        },
-                    )
+def _get_merge_state_client(key):
+    return redis.clusters.get("default").get_local_client_for_key(key)
+
+
+def dispatch_merge_plan(plan, from_object_ids, new_group, transaction_id, eventstream_state):
+    from_object_id = from_object_ids[0]
+    state_key = _get_merge_state_key(from_object_id, new_group.id)
+    with _get_merge_state_client(state_key).pipeline() as pipe:
+        pipe.delete(state_key)
+        pipe.sadd(state_key, *sorted("%s.%s" % key for key in plan))
+        pipe.expire(state_key, MERGE_STATE_TIMEOUT)
+        pipe.execute()
+
+    logger.info(
+        "merge.planned",
+        extra={
+            "transaction_id": transaction_id,
+            "new_group_id": new_group.id,
+            "old_group_id": from_object_id,
+            "rows": sum(plan.values()),
+            "models": len(plan),
+        },
+    )
+
+    for (app_label, model_name), count in sorted(plan.items()):
+        merge_group_relation.delay(
+            app_label=app_label,
+            model_name=model_name,
+            from_object_ids=list(from_object_ids),
+            to_object_id=new_group.id,
+            transaction_id=transaction_id,
+            eventstream_state=eventstream_state,
+            total=count,
+        )
+
+
+@instrumented_task(
+    name="sentry.tasks.merge.merge_group_relation",
+    queue="merge",
+    default_retry_delay=60 * 5,
+    max_retries=None,
+)
+def merge_group_relation(
+    app_label,
+    model_name,
+    from_object_ids,
+    to_object_id,
+    transaction_id=None,
+    eventstream_state=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    total=None,
+    merged=0,
+    **kwargs
+):
+    """
+    Moves the rows of a single related model from the first of the "from"
+    groups to the new group.
+    """
+    from sentry.models import Group
+
+    model = apps.get_model(app_label, model_name)
+    from_object_id = from_object_ids[0]
+
+    try:
+        group = Group.objects.get(id=from_object_id)
+        new_group = Group.objects.get(id=to_object_id)
+    except Group.DoesNotExist:
+        logger.warn(
+            "group.malformed.invalid_id",
+            extra={"transaction_id": transaction_id, "old_object_id": from_object_id},
+        )
+        return
+
+    start = time.time()
+    moved = 0
+    while True:
+        batch_start = time.time()
+        count = merge_object_batch(
+            model, group, new_group, batch_size, logger=logger, transaction_id=transaction_id
+        )
+        moved += count
+        if count < batch_size:
+            has_more = False
+            break
+
+        duration = time.time() - batch_start
+        metrics.timing("merge.batch.duration", duration, tags={"model": model.__name__})
+        batch_size = get_next_batch_size(batch_size, duration)
+
+        if time.time() - start > TASK_TIME_BUDGET:
             has_more = True
+            break
+
+    merged += moved
+    metrics.incr("merge.rows", amount=moved, tags={"model": model.__name__}, skip_internal=True)
+
+    duration = time.time() - start
+    eta = None
+    if total is not None and moved and has_more:
+        eta = max(total - merged, 0) * duration / moved
+    logger.info(
+        "merge.progress",
+        extra={
+            "transaction_id": transaction_id,
+            "new_group_id": new_group.id,
+            "old_group_id": group.id,
+            "model": model.__name__,
+            "merged": merged,
+            "total": total,
+            "batch_size": batch_size,
+            "eta": eta,
+        },
+    )
+
+    if has_more:
+        merge_group_relation.delay(
+            app_label=app_label,
+            model_name=model_name,
+            from_object_ids=from_object_ids,
+            to_object_id=to_object_id,
+            transaction_id=transaction_id,
+            eventstream_state=eventstream_state,
+            batch_size=batch_size,
+            total=total,
+            merged=merged,
+        )
+        return
+
+    key = _get_merge_state_key(from_object_id, to_object_id)
+    with _get_merge_state_client(key).pipeline() as pipe:
+        pipe.srem(key, "%s.%s" % (app_label, model_name))
+        pipe.scard(key)
+        pipe.expire(key, MERGE_STATE_TIMEOUT)
+        removed, pending, _ = pipe.execute()
+
+    if pending:
+        return
 
-        if has_more:
+    if removed:
+        # This was the last relation to be merged, continue with the group.
+        relations_merged = True
+    else:
+        # The state is gone, so it is unknown whether the other relations are
+        # done. Plan the merge of the group again, which only picks up the
+        # rows that are left.
+        logger.warn(
+            "merge.state_missing",
+            extra={
+                "transaction_id": transaction_id,
+                "new_group_id": new_group.id,
+                "old_group_id": group.id,
+                "model": model.__name__,
+            },
+        )
+        relations_merged = False
+
+    merge_groups.delay(
+        from_object_ids=from_object_ids,
+        to_object_id=to_object_id,
+        transaction_id=transaction_id,
+        recursed=True,
+        eventstream_state=eventstream_state,
+        relations_merged=relations_merged,
+    )
+
+
+def get_next_batch_size(batch_size, duration):
+    """
+    Scales the batch size towards `TARGET_BATCH_DURATION`, changing it by at
+    most a factor of two at a time.
+    """
+    if duration <= 0:
+        scaled = batch_size * 2
+    else:
+        scaled = batch_size * TARGET_BATCH_DURATION / duration
+    scaled = min(max(scaled, batch_size / 2.0), batch_size * 2.0)
+    return int(min(max(scaled, MIN_BATCH_SIZE), MAX_BATCH_SIZE))
+
+
+def _get_group_querysets(model, group):
+    all_fields = [f.name for f in model._meta.get_fields()]
+
+    # Not all models have a 'project' or 'project_id' field, but we make a best effort
+    # to filter on one if it is available.
+    # Also note that all_fields doesn't contain f.attname
+    # (django ForeignKeys have only attribute "attname" where "_id" is implicitly appended)
+    # but we still want to check for "project_id" because some models define a project_id bigint.
+    has_project = "project_id" in all_fields or "project" in all_fields
+
+    if has_project:
+        project_qs = model.objects.filter(project_id=group.project_id)
+    else:
+        project_qs = model.objects.all()
+
+    has_group = "group" in all_fields
+    if has_group:
+        queryset = project_qs.filter(group=group)
+    else:
+        queryset = project_qs.filter(group_id=group.id)
+
+    return project_qs, queryset, has_group
+
+
+def merge_object_batch(model, group, new_group, limit, logger=None, transaction_id=None):
+    """
+    Moves up to ``limit`` rows of ``model`` to the new group and returns the
+    number of rows that were moved or deleted.
+    """
+    project_qs, queryset, has_group = _get_group_querysets(model, group)
+
+    ids = list(queryset.values_list("id", flat=True)[:limit])
+    if not ids:
+        return 0
+
+    try:
+        with transaction.atomic(using=router.db_for_write(model)):
+            if has_group:
+                project_qs.filter(id__in=ids).update(group=new_group)
+            else:
+                project_qs.filter(id__in=ids).update(group_id=new_group.id)
+    except IntegrityError:
+        # Some of the rows conflict with rows of the new group, move them one
+        # by one to find out which.
+        pass
+    else:
+        return len(ids)
+
+    for obj in model.objects.filter(id__in=ids):
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                if has_group:
+                    project_qs.filter(id=obj.id).update(group=new_group)
+                else:
+                    project_qs.filter(id=obj.id).update(group_id=new_group.id)
+        except IntegrityError:
+            delete = True
+        else:
+            delete = False
+
+        if delete:
+            # Before deleting, we want to merge in counts
+            if hasattr(model, "merge_counts"):
+                obj.merge_counts(new_group)
+
+            obj_id = obj.id
+            obj.delete()
+
+            if logger is not None:
+                delete_logger.debug(
+                    "object.delete.executed",
+                    extra={
+                        "object_id": obj_id,
+                        "transaction_id": transaction_id,
+                        "model": model.__name__,
+                    },
+                )
+
+    return len(ids)
+
+
+def merge_objects(models, group, new_group, limit=1000, logger=None, transaction_id=None):
+    for model in models:
+        if merge_object_batch(
+            model, group, new_group, limit, logger=logger, transaction_id=transaction_id
+        ):
             return True
-    return has_more
+    return False
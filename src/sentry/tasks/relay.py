@@ -1,16 +1,20 @@
 from __future__ import absolute_import
 
 import logging
+import six
 
 from django.conf import settings
 from django.core.cache import cache
 
-from sentry.models.projectkey import ProjectKey
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
+from sentry.utils.iterators import chunked
 
 logger = logging.getLogger(__name__)
 
+# Number of project configs generated and written to the cache at once.
+CONFIG_CHUNK_SIZE = 500
+
 
 @instrumented_task(name="sentry.tasks.relay.update_config_cache", queue="relay_config")
 def update_config_cache(generate, organization_id=None, project_id=None, update_reason=None):
@@ -29,7 +33,7 @@ def update_config_cache(generate, organization_id=None, project_id=None, update_
 
     from sentry.models import Project
     from sentry.relay import projectconfig_cache
-    from sentry.relay.config import get_project_config
+    from sentry.relay.config import get_project_configs_bulk
 
     # Delete key before generating configs such that we never have an outdated
     # but valid cache.
@@ -45,21 +49,21 @@ def update_config_cache(generate, organization_id=None, project_id=None, update_
     elif organization_id:
         # XXX(markus): I feel like we should be able to cache this but I don't
         # want to add another method to src/sentry/db/models/manager.py
-        projects = Project.objects.filter(organization_id=organization_id)
+        projects = Project.objects.filter(organization_id=organization_id).iterator()
 
     if generate:
-        project_keys = {}
-        for key in ProjectKey.objects.filter(project_id__in=[project.id for project in projects]):
-            project_keys.setdefault(key.project_id, []).append(key)
-
-        project_configs = {}
-        for project in projects:
-            project_config = get_project_config(
-                project, project_keys=project_keys.get(project.id, []), full_config=True
+        # Configs are generated in chunks, so that organizations with many
+        # projects neither need all configs in memory nor wait for all of
+        # them before the first ones are written.
+        for chunk in chunked(projects, CONFIG_CHUNK_SIZE):
+            with metrics.timer("relay.projectconfig_cache.generate_chunk"):
+                project_configs = get_project_configs_bulk(chunk, full_config=True)
+            projectconfig_cache.set_many(
+                {
+                    project_id: project_config.to_dict()
+                    for project_id, project_config in six.iteritems(project_configs)
+                }
             )
-            project_configs[project.id] = project_config.to_dict()
-
-        projectconfig_cache.set_many(project_configs)
     else:
         projectconfig_cache.delete_many([project.id for project in projects])
 
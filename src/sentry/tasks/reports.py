@@ -11,11 +11,13 @@ from collections import OrderedDict, namedtuple
 from datetime import datetime, timedelta
 
 import pytz
+import six
 from django.utils import dateformat, timezone
 
 from sentry.app import tsdb
 from sentry.models import (
     Activity,
+    Group,
     GroupStatus,
     Organization,
     OrganizationStatus,
@@ -42,6 +44,9 @@ logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 30000
 
+# How many project reports of an organization are built and stored at once.
+PROJECT_BATCH_SIZE = 100
+
 
 def _get_organization_queryset():
     return Organization.objects.filter(status=OrganizationStatus.VISIBLE)
@@ -171,33 +176,51 @@ def _query_tsdb_chunked(func, issue_ids, start, stop, rollup):
     return combined
 
 
-def prepare_project_series(start__stop, project, rollup=60 * 60 * 24):
+def prepare_project_series_many(start__stop, projects, rollup=60 * 60 * 24):
     start, stop = start__stop
     resolution, series = tsdb.get_optimal_rollup_series(start, stop, rollup)
     assert resolution == rollup, "resolution does not match requested value"
     clean = functools.partial(clean_series, start, stop, rollup)
-    issue_ids = project.group_set.filter(
-        status=GroupStatus.RESOLVED, resolved_at__gte=start, resolved_at__lt=stop
-    ).values_list("id", flat=True)
+    project_ids = [project.id for project in projects]
+    issue_project_ids = dict(
+        Group.objects.filter(
+            project_id__in=project_ids,
+            status=GroupStatus.RESOLVED,
+            resolved_at__gte=start,
+            resolved_at__lt=stop,
+        ).values_list("id", "project_id")
+    )
 
-    tsdb_range = _query_tsdb_chunked(tsdb.get_range, issue_ids, start, stop, rollup)
+    tsdb_range = _query_tsdb_chunked(tsdb.get_range, list(issue_project_ids), start, stop, rollup)
 
-    return merge_series(
-        reduce(
-            merge_series,
-            map(clean, tsdb_range.values()),
-            clean([(timestamp, 0) for timestamp in series]),
-        ),
-        clean(
-            tsdb.get_range(tsdb.models.project, [project.id], start, stop, rollup=rollup)[
-                project.id
-            ]
-        ),
-        lambda resolved, total: (resolved, total - resolved),  # unresolved
-    )
+    # The resolved issue counts of each project are summed up in place,
+    # rather than merging a new series for every issue.
+    empty_series = clean([(timestamp, 0) for timestamp in series])
+    resolved = {project_id: [value for _, value in empty_series] for project_id in project_ids}
+    for issue_id, issue_series in six.iteritems(tsdb_range):
+        totals = resolved[issue_project_ids[issue_id]]
+        issue_series = clean(issue_series)
+        assert len(issue_series) == len(totals), "series must be same length"
+        for i, (_, value) in enumerate(issue_series):
+            totals[i] += value
 
+    project_range = tsdb.get_range(tsdb.models.project, project_ids, start, stop, rollup=rollup)
 
-def prepare_project_aggregates(ignore__stop, project):
+    return {
+        project_id: merge_series(
+            [(timestamp, resolved[project_id][i]) for i, (timestamp, _) in enumerate(empty_series)],
+            clean(project_range[project_id]),
+            lambda resolved, total: (resolved, total - resolved),  # unresolved
+        )
+        for project_id in project_ids
+    }
+
+
+def prepare_project_series(start__stop, project, rollup=60 * 60 * 24):
+    return prepare_project_series_many(start__stop, [project], rollup)[project.id]
+
+
+def prepare_project_aggregates_many(ignore__stop, projects):
     # TODO: This needs to return ``None`` for periods that don't have any data
     # (because the project is not old enough) and possibly extrapolate for
     # periods that only have partial periods.
@@ -205,27 +228,37 @@ def prepare_project_aggregates(ignore__stop, project):
     segments = 4
     period = timedelta(days=7)
     start = stop - (period * segments)
+    project_ids = [project.id for project in projects]
 
-    def get_aggregate_value(start, stop):
-        return tsdb.get_sums(tsdb.models.project, (project.id,), start, stop, rollup=60 * 60 * 24)[
-            project.id
-        ]
+    def get_aggregate_values(start, stop):
+        return tsdb.get_sums(tsdb.models.project, project_ids, start, stop, rollup=60 * 60 * 24)
 
-    return [
-        get_aggregate_value(start + (period * i), start + (period * (i + 1) - timedelta(seconds=1)))
+    values = [
+        get_aggregate_values(
+            start + (period * i), start + (period * (i + 1) - timedelta(seconds=1))
+        )
         for i in range(segments)
     ]
 
+    return {project_id: [value[project_id] for value in values] for project_id in project_ids}
 
-def prepare_project_issue_summaries(interval, project):
+
+def prepare_project_aggregates(ignore__stop, project):
+    return prepare_project_aggregates_many(ignore__stop, [project])[project.id]
+
+
+def prepare_project_issue_summaries_many(interval, projects):
     start, stop = interval
+    project_ids = [project.id for project in projects]
 
-    queryset = project.group_set.exclude(status=GroupStatus.IGNORED)
+    queryset = Group.objects.filter(project_id__in=project_ids).exclude(status=GroupStatus.IGNORED)
 
     # Fetch all new issues.
-    new_issue_ids = set(
-        queryset.filter(first_seen__gte=start, first_seen__lt=stop).values_list("id", flat=True)
-    )
+    new_issue_ids = {project_id: set() for project_id in project_ids}
+    for issue_id, project_id in queryset.filter(
+        first_seen__gte=start, first_seen__lt=stop
+    ).values_list("id", "project_id"):
+        new_issue_ids[project_id].add(issue_id)
 
     # Fetch all regressions. This is a little weird, since there's no way to
     # tell *when* a group regressed using the Group model. Instead, we query
@@ -234,7 +267,8 @@ def prepare_project_issue_summaries(interval, project):
     # past week. (In theory, the activity table *could* be used to answer this
     # query without the subselect, but there's no suitable indexes to make it's
     # performance predictable.)
-    reopened_issue_ids = set(
+    reopened_issue_ids = {project_id: set() for project_id in project_ids}
+    for issue_id, project_id in (
         Activity.objects.filter(
             group__in=queryset.filter(
                 last_seen__gte=start,
@@ -246,36 +280,52 @@ def prepare_project_issue_summaries(interval, project):
             datetime__lt=stop,
         )
         .distinct()
-        .values_list("group_id", flat=True)
-    )
+        .values_list("group_id", "project_id")
+    ):
+        reopened_issue_ids[project_id].add(issue_id)
 
     rollup = 60 * 60 * 24
     event_counts = _query_tsdb_chunked(
-        tsdb.get_sums, new_issue_ids | reopened_issue_ids, start, stop, rollup
+        tsdb.get_sums,
+        set().union(*list(new_issue_ids.values()) + list(reopened_issue_ids.values())),
+        start,
+        stop,
+        rollup,
     )
+    project_counts = tsdb.get_sums(tsdb.models.project, project_ids, start, stop, rollup=rollup)
+
+    results = {}
+    for project_id in project_ids:
+        new_issue_count = sum(event_counts[id] for id in new_issue_ids[project_id])
+        reopened_issue_count = sum(event_counts[id] for id in reopened_issue_ids[project_id])
+        existing_issue_count = max(
+            project_counts[project_id] - new_issue_count - reopened_issue_count, 0
+        )
+        results[project_id] = [new_issue_count, reopened_issue_count, existing_issue_count]
+
+    return results
 
-    new_issue_count = sum(event_counts[id] for id in new_issue_ids)
-    reopened_issue_count = sum(event_counts[id] for id in reopened_issue_ids)
-    existing_issue_count = max(
-        tsdb.get_sums(tsdb.models.project, [project.id], start, stop, rollup=rollup)[project.id]
-        - new_issue_count
-        - reopened_issue_count,
-        0,
-    )
 
-    return [new_issue_count, reopened_issue_count, existing_issue_count]
+def prepare_project_issue_summaries(interval, project):
+    return prepare_project_issue_summaries_many(interval, [project])[project.id]
 
 
-def prepare_project_usage_summary(start__stop, project):
+def prepare_project_usage_summary_many(start__stop, projects):
     start, stop = start__stop
-    return (
-        tsdb.get_sums(
-            tsdb.models.project_total_blacklisted, [project.id], start, stop, rollup=60 * 60 * 24
-        )[project.id],
-        tsdb.get_sums(
-            tsdb.models.project_total_rejected, [project.id], start, stop, rollup=60 * 60 * 24
-        )[project.id],
+    project_ids = [project.id for project in projects]
+    blacklisted = tsdb.get_sums(
+        tsdb.models.project_total_blacklisted, project_ids, start, stop, rollup=60 * 60 * 24
     )
+    rejected = tsdb.get_sums(
+        tsdb.models.project_total_rejected, project_ids, start, stop, rollup=60 * 60 * 24
+    )
+    return {
+        project_id: (blacklisted[project_id], rejected[project_id]) for project_id in project_ids
+    }
+
+
+def prepare_project_usage_summary(start__stop, project):
+    return prepare_project_usage_summary_many(start__stop, [project])[project.id]
 
 
 def get_calendar_range(ignore__stop_time, months):
@@ -318,15 +368,22 @@ def clean_calendar_data(project, series, start, stop, rollup, timestamp=None):
     return map(remove_invalid_values, clean_series(start, stop, rollup, series))
 
 
-def prepare_project_calendar_series(interval, project):
+def prepare_project_calendar_series_many(interval, projects):
     start, stop = get_calendar_query_range(interval, 3)
 
     rollup = 60 * 60 * 24
-    series = tsdb.get_range(tsdb.models.project, [project.id], start, stop, rollup=rollup)[
-        project.id
-    ]
+    series = tsdb.get_range(
+        tsdb.models.project, [project.id for project in projects], start, stop, rollup=rollup
+    )
 
-    return clean_calendar_data(project, series, start, stop, rollup)
+    return {
+        project.id: clean_calendar_data(project, series[project.id], start, stop, rollup)
+        for project in projects
+    }
+
+
+def prepare_project_calendar_series(interval, project):
+    return prepare_project_calendar_series_many(interval, [project])[project.id]
 
 
 def build(name, fields):
@@ -334,8 +391,9 @@ def build(name, fields):
 
     cls = namedtuple(name, names)
 
-    def prepare(*args):
-        return cls(*[f(*args) for f in prepare_fields])
+    def prepare(interval, projects):
+        values = [f(interval, projects) for f in prepare_fields]
+        return {project.id: cls(*[value[project.id] for value in values]) for project in projects}
 
     def merge(target, other):
         return cls(*[f(target[i], other[i]) for i, f in enumerate(merge_fields)])
@@ -343,34 +401,45 @@ def build(name, fields):
     return cls, prepare, merge
 
 
-Report, prepare_project_report, merge_reports = build(
+Report, prepare_project_report_many, merge_reports = build(
     "Report",
     [
         (
             "series",
-            prepare_project_series,
+            prepare_project_series_many,
             functools.partial(merge_series, function=merge_sequences),
         ),
         (
             "aggregates",
-            prepare_project_aggregates,
+            prepare_project_aggregates_many,
             functools.partial(merge_sequences, function=safe_add),
         ),
-        ("issue_summaries", prepare_project_issue_summaries, merge_sequences),
-        ("usage_summary", prepare_project_usage_summary, merge_sequences),
+        ("issue_summaries", prepare_project_issue_summaries_many, merge_sequences),
+        ("usage_summary", prepare_project_usage_summary_many, merge_sequences),
         (
             "calendar_series",
-            prepare_project_calendar_series,
+            prepare_project_calendar_series_many,
             functools.partial(merge_series, function=safe_add),
         ),
     ],
 )
 
 
+def prepare_project_report(interval, project):
+    return prepare_project_report_many(interval, [project])[project.id]
+
+
 class ReportBackend(object):
     def build(self, timestamp, duration, project):
         return prepare_project_report(_to_interval(timestamp, duration), project)
 
+    def build_many(self, timestamp, duration, projects):
+        """
+        Build reports for several projects at once, returning a dictionary of
+        reports by project id.
+        """
+        return prepare_project_report_many(_to_interval(timestamp, duration), projects)
+
     def prepare(self, timestamp, duration, organization):
         """
         Build and store reports for all projects in the organization.
@@ -391,7 +460,8 @@ class DummyReportBackend(ReportBackend):
 
     def fetch(self, timestamp, duration, organization, projects):
         assert all(project.organization_id == organization.id for project in projects)
-        return map(functools.partial(self.build, timestamp, duration), projects)
+        reports = self.build_many(timestamp, duration, projects)
+        return [reports[project.id] for project in projects]
 
 
 class RedisReportBackend(ReportBackend):
@@ -417,20 +487,33 @@ class RedisReportBackend(ReportBackend):
         return Report(*json.loads(zlib.decompress(value)))
 
     def prepare(self, timestamp, duration, organization):
-        reports = {}
-        for project in organization.project_set.all():
-            reports[project.id] = self.__encode(self.build(timestamp, duration, project))
-
-        if not reports:
+        projects = list(organization.project_set.all())
+        if not projects:
             # XXX: HMSET requires at least one key/value pair, so we need to
             # protect ourselves here against organizations that were created
             # but haven't set up any projects yet.
             return
 
+        key = self.__make_key(timestamp, duration, organization)
+
+        # Reports are stored in batches, and the reports stored by an earlier
+        # attempt are kept, so that a retry only builds the missing ones.
         with self.cluster.map() as client:
-            key = self.__make_key(timestamp, duration, organization)
-            client.hmset(key, reports)
-            client.expire(key, self.ttl)
+            result = client.hkeys(key)
+        prepared = set(int(project_id) for project_id in result.value)
+        projects = [project for project in projects if project.id not in prepared]
+
+        for batch in chunked(projects, PROJECT_BATCH_SIZE):
+            reports = self.build_many(timestamp, duration, batch)
+            with self.cluster.map() as client:
+                client.hmset(
+                    key,
+                    {
+                        project_id: self.__encode(report)
+                        for project_id, report in six.iteritems(reports)
+                    },
+                )
+                client.expire(key, self.ttl)
 
     def fetch(self, timestamp, duration, organization, projects):
         with self.cluster.map() as client:
@@ -808,3 +808,137 @@ def save_event(
     cache_key=None, data=None, start_time=None, event_id=None, project_id=None, **kwargs
 ):
     _do_save_event(cache_key, data, start_time, event_id, project_id, **kwargs)
+
+
+def _do_save_events(events):
+    """
+    Saves a batch of events to the database.
+
+    Every item of `events` is a dict with the same keys as the arguments of
+    `save_event`. Error events are saved together through
+    `save_error_events`, everything else falls back to `_do_save_event`.
+    """
+
+    from sentry.event_manager import save_error_events
+
+    jobs = []
+
+    for event in events:
+        cache_key = event.get("cache_key")
+        data = event.get("data")
+        start_time = event.get("start_time")
+        event_id = event.get("event_id")
+        project_id = event.get("project_id")
+
+        if cache_key and data is None:
+            with metrics.timer("tasks.store.do_save_events.get_cache"):
+                data = default_cache.get(cache_key)
+
+        if data and data.get("type") == "transaction":
+            _do_save_event(cache_key, data, start_time, event_id, project_id)
+            continue
+
+        if data is not None:
+            data = CanonicalKeyDict(data)
+
+        if event_id is None and data is not None:
+            event_id = data["event_id"]
+
+        if project_id is None:
+            project_id = data.pop("project")
+
+        # See `_do_save_event` for why raw events are deleted even if there
+        # is no data.
+        if not data or reprocessing.event_supports_reprocessing(data):
+            with metrics.timer("tasks.store.do_save_events.delete_raw_event"):
+                delete_raw_event(project_id, event_id, allow_hint_clear=True)
+
+        if not data:
+            metrics.incr(
+                "events.failed", tags={"reason": "cache", "stage": "post"}, skip_internal=False
+            )
+            continue
+
+        jobs.append(
+            {
+                "data": data,
+                "project_id": project_id,
+                "start_time": start_time,
+                "cache_key": cache_key,
+                # The arguments to save the event on its own if the batch fails.
+                "save_event_kwargs": {
+                    "cache_key": cache_key,
+                    "data": event.get("data"),
+                    "start_time": start_time,
+                    "event_id": event_id,
+                    "project_id": project_id,
+                },
+            }
+        )
+
+    if not jobs:
+        return
+
+    with metrics.timer("tasks.store.do_save_events.fetch_projects"):
+        projects = {
+            p.id: p
+            for p in Project.objects.get_many_from_cache(set(job["project_id"] for job in jobs))
+        }
+
+    retry_jobs = []
+    try:
+        with metrics.timer("tasks.store.do_save_events.save_error_events"):
+            save_error_events([job for job in jobs if job["project_id"] in projects], projects)
+    except Exception:
+        error_logger.exception("save_events.failed", extra={"events": len(jobs)})
+        metrics.incr("tasks.store.do_save_events.fallback", skip_internal=False)
+        # Events that were not grouped yet are saved one by one, so that a bad
+        # event only loses itself. Grouped events are already counted and are
+        # given up, like `_do_save_event` does after a failure.
+        retry_jobs = [
+            job
+            for job in jobs
+            if job["project_id"] in projects
+            and job.get("group") is None
+            and job.get("hash_discarded") is None
+        ]
+
+    retry_job_ids = set(id(job) for job in retry_jobs)
+    for job in jobs:
+        if id(job) in retry_job_ids:
+            continue
+
+        cache_key = job["cache_key"]
+        if cache_key:
+            default_cache.delete(cache_key)
+
+            # For the unlikely case that we did not manage to persist the
+            # event we also delete the key always.
+            event = job.get("event")
+            if event is None or features.has(
+                "organizations:event-attachments", event.project.organization, actor=None
+            ):
+                attachment_cache.delete(cache_key)
+
+        if job["start_time"]:
+            metrics.timing(
+                "events.time-to-process",
+                time() - job["start_time"],
+                instance=job["data"]["platform"],
+            )
+
+    for job in retry_jobs:
+        try:
+            _do_save_event(**job["save_event_kwargs"])
+        except Exception:
+            error_logger.exception("save_event.failed", extra={"cache_key": job["cache_key"]})
+
+
+@instrumented_task(
+    name="sentry.tasks.store.save_events",
+    queue="events.save_event",
+    time_limit=125,
+    soft_time_limit=120,
+)
+def save_events(events, **kwargs):
+    _do_save_events(events)
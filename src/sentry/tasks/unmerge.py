@@ -1,8 +1,9 @@
 from __future__ import absolute_import
 
 import logging
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, namedtuple, OrderedDict
 
+from concurrent.futures import ThreadPoolExecutor
 from django.db import transaction
 
 from sentry import eventstore, eventstream
@@ -24,11 +25,17 @@ from sentry.models import (
 )
 from sentry.similarity import features
 from sentry.tasks.base import instrumented_task
+from sentry.utils import metrics
+from sentry.utils.dates import to_datetime
 from six.moves import reduce
 
 
 logger = logging.getLogger(__name__)
 
+# The number of event batches an unmerge task processes before it
+# re-enqueues itself. Denormalizations are repaired once per task.
+DEFAULT_BATCHES_PER_TASK = 10
+
 
 def cache(function):
     results = {}
@@ -270,20 +277,6 @@ def collect_group_environment_data(events):
     return results
 
 
-def repair_group_environment_data(caches, project, events):
-    for (group_id, env_name), first_release in collect_group_environment_data(events).items():
-        fields = {}
-        if first_release:
-            fields["first_release"] = caches["Release"](project.organization_id, first_release)
-
-        GroupEnvironment.objects.create_or_update(
-            environment_id=caches["Environment"](project.organization_id, env_name).id,
-            group_id=group_id,
-            defaults=fields,
-            values=fields,
-        )
-
-
 def collect_tag_data(events):
     results = OrderedDict()
 
@@ -331,21 +324,6 @@ def collect_release_data(caches, project, events):
     return results
 
 
-def repair_group_release_data(caches, project, events):
-    attributes = collect_release_data(caches, project, events).items()
-    for (group_id, environment, release_id), (first_seen, last_seen) in attributes:
-        instance, created = GroupRelease.objects.get_or_create(
-            project_id=project.id,
-            group_id=group_id,
-            environment=environment,
-            release_id=release_id,
-            defaults={"first_seen": first_seen, "last_seen": last_seen},
-        )
-
-        if not created:
-            instance.update(first_seen=first_seen)
-
-
 def get_event_user_from_interface(value):
     return EventUser(
         ident=value.get("id"),
@@ -355,70 +333,153 @@ def get_event_user_from_interface(value):
     )
 
 
-def collect_tsdb_data(caches, project, events):
-    counters = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-
-    sets = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
-
-    frequencies = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(int))))
-
-    for event in events:
-        environment = caches["Environment"](project.organization_id, get_environment_name(event))
-
-        counters[event.datetime][tsdb.models.group][(event.group_id, environment.id)] += 1
-
-        user = event.data.get("user")
-        if user:
-            sets[event.datetime][tsdb.models.users_affected_by_group][
-                (event.group_id, environment.id)
-            ].add(get_event_user_from_interface(user).tag_value)
+class DenormalizationAggregates(object):
+    """\
+    Accumulates the denormalizations of many (date-descending) batches of
+    events, so that they can be repaired with a few writes at once.
 
-        frequencies[event.datetime][tsdb.models.frequent_environments_by_group][event.group_id][
-            environment.id
-        ] += 1
+    Time series data is aggregated per rollup bucket of the TSDB rather than
+    per event timestamp.
+    """
 
-        release = event.get_tag("sentry:release")
-        if release:
-            # TODO: I'm also not sure if "environment" here is correct, see
-            # similar comment above during creation.
-            grouprelease = caches["GroupRelease"](
-                event.group_id,
-                get_environment_name(event),
-                caches["Release"](project.organization_id, release).id,
+    def __init__(self, caches, project):
+        self.caches = caches
+        self.project = project
+        self.resolution = min(tsdb.get_rollups())
+        self.events = 0
+
+        # (group_id, environment name) -> first release
+        self.group_environments = OrderedDict()
+        # (group_id, environment name, release_id) -> (first_seen, last_seen)
+        self.releases = OrderedDict()
+        # (timestamp, environment_id) -> group_id -> count
+        self.counters = defaultdict(lambda: defaultdict(int))
+        # (timestamp, environment_id) -> group_id -> user tag values
+        self.users = defaultdict(lambda: defaultdict(set))
+        # timestamp -> group_id -> environment_id -> count
+        self.environment_frequencies = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        # timestamp -> (group_id, environment name, release_id) -> count
+        self.release_frequencies = defaultdict(lambda: defaultdict(int))
+
+    def get_bucket(self, timestamp):
+        return tsdb.normalize_to_epoch(timestamp, self.resolution)
+
+    def add(self, events):
+        organization_id = self.project.organization_id
+
+        for key, release in collect_group_environment_data(events).items():
+            # An earlier batch might have found a release already, which is
+            # only replaced by an older one.
+            if release or key not in self.group_environments:
+                self.group_environments[key] = release
+
+        for key, (first_seen, last_seen) in collect_release_data(
+            self.caches, self.project, events
+        ).items():
+            if key in self.releases:
+                last_seen = self.releases[key][1]
+            self.releases[key] = (first_seen, last_seen)
+
+        for event in events:
+            environment_name = get_environment_name(event)
+            environment = self.caches["Environment"](organization_id, environment_name)
+            bucket = self.get_bucket(event.datetime)
+
+            self.counters[(bucket, environment.id)][event.group_id] += 1
+
+            user = event.data.get("user")
+            if user:
+                self.users[(bucket, environment.id)][event.group_id].add(
+                    get_event_user_from_interface(user).tag_value
+                )
+
+            self.environment_frequencies[bucket][event.group_id][environment.id] += 1
+
+            release = event.get_tag("sentry:release")
+            if release:
+                release_id = self.caches["Release"](organization_id, release).id
+                self.release_frequencies[bucket][
+                    (event.group_id, environment_name, release_id)
+                ] += 1
+
+        # Features can only be recorded for events of the same group at once.
+        events_by_group = defaultdict(list)
+        for event in events:
+            events_by_group[event.group_id].append(event)
+        for group_events in events_by_group.values():
+            features.record(group_events)
+
+        self.events += len(events)
+
+    def flush(self):
+        if not self.events:
+            return
+
+        organization_id = self.project.organization_id
+
+        for (group_id, env_name), first_release in self.group_environments.items():
+            fields = {}
+            if first_release:
+                fields["first_release"] = self.caches["Release"](organization_id, first_release)
+
+            GroupEnvironment.objects.create_or_update(
+                environment_id=self.caches["Environment"](organization_id, env_name).id,
+                group_id=group_id,
+                defaults=fields,
+                values=fields,
             )
 
-            frequencies[event.datetime][tsdb.models.frequent_releases_by_group][event.group_id][
-                grouprelease.id
-            ] += 1
-
-    return counters, sets, frequencies
+        for (group_id, environment, release_id), (first_seen, last_seen) in self.releases.items():
+            instance, created = GroupRelease.objects.get_or_create(
+                project_id=self.project.id,
+                group_id=group_id,
+                environment=environment,
+                release_id=release_id,
+                defaults={"first_seen": first_seen, "last_seen": last_seen},
+            )
 
+            if not created:
+                instance.update(first_seen=first_seen)
 
-def repair_tsdb_data(caches, project, events):
-    counters, sets, frequencies = collect_tsdb_data(caches, project, events)
+        counters_by_environment = defaultdict(list)
+        for (bucket, environment_id), counts in self.counters.items():
+            timestamp = to_datetime(bucket)
+            for group_id, count in counts.items():
+                counters_by_environment[environment_id].append(
+                    (tsdb.models.group, group_id, {"timestamp": timestamp, "count": count})
+                )
 
-    for timestamp, data in counters.items():
-        for model, keys in data.items():
-            for (key, environment_id), value in keys.items():
-                tsdb.incr(model, key, timestamp, value, environment_id=environment_id)
+        for environment_id, items in counters_by_environment.items():
+            tsdb.incr_multi(items, environment_id=environment_id)
 
-    for timestamp, data in sets.items():
-        for model, keys in data.items():
-            for (key, environment_id), values in keys.items():
-                # TODO: This should use `record_multi` rather than `record`.
-                tsdb.record(model, key, values, timestamp, environment_id=environment_id)
+        for (bucket, environment_id), users in self.users.items():
+            tsdb.record_multi(
+                [
+                    (tsdb.models.users_affected_by_group, group_id, values)
+                    for group_id, values in users.items()
+                ],
+                to_datetime(bucket),
+                environment_id=environment_id,
+            )
 
-    for timestamp, data in frequencies.items():
-        tsdb.record_frequency_multi(data.items(), timestamp)
+        for bucket in set(self.environment_frequencies) | set(self.release_frequencies):
+            requests = {}
+            if bucket in self.environment_frequencies:
+                requests[tsdb.models.frequent_environments_by_group] = self.environment_frequencies[
+                    bucket
+                ]
 
+            release_counts = defaultdict(lambda: defaultdict(int))
+            for (group_id, env_name, release_id), count in self.release_frequencies[bucket].items():
+                grouprelease = self.caches["GroupRelease"](group_id, env_name, release_id)
+                release_counts[group_id][grouprelease.id] += count
+            if release_counts:
+                requests[tsdb.models.frequent_releases_by_group] = release_counts
 
-def repair_denormalizations(caches, project, events):
-    repair_group_environment_data(caches, project, events)
-    repair_group_release_data(caches, project, events)
-    repair_tsdb_data(caches, project, events)
+            if requests:
+                tsdb.record_frequency_multi(list(requests.items()), to_datetime(bucket))
 
-    for event in events:
-        features.record([event])
+        metrics.incr("unmerge.events_repaired", amount=self.events, skip_internal=True)
 
 
 def lock_hashes(project_id, source_id, fingerprints):
@@ -444,36 +505,7 @@ def unlock_hashes(project_id, fingerprints):
     ).update(state=GroupHash.State.UNLOCKED)
 
 
-@instrumented_task(name="sentry.tasks.unmerge", queue="unmerge")
-def unmerge(
-    project_id,
-    source_id,
-    destination_id,
-    fingerprints,
-    actor_id,
-    last_event=None,
-    batch_size=500,
-    source_fields_reset=False,
-    eventstream_state=None,
-):
-    # XXX: The queryset chunking logic below is awfully similar to
-    # ``RangeQuerySetWrapper``. Ideally that could be refactored to be able to
-    # be run without iteration by passing around a state object and we could
-    # just use that here instead.
-
-    source = Group.objects.get(project_id=project_id, id=source_id)
-
-    # On the first iteration of this loop, we clear out all of the
-    # denormalizations from the source group so that we can have a clean slate
-    # for the new, repaired data.
-    if last_event is None:
-        fingerprints = lock_hashes(project_id, source_id, fingerprints)
-        truncate_denormalizations(source)
-
-    caches = get_caches()
-
-    project = caches["Project"](project_id)
-
+def get_event_batch(project_id, source_id, last_event, batch_size):
     # We process events sorted in descending order by -timestamp, -event_id. We need
     # to include event_id as well as timestamp in the ordering criteria since:
     #
@@ -500,51 +532,152 @@ def unmerge(
             ]
         )
 
-    events = eventstore.get_events(
+    return eventstore.get_events(
         filter=eventstore.Filter(
-            project_ids=[project_id], group_ids=[source.id], conditions=conditions
+            project_ids=[project_id], group_ids=[source_id], conditions=conditions
         ),
         limit=batch_size,
         referrer="unmerge",
         orderby=["-timestamp", "-event_id"],
     )
 
-    # If there are no more events to process, we're done with the migration.
-    if not events:
-        unlock_hashes(project_id, fingerprints)
-        logger.warning("Unmerge complete (eventstream state: %s)", eventstream_state)
-        if eventstream_state:
-            eventstream.end_unmerge(eventstream_state)
 
-        return destination_id
+UnmergeEstimate = namedtuple("UnmergeEstimate", "events migrated_events batches tasks")
 
-    source_events = []
-    destination_events = []
 
-    for event in events:
-        (destination_events if get_fingerprint(event) in fingerprints else source_events).append(
-            event
+def estimate_unmerge(
+    project_id, source_id, fingerprints, batch_size=500, batches_per_task=DEFAULT_BATCHES_PER_TASK
+):
+    """\
+    Estimates the cost of unmerging ``fingerprints`` from the source group
+    without changing anything.
+    """
+    from sentry.utils.snuba import raw_query
+
+    rows = raw_query(
+        aggregations=[("count()", "", "count")],
+        filter_keys={"project_id": [project_id], "group_id": [source_id]},
+        groupby=["primary_hash"],
+        referrer="unmerge.estimate",
+    )["data"]
+
+    events = sum(row["count"] for row in rows)
+    fingerprints = set(fingerprints)
+    migrated_events = sum(row["count"] for row in rows if row["primary_hash"] in fingerprints)
+
+    # Every event of the source group is read, and one more (empty) batch
+    # ends the unmerge.
+    batches = events // batch_size + 1
+    tasks = (batches + batches_per_task - 1) // batches_per_task
+    return UnmergeEstimate(events, migrated_events, batches, tasks)
+
+
+@instrumented_task(name="sentry.tasks.unmerge", queue="unmerge")
+def unmerge(
+    project_id,
+    source_id,
+    destination_id,
+    fingerprints,
+    actor_id,
+    last_event=None,
+    batch_size=500,
+    source_fields_reset=False,
+    eventstream_state=None,
+    batches_per_task=DEFAULT_BATCHES_PER_TASK,
+    dry_run=False,
+):
+    if dry_run:
+        estimate = estimate_unmerge(
+            project_id, source_id, fingerprints, batch_size, batches_per_task
+        )
+        logger.info(
+            "unmerge.estimate",
+            extra=dict(estimate._asdict(), project_id=project_id, source_id=source_id),
         )
+        return estimate
 
-    if source_events:
-        if not source_fields_reset:
-            source.update(**get_group_creation_attributes(caches, source_events))
-            source_fields_reset = True
-        else:
-            source.update(**get_group_backfill_attributes(caches, source, source_events))
+    source = Group.objects.get(project_id=project_id, id=source_id)
 
-    (destination_id, eventstream_state) = migrate_events(
-        caches,
-        project,
-        source_id,
-        destination_id,
-        fingerprints,
-        destination_events,
-        actor_id,
-        eventstream_state,
-    )
+    # On the first iteration of this loop, we clear out all of the
+    # denormalizations from the source group so that we can have a clean slate
+    # for the new, repaired data.
+    if last_event is None:
+        fingerprints = lock_hashes(project_id, source_id, fingerprints)
+        truncate_denormalizations(source)
 
-    repair_denormalizations(caches, project, events)
+    caches = get_caches()
+
+    project = caches["Project"](project_id)
+
+    aggregates = DenormalizationAggregates(caches, project)
+    exhausted = False
+
+    # Migrated batches are repaired even if a later one fails, as a retry no
+    # longer finds their events in the source group.
+    try:
+        # The next batch is fetched from Snuba while the current one is migrated.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(
+                get_event_batch, project_id, source_id, last_event, batch_size
+            )
+
+            for index in range(batches_per_task):
+                events = pending.result()
+
+                # If there are no more events to process, we're done with the migration.
+                if not events:
+                    exhausted = True
+                    break
+
+                last_event = {"timestamp": events[-1].timestamp, "event_id": events[-1].event_id}
+                if index + 1 < batches_per_task:
+                    pending = executor.submit(
+                        get_event_batch, project_id, source_id, last_event, batch_size
+                    )
+
+                eventstore.bind_nodes(events, "data")
+
+                source_events = []
+                destination_events = []
+
+                for event in events:
+                    (
+                        destination_events
+                        if get_fingerprint(event) in fingerprints
+                        else source_events
+                    ).append(event)
+
+                if source_events:
+                    if not source_fields_reset:
+                        source.update(**get_group_creation_attributes(caches, source_events))
+                        source_fields_reset = True
+                    else:
+                        source.update(
+                            **get_group_backfill_attributes(caches, source, source_events)
+                        )
+
+                (destination_id, eventstream_state) = migrate_events(
+                    caches,
+                    project,
+                    source_id,
+                    destination_id,
+                    fingerprints,
+                    destination_events,
+                    actor_id,
+                    eventstream_state,
+                )
+
+                aggregates.add(events)
+    finally:
+        aggregates.flush()
+
+    if exhausted:
+        unlock_hashes(project_id, fingerprints)
+        logger.warning("Unmerge complete (eventstream state: %s)", eventstream_state)
+        if eventstream_state:
+            eventstream.end_unmerge(eventstream_state)
+
+        return destination_id
 
     unmerge.delay(
         project_id,
@@ -552,8 +685,9 @@ def unmerge(
         destination_id,
         fingerprints,
         actor_id,
-        last_event={"timestamp": events[-1].timestamp, "event_id": events[-1].event_id},
+        last_event=last_event,
         batch_size=batch_size,
         source_fields_reset=source_fields_reset,
         eventstream_state=eventstream_state,
+        batches_per_task=batches_per_task,
     )
@@ -15,6 +15,7 @@ from pkg_resources import resource_string
 from redis.client import Script
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import check_cluster_versions, get_cluster_from_options
 from sentry.utils.versioning import Version
@@ -273,6 +274,10 @@ class RedisTSDB(BaseTSDB):
         >>> get_keys(TimeSeriesModel.group, [1, 2, 3],
         >>>          start=now - timedelta(days=1),
         >>>          end=now)
+
+        ``rollup`` does not need to be one of the configured rollups: if it
+        is a multiple of a configured rollup, the finer series is read and
+        downsampled.
         """
         # redis backend doesn't support multiple envs
         if environment_ids is not None and len(environment_ids) > 1:
@@ -281,28 +286,85 @@ class RedisTSDB(BaseTSDB):
 
         self.validate_arguments([model], [environment_id])
 
+        series, counts = self.get_range_counts(model, keys, start, end, rollup, environment_id)
+        return {key: list(zip(series, values)) for key, values in six.iteritems(counts)}
+
+    def get_sums(self, model, keys, start, end, rollup=None, environment_id=None):
+        self.validate_arguments([model], [environment_id])
+
+        _, counts = self.get_range_counts(model, keys, start, end, rollup, environment_id)
+        return {key: sum(values) for key, values in six.iteritems(counts)}
+
+    def get_storage_rollup(self, rollup):
+        """
+        Returns the configured rollup that should be read to build a series
+        with the resolution ``rollup``.
+        """
+        if rollup in self.rollups:
+            return rollup
+
+        candidates = [r for r in self.rollups if rollup % r == 0]
+        return max(candidates) if candidates else rollup
+
+    def get_range_counts(self, model, keys, start, end, rollup=None, environment_id=None):
+        """
+        Returns a 2-tuple of the series (as epoch timestamps) and a mapping
+        of key => [count, ...] with one count for every timestamp in the
+        series.
+        """
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = map(to_datetime, series)
 
-        results = []
+        storage_rollup = self.get_storage_rollup(rollup)
+        if storage_rollup == rollup:
+            return series, self._get_counts(model, keys, series, rollup, environment_id)
+
+        # Read every bucket of the stored rollup that falls into the requested
+        # buckets and fold them into the coarser series.
+        factor = rollup // storage_rollup
+        storage_series = [
+            epoch + offset * storage_rollup for epoch in series for offset in range(factor)
+        ]
+        counts = self._get_counts(model, keys, storage_series, storage_rollup, environment_id)
+        return (
+            series,
+            {
+                key: [sum(values[i : i + factor]) for i in range(0, len(values), factor)]
+                for key, values in six.iteritems(counts)
+            },
+        )
+
+    def _get_counts(self, model, keys, series, rollup, environment_id):
+        # The counters of all keys that share a vnode are stored in the same
+        # hash for every rollup bucket, so the fields are grouped by hash and
+        # each hash is read with a single HMGET instead of one HGET per key
+        # and bucket.
+        fields = defaultdict(list)
+        positions = defaultdict(list)
+        for index, epoch in enumerate(series):
+            timestamp = to_datetime(epoch)
+            for key in keys:
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id
+                )
+                fields[hash_key].append(hash_field)
+                positions[hash_key].append((key, index))
+
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
+            responses = {
+                hash_key: client.hmget(hash_key, hash_fields)
+                for hash_key, hash_fields in six.iteritems(fields)
+            }
+
+        metrics.timing("tsdb.get_range.hashes", len(responses), skip_internal=True)
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        results = {key: [0] * len(series) for key in keys}
+        for hash_key, response in six.iteritems(responses):
+            for (key, index), count in zip(positions[hash_key], response.value):
+                if count is not None:
+                    results[key][index] = int(count)
 
-        for key, points in six.iteritems(results_by_key):
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        return results
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -197,6 +197,10 @@ class SnubaTSDB(BaseTSDB):
         )
     )
 
+    # Stats endpoints are polled by auto-refreshing dashboards, which request
+    # the same windows over and over.
+    cache_policy = snuba.ResultCachePolicy(live_ttl=10)
+
     def __init__(self, **options):
         super(SnubaTSDB, self).__init__(**options)
 
@@ -279,6 +283,7 @@ class SnubaTSDB(BaseTSDB):
                 rollup=rollup,
                 limit=limit,
                 referrer="tsdb",
+                cache_policy=self.cache_policy,
                 is_grouprelease=(model == TSDBModel.frequent_releases_by_group),
             )
         else:
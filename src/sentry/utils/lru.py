@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+from collections import OrderedDict
+
+import six
+
+__all__ = ("LRUCache",)
+
+
+class LRUCache(object):
+    """
+    A thread safe, per-process LRU cache with an optional expiry.
+
+    The cache is bounded by ``max_size``, which is compared with the number
+    of items, or with the sum of ``get_size(value)`` over all items if
+    ``get_size`` is given. Values that would take up the entire cache on
+    their own are not stored. Items expire ``ttl`` seconds after they were
+    set, or never if ``ttl`` is `None`.
+    """
+
+    def __init__(self, max_size, ttl=None, get_size=None):
+        assert max_size > 0
+        self.max_size = max_size
+        self.ttl = ttl
+        self.get_size = get_size
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """
+        Returns a dictionary of the values of ``keys`` that are cached and
+        have not expired.
+        """
+        now = time.time()
+        rv = {}
+        with self._lock:
+            for key in keys:
+                item = self._items.pop(key, None)
+                if item is None:
+                    continue
+                value, size, expires = item
+                if expires is not None and expires < now:
+                    self.size -= size
+                    continue
+                # Re-insert to mark the item as most recently used.
+                self._items[key] = item
+                rv[key] = value
+        return rv
+
+    def set(self, key, value, ttl=None):
+        return self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, mapping, ttl=None):
+        """
+        Stores all items of ``mapping``, which expire after ``ttl`` seconds
+        instead of the default of the cache if given. Returns the number of
+        items that were evicted to make room for them.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        expires = time.time() + ttl if ttl is not None else None
+        items = [
+            (key, value, self.get_size(value) if self.get_size is not None else 1)
+            for key, value in six.iteritems(mapping)
+        ]
+        evicted = 0
+
+        with self._lock:
+            for key, value, size in items:
+                self._pop(key)
+                if size > self.max_size:
+                    continue
+                self._items[key] = (value, size, expires)
+                self.size += size
+
+            while self.size > self.max_size:
+                _, (_, size, _) = self._items.popitem(last=False)
+                self.size -= size
+                evicted += 1
+
+        return evicted
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
@@ -1,11 +1,13 @@
 from __future__ import absolute_import
 
+import bisect
 from collections import namedtuple, OrderedDict
 from copy import deepcopy
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from dateutil.parser import parse as parse_datetime
 import functools
+from hashlib import md5
 import os
 import pytz
 import re
@@ -15,7 +17,7 @@ import urllib3
 import sentry_sdk
 from sentry_sdk import Hub
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
 from six.moves.urllib.parse import urlparse
 
@@ -32,6 +34,7 @@ from sentry.models import (
 )
 from sentry.net.http import connection_from_url
 from sentry.utils import metrics, json
+from sentry.utils.cache import cache
 from sentry.utils.dates import to_timestamp
 from sentry.snuba.events import Columns
 from sentry.snuba.dataset import Dataset
@@ -148,6 +151,13 @@ clickhouse_error_codes_map = {
 }
 
 
+class QueryDeadlineExceeded(SnubaError):
+    """
+    Exception raised when a query did not complete before the deadline of
+    the request.
+    """
+
+
 class QueryOutsideRetentionError(Exception):
     pass
 
@@ -237,9 +247,10 @@ _snuba_pool = connection_from_url(
         method_whitelist={"GET", "POST", "DELETE"},
     ),
     timeout=30,
-    maxsize=10,
+    # Every thread of the query pool gets a connection of its own.
+    maxsize=settings.SENTRY_SNUBA_MAX_CONCURRENT_QUERIES,
 )
-_query_thread_pool = ThreadPoolExecutor(max_workers=10)
+_query_thread_pool = ThreadPoolExecutor(max_workers=settings.SENTRY_SNUBA_MAX_CONCURRENT_QUERIES)
 
 
 epoch_naive = datetime(1970, 1, 1, tzinfo=None)
@@ -469,6 +480,9 @@ class SnubaQueryParams(object):
     `aggregations` a list of (aggregation_function, column, alias) tuples to be
     passed to the query.
 
+    `cache_policy`: A `ResultCachePolicy` to cache the results of time series
+    queries with, see `CachedQuery`.
+
     The rest of the args are passed directly into the query JSON unmodified.
     See the snuba schema for details.
     """
@@ -485,6 +499,7 @@ class SnubaQueryParams(object):
         rollup=None,
         referrer=None,
         is_grouprelease=False,
+        cache_policy=None,
         **kwargs
     ):
         # TODO: instead of having events be the default, make dataset required.
@@ -502,7 +517,211 @@ class SnubaQueryParams(object):
         self.rollup = rollup
         self.referrer = referrer
         self.is_grouprelease = is_grouprelease
+        self.cache_policy = cache_policy
+        self.kwargs = kwargs
+
+
+class ResultCachePolicy(object):
+    """
+    Opts a time series query into the result cache, see `CachedQuery`.
+
+    `segment_size`: The length in seconds of the time segments that are
+    cached separately. It is rounded down to a multiple of the rollup.
+
+    `ttl`: How long segments that ended more than `settle_time` seconds ago
+    are cached. The data of these is not expected to change anymore.
+
+    `live_ttl`: How long the segments of the live tail are cached, `0` to not
+    cache them at all.
+    """
+
+    def __init__(self, segment_size=24 * 60 * 60, ttl=60 * 60, live_ttl=0, settle_time=5 * 60):
+        self.segment_size = segment_size
+        self.ttl = ttl
+        self.live_ttl = live_ttl
+        self.settle_time = settle_time
+
+
+# Queries with any of these arguments cannot be split into time segments.
+RESULT_CACHE_UNSUPPORTED_KWARGS = ("totals", "offset", "limitby", "sample")
+
+
+def _split_time_range(start, end, size):
+    """
+    Splits the range from `start` to `end` at every multiple of `size`
+    seconds since the epoch.
+    """
+    segments = []
+    while start < end:
+        index = int(to_naive_timestamp(start) // size)
+        boundary = epoch_naive + timedelta(seconds=(index + 1) * size)
+        segments.append((start, min(boundary, end)))
+        start = boundary
+    return segments
+
+
+class CachedQuery(object):
+    """
+    A time series query whose results are cached in segments, which are
+    aligned to multiples of the segment size. Only the segments missing from
+    the cache are queried, with a single query for every run of adjacent
+    missing segments, and the rows of all segments are stitched together.
+
+    Splitting the results is exact, as the rows are grouped by time and the
+    segment boundaries are multiples of the rollup, so that no time bucket
+    spans two segments.
+    """
+
+    def __init__(self, kwargs, policy, segment_size, descending=False):
         self.kwargs = kwargs
+        self.policy = policy
+        self.descending = descending
+        self.segments = _split_time_range(
+            parse_datetime(kwargs["from_date"]), parse_datetime(kwargs["to_date"]), segment_size
+        )
+        self.keys = [self.get_cache_key(start, end) for start, end in self.segments]
+        self.bodies = [None] * len(self.segments)
+        # The response to the unsplit query, if it was truncated by the limit.
+        self.body = None
+        self.is_complete = True
+
+    def get_segment_kwargs(self, start, end):
+        return dict(self.kwargs, from_date=start.isoformat(), to_date=end.isoformat())
+
+    def get_cache_key(self, start, end):
+        body = json.dumps(sorted(six.iteritems(self.get_segment_kwargs(start, end))))
+        return u"snuba:result:{}".format(md5(body.encode("utf-8")).hexdigest())
+
+    def load(self, cached):
+        for index, key in enumerate(self.keys):
+            self.bodies[index] = cached.get(key)
+
+    def get_missing_runs(self):
+        """
+        Returns the runs of adjacent segments missing from the cache as
+        ``(first, last)`` index tuples.
+        """
+        runs = []
+        for index, body in enumerate(self.bodies):
+            if body is not None:
+                continue
+            if runs and runs[-1][1] == index - 1:
+                runs[-1] = (runs[-1][0], index)
+            else:
+                runs.append((index, index))
+        return runs
+
+    def get_run_kwargs(self, run):
+        first, last = run
+        return self.get_segment_kwargs(self.segments[first][0], self.segments[last][1])
+
+    def set_run(self, run, body, now=None):
+        """
+        Splits the response to the query of a run into its segments. Returns a
+        list of ``(key, body, timeout)`` tuples to write to the cache.
+        """
+        first, last = run
+        limit = self.kwargs.get("limit")
+        if limit and len(body["data"]) >= limit:
+            # The rows of the segments might be incomplete.
+            if run == (0, len(self.segments) - 1):
+                self.body = body
+            else:
+                self.is_complete = False
+            return []
+
+        starts = [to_naive_timestamp(start) for start, _ in self.segments[first : last + 1]]
+        segment_data = [[] for _ in starts]
+        for row in body["data"]:
+            timestamp = to_naive_timestamp(naiveify_datetime(parse_datetime(row["time"])))
+            # The first bucket might start before the query does.
+            index = max(bisect.bisect_right(starts, timestamp) - 1, 0)
+            segment_data[index].append(row)
+
+        if now is None:
+            now = datetime.utcnow()
+        settled = now - timedelta(seconds=self.policy.settle_time)
+
+        writes = []
+        for index, data in enumerate(segment_data, first):
+            self.bodies[index] = dict(body, data=data)
+            if self.segments[index][1] <= settled:
+                timeout = self.policy.ttl
+            else:
+                timeout = self.policy.live_ttl
+            if timeout:
+                writes.append((self.keys[index], self.bodies[index], timeout))
+        return writes
+
+    def get_body(self):
+        """
+        Returns the stitched response, or `None` if the query has to be sent
+        again without splitting it.
+        """
+        if self.body is not None:
+            return self.body
+        if not self.is_complete or not self.bodies:
+            return None
+
+        bodies = self.bodies[::-1] if self.descending else self.bodies
+        data = [row for body in bodies for row in body["data"]]
+        limit = self.kwargs.get("limit")
+        if limit and len(data) > limit:
+            return None
+        return dict(bodies[0], data=data)
+
+
+def get_cached_query(snuba_params, kwargs):
+    """
+    Returns a `CachedQuery` for the prepared `kwargs` of a query, or `None` if
+    its results are not cached.
+    """
+    policy = snuba_params.cache_policy
+    rollup = snuba_params.rollup
+    if policy is None or not rollup or not settings.SENTRY_SNUBA_RESULT_CACHE:
+        return None
+    if "time" not in snuba_params.groupby:
+        return None
+    if any(kwargs.get(key) for key in RESULT_CACHE_UNSUPPORTED_KWARGS):
+        return None
+
+    orderby = kwargs.get("orderby") or []
+    if isinstance(orderby, six.string_types):
+        orderby = [orderby]
+    if list(orderby) not in ([], ["time"], ["-time"]):
+        return None
+
+    segment_size = max(int(policy.segment_size // rollup), 1) * rollup
+    cached_query = CachedQuery(kwargs, policy, segment_size, descending=list(orderby) == ["-time"])
+    if not cached_query.segments:
+        # The time range is empty, there is nothing to cache.
+        return None
+    return cached_query
+
+
+def get_request_deadline(request=None):
+    """
+    Returns the deadline for the Snuba queries of an API request that is
+    being served, or `None` if ``SENTRY_SNUBA_REQUEST_TIMEOUT`` is disabled.
+
+    The deadline is anchored to the time the request started (recorded by
+    `sentry.middleware.env.SentryEnvMiddleware`), so every query made while
+    serving it shares the same budget. Defaults to the request bound to
+    `sentry.app.env`, and falls back to the current time outside of a request.
+    """
+    timeout = settings.SENTRY_SNUBA_REQUEST_TIMEOUT
+    if not timeout:
+        return None
+
+    if request is None:
+        from sentry.app import env
+
+        request = env.request
+
+    start_time = getattr(request, "_request_start_time", None)
+    if start_time is None:
+        start_time = time.time()
+    return start_time + timeout
 
 
 def raw_query(
@@ -516,11 +735,14 @@ def raw_query(
     rollup=None,
     referrer=None,
     is_grouprelease=False,
+    cache_policy=None,
+    deadline=None,
+    allow_partial=False,
     **kwargs
 ):
     """
     Sends a query to snuba.  See `SnubaQueryParams` docstring for param
-    descriptions.
+    descriptions, and `bulk_raw_query` for `deadline` and `allow_partial`.
     """
     snuba_params = SnubaQueryParams(
         dataset=dataset,
@@ -532,20 +754,113 @@ def raw_query(
         aggregations=aggregations,
         rollup=rollup,
         is_grouprelease=is_grouprelease,
+        cache_policy=cache_policy,
         **kwargs
     )
-    return bulk_raw_query([snuba_params], referrer=referrer)[0]
+    return bulk_raw_query(
+        [snuba_params], referrer=referrer, deadline=deadline, allow_partial=allow_partial
+    )[0]
 
 
-def bulk_raw_query(snuba_param_list, referrer=None):
+def bulk_raw_query(snuba_param_list, referrer=None, deadline=None, allow_partial=False):
+    """
+    Sends several queries to snuba at the same time.
+
+    `deadline`: A POSIX timestamp by which all queries must complete, for
+    instance the deadline of the request they are made for. Queries still
+    running at the deadline are abandoned.
+
+    `allow_partial`: Return the results of the queries that completed if
+    others did not complete before the deadline, instead of raising
+    `QueryDeadlineExceeded`. The results of abandoned queries have no rows,
+    and their `timed_out` flag is set.
+    """
     headers = {}
     if referrer:
         headers["referer"] = referrer
 
     query_param_list = map(_prepare_query_params, snuba_param_list)
+    cached_queries = [
+        get_cached_query(snuba_params, query_params[0])
+        for snuba_params, query_params in zip(snuba_param_list, query_param_list)
+    ]
+
+    cache_keys = [key for q in cached_queries if q is not None for key in q.keys]
+    if cache_keys:
+        cached = cache.get_many(cache_keys)
+        metrics.incr("snuba.result_cache.hit", amount=len(cached), tags={"referrer": referrer})
+        metrics.incr(
+            "snuba.result_cache.miss",
+            amount=len(cache_keys) - len(cached),
+            tags={"referrer": referrer},
+        )
+        for cached_query in cached_queries:
+            if cached_query is not None:
+                cached_query.load(cached)
+
+    # Cached queries only send the runs of segments missing from the cache.
+    requests = []
+    for index, (query_params, cached_query) in enumerate(zip(query_param_list, cached_queries)):
+        if cached_query is None:
+            requests.append((index, None, query_params[0]))
+        else:
+            for run in cached_query.get_missing_runs():
+                requests.append((index, run, cached_query.get_run_kwargs(run)))
+
+    results = [None] * len(query_param_list)
+    writes = []
+    bodies = []
+    if requests:
+        bodies = _bulk_snuba_query(
+            [kwargs for _, _, kwargs in requests], headers, deadline, allow_partial
+        )
+    for (index, run, _), body in zip(requests, bodies):
+        if run is None or body.get("timed_out"):
+            results[index] = body
+        else:
+            writes.extend(cached_queries[index].set_run(run, body))
+
+    values_by_timeout = {}
+    for key, body, timeout in writes:
+        values_by_timeout.setdefault(timeout, {})[key] = body
+    for timeout, values in six.iteritems(values_by_timeout):
+        cache.set_many(values, timeout)
+
+    for index, cached_query in enumerate(cached_queries):
+        if cached_query is not None and results[index] is None:
+            results[index] = cached_query.get_body()
+            if results[index] is None:
+                metrics.incr("snuba.result_cache.fallback", tags={"referrer": referrer})
+                results[index] = _bulk_snuba_query(
+                    [query_param_list[index][0]], headers, deadline, allow_partial
+                )[0]
+
+    # Forward and reverse translation maps from model ids to snuba keys, per column
+    for (_, _, reverse), body in zip(query_param_list, results):
+        body["data"] = [reverse(d) for d in body["data"]]
+
+    return results
+
+
+def _bulk_snuba_query(query_list, headers, deadline=None, allow_partial=False):
+    """
+    Sends the prepared queries to snuba, and returns the decoded responses.
+    """
+
+    def get_remaining():
+        if deadline is None:
+            return None
+        return max(deadline - time.time(), 0)
 
     def snuba_query(params):
-        query_params, forward, reverse, thread_hub = params
+        query_params, thread_hub = params
+        remaining = get_remaining()
+        if remaining == 0:
+            # The query waited in the pool until the deadline passed.
+            raise QueryDeadlineExceeded("Deadline exceeded before the query was sent")
+
+        # The read timeout of the query ends at the deadline.
+        urlopen_kwargs = {"timeout": remaining} if remaining is not None else {}
         try:
             with timer("snuba_query"):
                 body = json.dumps(query_params)
@@ -553,32 +868,62 @@ def bulk_raw_query(snuba_param_list, referrer=None):
                     op="snuba", description=u"query {}".format(body)
                 ) as span:
                     span.set_tag("referrer", headers.get("referer", "<unknown>"))
-                    return (
-                        _snuba_pool.urlopen("POST", "/query", body=body, headers=headers),
-                        forward,
-                        reverse,
+                    return _snuba_pool.urlopen(
+                        "POST", "/query", body=body, headers=headers, **urlopen_kwargs
                     )
         except urllib3.exceptions.HTTPError as err:
+            if get_remaining() == 0:
+                raise QueryDeadlineExceeded(err)
             raise SnubaError(err)
 
     with sentry_sdk.start_span(
         op="start_snuba_query",
-        description=u"running {} snuba queries".format(len(snuba_param_list)),
+        description=u"running {} snuba queries".format(len(query_list)),
     ) as span:
         span.set_tag("referrer", headers.get("referer", "<unknown>"))
-        if len(snuba_param_list) > 1:
-            query_results = list(
-                _query_thread_pool.map(
-                    snuba_query, [params + (Hub(Hub.current),) for params in query_param_list]
-                )
-            )
+        if len(query_list) > 1:
+            futures = [
+                _query_thread_pool.submit(snuba_query, (params, Hub(Hub.current)))
+                for params in query_list
+            ]
+            _, not_done = wait(futures, timeout=get_remaining())
+            # Queries which have not started yet are dropped, running ones
+            # time out on their own by the deadline.
+            for future in not_done:
+                future.cancel()
+
+            query_results = []
+            for future in futures:
+                if future in not_done:
+                    if not allow_partial:
+                        raise QueryDeadlineExceeded("Deadline exceeded")
+                    query_results.append(None)
+                    continue
+                try:
+                    query_results.append(future.result())
+                except QueryDeadlineExceeded:
+                    if not allow_partial:
+                        raise
+                    query_results.append(None)
         else:
             # No need to submit to the thread pool if we're just performing a
             # single query
-            query_results = [snuba_query(query_param_list[0] + (Hub(Hub.current),))]
+            try:
+                query_results = [snuba_query((query_list[0], Hub(Hub.current)))]
+            except QueryDeadlineExceeded:
+                if not allow_partial:
+                    raise
+                query_results = [None]
 
     results = []
-    for response, _, reverse in query_results:
+    for response in query_results:
+        if response is None:
+            metrics.incr(
+                "snuba.client.deadline_exceeded", tags={"referrer": headers.get("referer")}
+            )
+            results.append({"data": [], "meta": [], "timed_out": True})
+            continue
+
         try:
             body = json.loads(response.data)
         except ValueError:
@@ -602,8 +947,6 @@ def bulk_raw_query(snuba_param_list, referrer=None):
             else:
                 raise SnubaError(u"HTTP {}".format(response.status))
 
-        # Forward and reverse translation maps from model ids to snuba keys, per column
-        body["data"] = [reverse(d) for d in body["data"]]
         results.append(body)
 
     return results
@@ -646,6 +989,13 @@ def query(
         else:
             return OrderedDict()
 
+    # Queries that were abandoned at the deadline have no results.
+    if body.get("timed_out"):
+        if totals:
+            return OrderedDict(), {}
+        else:
+            return OrderedDict()
+
     # Validate and scrub response, and translate snuba keys back to IDs
     aggregate_names = [a[2] for a in aggregations]
     selected_names = [c[2] if isinstance(c, (list, tuple)) else c for c in selected_columns]
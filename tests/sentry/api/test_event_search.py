@@ -12,6 +12,7 @@ from freezegun import freeze_time
 
 from sentry import eventstore
 from sentry.api.event_search import (
+    _get_query_plan,
     AggregateKey,
     event_search_grammar,
     get_filter,
@@ -19,6 +20,7 @@ from sentry.api.event_search import (
     parse_search_query,
     get_json_meta_type,
     InvalidSearchQuery,
+    parse_search_query_fast,
     SearchBoolean,
     SearchFilter,
     SearchKey,
@@ -27,6 +29,7 @@ from sentry.api.event_search import (
 )
 from sentry.testutils.cases import TestCase
 from sentry.testutils.helpers.datetime import before_now
+from sentry.utils.compat.mock import patch
 
 
 def test_get_json_meta_type():
@@ -964,6 +967,73 @@ class ParseBooleanSearchQueryTest(unittest.TestCase):
         )
 
 
+class QueryPlanCacheTest(unittest.TestCase):
+    def setUp(self):
+        _get_query_plan.cache_clear()
+
+    def test_fast_path_matches_grammar(self):
+        queries = [
+            "release:1.2.1",
+            "!release:1.2.1",
+            "user.email:foo@example.com release:1.2.1",
+            "url:http://example.com/ transaction:*foo*",
+            "-key:value some-key:a:b",
+        ]
+        for query in queries:
+            expected = SearchVisitor().visit(event_search_grammar.parse(query))
+            assert parse_search_query_fast(query, SearchVisitor()) == expected
+
+    def test_fast_path_falls_back(self):
+        queries = [
+            "",
+            "hello",
+            "release:1.2.1 hello",
+            "release:1.2.1  os:linux",
+            "release:1.2.1 OR os:linux",
+            'release:"1.2.1"',
+            "count():>1",
+            "transaction.duration:>5s",
+            "first_seen:-2w",
+            "timestamp:2020-01-01",
+            "project.id:123",
+            "has:release",
+            "is:unresolved",
+            "tags[release]:1.2.1",
+            "(release:1.2.1)",
+        ]
+        for query in queries:
+            assert parse_search_query_fast(query, SearchVisitor()) is None
+
+    def test_fast_path_invalid_keys(self):
+        with self.assertRaisesRegexp(InvalidSearchQuery, "Invalid format for numeric search"):
+            parse_search_query_fast("project.id:abc", SearchVisitor())
+        with self.assertRaisesRegexp(InvalidSearchQuery, "Invalid format for date search"):
+            parse_search_query_fast("timestamp:abc", SearchVisitor())
+
+    def test_cached(self):
+        query = "release:1.2.1 hello"
+        expected = parse_search_query(query)
+
+        with patch.object(event_search_grammar, "parse") as mock_parse:
+            result = parse_search_query(query)
+            assert not mock_parse.called
+        assert result == expected
+
+        result.append(None)
+        assert parse_search_query(query) == expected
+
+    def test_cached_relative_dates(self):
+        query = "first_seen:-2w hello"
+        now = timezone.now()
+        with freeze_time(now):
+            assert parse_search_query(query)[0].value.raw_value == now - timedelta(days=14)
+
+        later = now + timedelta(hours=1)
+        with freeze_time(later), patch.object(event_search_grammar, "parse") as mock_parse:
+            assert parse_search_query(query)[0].value.raw_value == later - timedelta(days=14)
+            assert not mock_parse.called
+
+
 class GetSnubaQueryArgsTest(TestCase):
     def test_simple(self):
         _filter = get_filter(
@@ -3,6 +3,7 @@
 from __future__ import absolute_import
 
 import pickle
+import six
 from sentry.utils.compat import mock
 
 from datetime import datetime
@@ -91,6 +92,80 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(Group, columns, filters, extra, signal_only)
 
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_batch(self, process):
+        client = self.buf.cluster.get_routing_client()
+        for key, group_id in (("foo", 1), ("bar", 2)):
+            client.hmset(
+                key,
+                {
+                    "f": '{"pk": ["i","%d"]}' % group_id,
+                    "i+times_seen": "2",
+                    "m": "sentry.models.Group",
+                },
+            )
+            client.zadd("b:p", 1, key)
+
+        self.buf.process(batch_keys=["foo", "bar", "baz"])
+
+        assert process.mock_calls == [
+            mock.call(Group, {"times_seen": 2}, {"pk": 1}, {}, None),
+            mock.call(Group, {"times_seen": 2}, {"pk": 2}, {}, None),
+        ]
+        assert client.zrange("b:p", 0, -1) == []
+        assert not client.exists("foo")
+        assert not client.exists("bar")
+        assert not client.exists("l:foo")
+
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_batch_restores_failed_key(self, process):
+        client = self.buf.cluster.get_routing_client()
+        for key, group_id in (("foo", 1), ("bar", 2), ("baz", 3)):
+            client.hmset(
+                key,
+                {
+                    "f": '{"pk": ["i","%d"]}' % group_id,
+                    "i+times_seen": "2",
+                    "m": "sentry.models.Group",
+                },
+            )
+            client.zadd("b:p", 1, key)
+
+        process.side_effect = [None, ValueError("boom"), None]
+
+        self.buf.process(batch_keys=["foo", "bar", "baz"])
+
+        # The other keys are flushed, only the failed one is kept.
+        assert process.call_count == 3
+        assert client.zrange("b:p", 0, -1) == ["bar"]
+        assert not client.exists("foo")
+        assert not client.exists("baz")
+        assert client.hget("bar", "i+times_seen") == "2"
+        assert client.hget("bar", "m") == "sentry.models.Group"
+        assert client.hget("bar", "a") == "1"
+        assert not client.exists("l:bar")
+
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_batch_drops_failing_key(self, process):
+        client = self.buf.cluster.get_routing_client()
+        client.hmset(
+            "foo",
+            {
+                "a": six.text_type(self.buf.max_process_attempts - 1),
+                "f": '{"pk": ["i","1"]}',
+                "i+times_seen": "2",
+                "m": "sentry.models.Group",
+            },
+        )
+        client.zadd("b:p", 1, "foo")
+
+        process.side_effect = ValueError("boom")
+
+        self.buf.process(batch_keys=["foo"])
+
+        assert client.zrange("b:p", 0, -1) == []
+        assert not client.exists("foo")
+
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr", mock.Mock())
     def test_incr_saves_to_redis(self):
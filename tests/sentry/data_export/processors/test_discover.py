@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+
+from sentry.data_export.base import ExportError
+from sentry.data_export.processors.discover import DiscoverProcessor
+from sentry.testutils import TestCase, SnubaTestCase
+from sentry.testutils.helpers.datetime import iso_format, before_now
+
+
+class DiscoverProcessorTest(TestCase, SnubaTestCase):
+    def setUp(self):
+        super(DiscoverProcessorTest, self).setUp()
+        self.user = self.create_user()
+        self.org = self.create_organization(owner=self.user)
+        self.project = self.create_project(organization=self.org)
+        self.event = self.store_event(
+            data={
+                "message": "hello",
+                "timestamp": iso_format(before_now(seconds=3)),
+                "tags": {"foo": "bar"},
+            },
+            project_id=self.project.id,
+        )
+        self.query = {
+            "project": [self.project.id],
+            "field": ["title", "count()"],
+            "query": "",
+            "statsPeriod": "1d",
+        }
+
+    def test_get_projects(self):
+        projects = DiscoverProcessor.get_projects(self.org.id, {"project": [self.project.id]})
+        assert projects == [self.project]
+        with self.assertRaises(ExportError):
+            DiscoverProcessor.get_projects(self.org.id, {"project": [-1]})
+
+    def test_get_environments(self):
+        env = self.create_environment(project=self.project, name="prod")
+        assert DiscoverProcessor.get_environments(self.org.id, {"environment": "prod"}) == [env]
+        with self.assertRaises(ExportError):
+            DiscoverProcessor.get_environments(self.org.id, {"environment": ["prod", "dev"]})
+
+    def test_header_fields(self):
+        processor = DiscoverProcessor(organization_id=self.org.id, discover_query=self.query)
+        assert processor.header_fields == ["title", "count"]
+
+    def test_date_range(self):
+        start, end = before_now(days=2), before_now(days=1)
+        processor = DiscoverProcessor(
+            organization_id=self.org.id, discover_query=self.query, start=start, end=end
+        )
+        assert processor.params["start"] == start
+        assert processor.params["end"] == end
+
+    def test_get_serialized_data(self):
+        processor = DiscoverProcessor(organization_id=self.org.id, discover_query=self.query)
+        assert processor.get_serialized_data() == [{"title": "hello", "count": 1}]
+        assert processor.get_serialized_data(offset=1) == []
@@ -1,7 +1,11 @@
 from __future__ import absolute_import
 
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+
 from sentry.data_export.models import ExportedData
-from sentry.data_export.tasks import assemble_download
+from sentry.data_export.tasks import assemble_download, get_progress, save_progress
+from sentry.data_export.writer import ExportFileWriter
 from sentry.models import File
 from sentry.testutils import TestCase, SnubaTestCase
 from sentry.utils.compat.mock import patch
@@ -75,3 +79,109 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
             assemble_download(de2.id)
         error = emailer.call_args[1]["message"]
         assert error == "Requested issue does not exist"
+
+    def test_issue_by_tag_resume(self):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=0,
+            query_info={
+                "project_id": self.project.id,
+                "group_id": self.event.group_id,
+                "key": "foo",
+            },
+        )
+        # A previous attempt already wrote the first row.
+        file = File.objects.create(name=de.file_name, type="export.csv", headers={})
+        writer = ExportFileWriter(file)
+        writer.write(b"value,times_seen,last_seen,first_seen\r\nprevious,1,,\r\n")
+        writer.flush()
+        save_progress(de, {"file_id": file.id, "offset": 1, "bytes": writer.offset})
+
+        with self.tasks():
+            assemble_download(de.id)
+        de = ExportedData.objects.get(id=de.id)
+        assert de.file.id == file.id
+        header, raw1, raw2 = de.file.getfile().read().strip().split("\r\n")
+        assert header == "value,times_seen,last_seen,first_seen"
+        assert raw1 == "previous,1,,"
+        assert raw2.startswith("bar,1,") or raw2.startswith("bar2,2,")
+        assert get_progress(de) == {}
+
+    @patch("sentry.data_export.models.ExportedData.email_failure")
+    def test_issue_by_tag_timeout_keeps_progress(self, emailer):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=0,
+            query_info={
+                "project_id": self.project.id,
+                "group_id": self.event.group_id,
+                "key": "foo",
+            },
+        )
+        file = File.objects.create(name=de.file_name, type="export.csv", headers={})
+        progress = {"file_id": file.id, "offset": 1, "bytes": 10}
+        save_progress(de, progress)
+
+        with patch(
+            "sentry.data_export.tasks.export_csv", side_effect=SoftTimeLimitExceeded()
+        ), pytest.raises(SoftTimeLimitExceeded):
+            assemble_download(de.id)
+
+        # The task is retried and continues from the saved progress.
+        assert not emailer.called
+        assert get_progress(de) == progress
+        assert File.objects.filter(id=file.id).exists()
+
+    def test_issue_by_tag_limit(self):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.org,
+            query_type=0,
+            query_info={
+                "project_id": self.project.id,
+                "group_id": self.event.group_id,
+                "key": "foo",
+            },
+        )
+        with self.tasks():
+            assemble_download(de.id, limit=1)
+        de = ExportedData.objects.get(id=de.id)
+        header, raw = de.file.getfile().read().strip().split("\r\n")
+        assert header == "value,times_seen,last_seen,first_seen"
+
+    def test_discover(self):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.project.organization,
+            query_type=1,
+            query_info={
+                "project": [self.project.id],
+                "field": ["title", "count()"],
+                "query": "",
+                "statsPeriod": "1d",
+            },
+        )
+        with self.tasks():
+            assemble_download(de.id)
+        de = ExportedData.objects.get(id=de.id)
+        assert de.date_finished is not None
+        assert de.file.headers == {"Content-Type": "text/csv"}
+        header, raw = de.file.getfile().read().strip().split("\r\n")
+        assert header == "title,count"
+        assert raw.endswith(",3")
+
+    @patch("sentry.data_export.models.ExportedData.email_failure")
+    def test_discover_errors(self, emailer):
+        de = ExportedData.objects.create(
+            user=self.user,
+            organization=self.project.organization,
+            query_type=1,
+            query_info={"project": [-1], "field": ["title"], "query": ""},
+        )
+        with self.tasks():
+            assemble_download(de.id)
+        error = emailer.call_args[1]["message"]
+        assert error == "Requested project does not exist"
+        assert not File.objects.filter(name=de.file_name).exists()
@@ -0,0 +1,49 @@
+from __future__ import absolute_import
+
+from sentry.data_export.writer import ExportFileWriter
+from sentry.models import File, FileBlobIndex
+from sentry.testutils import TestCase
+
+
+class ExportFileWriterTest(TestCase):
+    def setUp(self):
+        super(ExportFileWriterTest, self).setUp()
+        self.file = File.objects.create(name="export.csv", type="export.csv", headers={})
+
+    def test_write(self):
+        writer = ExportFileWriter(self.file, blob_size=4)
+        writer.write(b"abcdef")
+        # Only full blobs are uploaded until the writer is flushed.
+        assert writer.offset == 4
+        writer.write(u"gh\xe9")
+        writer.close()
+
+        file = File.objects.get(id=self.file.id)
+        assert file.size == 10
+        assert file.getfile().read() == u"abcdefgh\xe9".encode("utf-8")
+        assert FileBlobIndex.objects.filter(file=file).count() == 3
+
+        reference = File.objects.create(name="reference.csv", type="export.csv", headers={})
+        reference.putfile(file.getfile())
+        assert file.checksum == reference.checksum
+
+    def test_resume(self):
+        writer = ExportFileWriter(self.file, blob_size=4)
+        writer.write(b"abcdef")
+        writer.flush()
+        offset = writer.offset
+        # Data uploaded after the checkpoint is discarded on resume.
+        writer.write(b"lost")
+        writer.flush()
+
+        writer = ExportFileWriter(self.file, offset=offset, blob_size=4)
+        writer.write(b"gh")
+        writer.close()
+
+        file = File.objects.get(id=self.file.id)
+        assert file.getfile().read() == b"abcdefgh"
+        assert file.size == 8
+
+        reference = File.objects.create(name="reference.csv", type="export.csv", headers={})
+        reference.putfile(file.getfile())
+        assert file.checksum == reference.checksum
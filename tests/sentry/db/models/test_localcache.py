@@ -0,0 +1,107 @@
+from __future__ import absolute_import
+
+import threading
+
+from sentry.db.models import localcache
+from sentry.db.models.localcache import LocalModelCache
+from sentry.models import Project
+from sentry.testutils import TestCase
+from sentry.utils.compat.mock import patch
+
+
+class LocalModelCacheTest(TestCase):
+    def test_get_returns_copies(self):
+        local_cache = LocalModelCache(10)
+        local_cache.set("a", {"value": 1})
+
+        result = local_cache.get("a")
+        assert result == {"value": 1}
+        result["value"] = 2
+        assert local_cache.get("a") == {"value": 1}
+
+    def test_lru(self):
+        local_cache = LocalModelCache(2)
+        local_cache.set("a", 1)
+        local_cache.set("b", 2)
+        local_cache.get("a")
+        local_cache.set("c", 3)
+
+        assert local_cache.get("a") == 1
+        assert local_cache.get("b") is None
+        assert local_cache.get("c") == 3
+
+    def test_expiry(self):
+        local_cache = LocalModelCache(10, ttl=-1)
+        local_cache.set("a", 1)
+        assert local_cache.get("a") is None
+
+    def test_stale_generation(self):
+        local_cache = LocalModelCache(10)
+        generation = local_cache.generation
+        local_cache.delete_many(["a"])
+        local_cache.set("a", 1, generation=generation)
+        assert local_cache.get("a") is None
+
+    def test_single_flight(self):
+        local_cache = LocalModelCache(10)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"value": 1}
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(local_cache.get_or_fetch("a", fetch))
+        )
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(
+            target=lambda: results.append(local_cache.get_or_fetch("a", fetch))
+        )
+        follower.start()
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert len(calls) == 1
+        assert results == [{"value": 1}, {"value": 1}]
+
+
+@patch.object(localcache.InvalidationSubscriber, "start")
+@patch.object(localcache, "_local_model_cache", None)
+class GetFromLocalCacheTest(TestCase):
+    def test_get_from_cache(self, mock_start):
+        project = self.create_project(name="foo")
+
+        with self.settings(SENTRY_MODEL_CACHE_LOCAL_SIZE=100):
+            assert Project.objects.get_from_cache(id=project.id).name == "foo"
+            with patch("sentry.db.models.manager.cache.get") as mock_get:
+                result = Project.objects.get_from_cache(id=project.id)
+                assert not mock_get.called
+            assert result == project
+            assert result is not Project.objects.get_from_cache(id=project.id)
+
+            project.name = "bar"
+            project.save()
+
+            assert Project.objects.get_from_cache(id=project.id).name == "bar"
+
+    def test_get_many_from_cache(self, mock_start):
+        projects = [self.create_project() for _ in range(2)]
+        ids = sorted(p.id for p in projects)
+
+        with self.settings(SENTRY_MODEL_CACHE_LOCAL_SIZE=100):
+            assert sorted(p.id for p in Project.objects.get_many_from_cache(ids)) == ids
+            with patch("sentry.db.models.manager.cache.get_many") as mock_get_many:
+                result = Project.objects.get_many_from_cache(ids)
+                assert not mock_get_many.called
+            assert sorted(p.id for p in result) == ids
+
+            projects[0].delete()
+
+            assert [p.id for p in Project.objects.get_many_from_cache(ids)] == [projects[1].id]
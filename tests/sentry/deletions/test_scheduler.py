@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+import time
+
+from sentry import deletions
+from sentry.deletions import BulkModelDeletionTask, ModelDeletionTask, ModelRelation
+from sentry.deletions.base import BaseRelation
+from sentry.deletions.defaults.group import EventDataDeletionTask
+from sentry.deletions.scheduler import (
+    BUDGET_WINDOW,
+    get_child_relations,
+    get_deletion_plan,
+    reserve_rows,
+)
+from sentry.models import Group, Project, ProjectKey, SavedSearch, SavedSearchUserDefault
+from sentry.testutils import TestCase
+
+
+class GetDeletionPlanTest(TestCase):
+    def test_stages(self):
+        relations = [
+            ModelRelation(ProjectKey, {"project_id": 1}, BulkModelDeletionTask),
+            ModelRelation(SavedSearchUserDefault, {"project_id": 1}, BulkModelDeletionTask),
+            # References the previous relation, so needs its own stage.
+            ModelRelation(SavedSearch, {"project_id": 1}, BulkModelDeletionTask),
+            ModelRelation(Group, {"project_id": 1}),
+            BaseRelation({"group_id": 1, "project_id": 1}, EventDataDeletionTask),
+            ModelRelation(ProjectKey, {"project_id": 1}, BulkModelDeletionTask),
+        ]
+
+        assert get_deletion_plan(deletions.default_manager, relations, num_shards=2) == [
+            [(0, None), (1, None)],
+            [(2, None)],
+            [(3, 0), (3, 1)],
+            [(4, None)],
+            [(5, None)],
+        ]
+
+    def test_without_shards(self):
+        relations = [
+            ModelRelation(Group, {"project_id": 1}, ModelDeletionTask),
+            ModelRelation(ProjectKey, {"project_id": 1}, BulkModelDeletionTask),
+        ]
+
+        assert get_deletion_plan(deletions.default_manager, relations, num_shards=1) == [
+            [(0, None)],
+            [(1, None)],
+        ]
+
+    def test_project(self):
+        project = self.create_project()
+        task = deletions.get(model=Project, query={"id": project.id})
+        relations = get_child_relations(task, project)
+        plan = get_deletion_plan(deletions.default_manager, relations, num_shards=4)
+
+        assert set(index for stage in plan for index, _ in stage) == set(range(len(relations)))
+        group_stages = [stage for stage in plan if relations[stage[0][0]].params["model"] is Group]
+        assert len(group_stages) == 1
+        assert [shard_id for _, shard_id in group_stages[0]] == [0, 1, 2, 3]
+
+
+class ReserveRowsTest(TestCase):
+    def test_disabled(self):
+        with self.settings(SENTRY_DELETIONS_MAX_ROWS_PER_SECOND=None):
+            assert reserve_rows(10 ** 9) == 0
+
+    def test_budget(self):
+        now = time.time() // BUDGET_WINDOW * BUDGET_WINDOW
+        with self.settings(SENTRY_DELETIONS_MAX_ROWS_PER_SECOND=10):
+            assert reserve_rows(60, now=now) == 0
+            # The budget is not used up before this chunk yet.
+            assert reserve_rows(60, now=now + 1) == 0
+            assert reserve_rows(60, now=now + 2) == BUDGET_WINDOW - 2
+            # Rejected chunks are not accounted.
+            assert reserve_rows(60, now=now + 3) == BUDGET_WINDOW - 3
+            assert reserve_rows(60, now=now + BUDGET_WINDOW) == 0
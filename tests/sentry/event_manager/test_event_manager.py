@@ -16,7 +16,7 @@ from sentry import nodestore
 from sentry.app import tsdb
 from sentry.constants import MAX_VERSION_LENGTH
 from sentry.eventstore.models import Event
-from sentry.event_manager import HashDiscarded, EventManager, EventUser
+from sentry.event_manager import HashDiscarded, EventManager, EventUser, save_error_events
 from sentry.grouping.utils import hash_from_values
 from sentry.models import (
     Activity,
@@ -1320,3 +1320,89 @@ class ReleaseIssueTest(TestCase):
             last_seen=self.timestamp + 100,
             first_seen=self.timestamp + 100,
         )
+
+
+class SaveErrorEventsTest(TestCase):
+    def make_job(self, **kwargs):
+        manager = EventManager(make_event(**kwargs))
+        manager.normalize()
+        return {"data": manager.get_data(), "project_id": self.project.id, "start_time": time()}
+
+    def test_groups_events_within_batch(self):
+        ts = time() - 300
+        jobs = [
+            self.make_job(message="foo", fingerprint=["a" * 32], timestamp=ts),
+            self.make_job(message="foo bar", fingerprint=["a" * 32], timestamp=ts + 2.0),
+            self.make_job(message="foo baz", fingerprint=["b" * 32], timestamp=ts),
+        ]
+
+        with self.tasks():
+            saved_jobs = save_error_events(jobs, {self.project.id: self.project})
+
+        assert len(saved_jobs) == 3
+        event1, event2, event3 = [job["event"] for job in saved_jobs]
+        assert event1.group_id == event2.group_id
+        assert event1.group_id != event3.group_id
+        assert saved_jobs[0]["is_new"]
+        assert not saved_jobs[1]["is_new"]
+        assert saved_jobs[0]["is_new_group_environment"]
+        assert not saved_jobs[1]["is_new_group_environment"]
+
+        group = Group.objects.get(id=event1.group_id)
+        assert group.times_seen == 2
+        assert group.last_seen == event2.datetime
+        assert group.message == event2.message
+
+    def test_skips_discarded_hashes(self):
+        manager = EventManager(make_event(message="foo", fingerprint=["a" * 32]))
+        with self.tasks():
+            event = manager.save(self.project.id)
+
+        group = Group.objects.get(id=event.group_id)
+        tombstone = GroupTombstone.objects.create(
+            project_id=group.project_id,
+            level=group.level,
+            message=group.message,
+            culprit=group.culprit,
+            data=group.data,
+            previous_group_id=group.id,
+        )
+        GroupHash.objects.filter(group=group).update(group=None, group_tombstone_id=tombstone.id)
+
+        jobs = [
+            self.make_job(message="foo", fingerprint=["a" * 32]),
+            self.make_job(message="foo", fingerprint=["b" * 32]),
+        ]
+
+        with self.tasks():
+            saved_jobs = save_error_events(jobs, {self.project.id: self.project})
+
+        discarded_job, saved_job = jobs
+        assert saved_jobs == [saved_job]
+        assert isinstance(discarded_job["hash_discarded"], HashDiscarded)
+        assert saved_job["event"].group_id != group.id
+
+    def test_writes_coalesced_increments_on_error(self):
+        from sentry import event_manager
+
+        ts = time() - 300
+        jobs = [
+            self.make_job(message="foo", fingerprint=["a" * 32], timestamp=ts),
+            self.make_job(message="foo", fingerprint=["a" * 32], timestamp=ts + 1.0),
+            self.make_job(message="foo", fingerprint=["b" * 32], timestamp=ts),
+        ]
+
+        save_aggregate = event_manager._save_aggregate
+
+        def fail_on_third_job(**kwargs):
+            if kwargs["event"] is jobs[2]["event"]:
+                raise ValueError("failed")
+            return save_aggregate(**kwargs)
+
+        with self.tasks(), mock.patch.object(
+            event_manager, "_save_aggregate", side_effect=fail_on_third_job
+        ):
+            with pytest.raises(ValueError):
+                save_error_events(jobs, {self.project.id: self.project})
+
+        assert Group.objects.get(id=jobs[0]["group"].id).times_seen == 2
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+
+from confluent_kafka import TopicPartition
+
+from sentry.eventstream.kafka import KafkaEventStream
+from sentry.testutils import TestCase
+from sentry.utils.compat.mock import MagicMock, Mock, patch
+
+
+def make_message(topic, partition, offset, value):
+    return Mock(
+        **{
+            "error.return_value": None,
+            "topic.return_value": topic,
+            "partition.return_value": partition,
+            "offset.return_value": offset,
+            "value.return_value": value,
+        }
+    )
+
+
+class FakeConsumer(object):
+    def __init__(self, topic, messages):
+        self.topic = topic
+        self.messages = list(messages)
+        self.commits = []
+
+    def subscribe(self, topics, on_assign=None, on_revoke=None):
+        on_assign(self, [TopicPartition(self.topic, 0)])
+
+    def poll(self, timeout):
+        if not self.messages:
+            raise KeyboardInterrupt
+        return self.messages.pop(0)
+
+    def commit(self, offsets, asynchronous):
+        self.commits.append([(i.topic, i.partition, i.offset) for i in offsets])
+        return offsets
+
+    def close(self):
+        pass
+
+
+class KafkaEventStreamTest(TestCase):
+    def setUp(self):
+        super(KafkaEventStreamTest, self).setUp()
+        self.eventstream = KafkaEventStream()
+
+    def run_forwarder(self, messages, **kwargs):
+        consumer = FakeConsumer(self.eventstream.topic, messages)
+        with patch(
+            "sentry.eventstream.kafka.backend.SynchronizedConsumer", return_value=consumer
+        ), patch(
+            "sentry.eventstream.kafka.backend.get_task_kwargs_for_message",
+            side_effect=lambda value: {"value": value} if value is not None else None,
+        ):
+            self.eventstream.run_post_process_forwarder(
+                consumer_group="post-process",
+                commit_log_topic="commit-log",
+                synchronize_commit_group="snuba-consumers",
+                **kwargs
+            )
+        return consumer
+
+    @patch.object(KafkaEventStream, "_dispatch_post_process_group_tasks")
+    def test_batched_forwarder(self, mock_dispatch):
+        topic = self.eventstream.topic
+        consumer = self.run_forwarder(
+            [
+                make_message(topic, 0, 0, "a"),
+                None,
+                make_message(topic, 0, 1, None),
+                make_message(topic, 0, 2, "b"),
+                make_message(topic, 1, 0, "unowned"),
+            ],
+            commit_batch_size=2,
+            batch_timeout=10,
+        )
+
+        assert [call[0][0] for call in mock_dispatch.call_args_list] == [
+            [{"value": "a"}],
+            [{"value": "b"}],
+        ]
+        assert consumer.commits == [[(topic, 0, 2)], [(topic, 0, 3)]]
+
+    @patch.object(KafkaEventStream, "_dispatch_post_process_group_task")
+    def test_forwarder(self, mock_dispatch):
+        topic = self.eventstream.topic
+        consumer = self.run_forwarder(
+            [make_message(topic, 0, 0, "a"), make_message(topic, 0, 1, None)],
+            commit_batch_size=1,
+        )
+
+        assert [call[1] for call in mock_dispatch.call_args_list] == [{"value": "a"}]
+        assert consumer.commits == [[(topic, 0, 1)], [(topic, 0, 2)], [(topic, 0, 2)]]
+
+    @patch("sentry.eventstream.base.post_process_group")
+    def test_dispatch_post_process_group_tasks(self, mock_task):
+        producer = MagicMock()
+        mock_task.app.producer_or_acquire.return_value.__enter__.return_value = producer
+        task_kwargs = {
+            "event": Mock(),
+            "is_new": True,
+            "is_regression": False,
+            "is_new_group_environment": True,
+            "primary_hash": "a" * 32,
+        }
+
+        self.eventstream._dispatch_post_process_group_tasks([task_kwargs, task_kwargs])
+
+        assert mock_task.app.producer_or_acquire.call_count == 1
+        assert mock_task.apply_async.call_count == 2
+        for call in mock_task.apply_async.call_args_list:
+            assert call[1] == {"kwargs": task_kwargs, "producer": producer}
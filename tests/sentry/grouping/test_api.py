@@ -0,0 +1,44 @@
+from __future__ import absolute_import
+
+import pytest
+
+from sentry.grouping.api import (
+    get_default_grouping_config_dict,
+    get_fingerprinting_config_for_project,
+    load_grouping_config,
+)
+from sentry.grouping.enhancer import Enhancements
+from sentry.utils.compat.mock import patch
+
+
+def test_load_grouping_config_cached():
+    config_dict = get_default_grouping_config_dict()
+    config = load_grouping_config(config_dict)
+    assert load_grouping_config(dict(config_dict)) is config
+    assert load_grouping_config(dict(config_dict, extra="value")) is config
+
+    other_enhancements = Enhancements(rules=[], bases=[]).dumps()
+    other_config = load_grouping_config(dict(config_dict, enhancements=other_enhancements))
+    assert other_config is not config
+    assert other_config.id == config.id
+    assert other_config.enhancements.bases == []
+
+    other_config = load_grouping_config(get_default_grouping_config_dict("legacy:2019-03-12"))
+    assert other_config.id == "legacy:2019-03-12"
+
+
+@pytest.mark.django_db
+def test_get_fingerprinting_config_cached(default_project):
+    default_project.update_option("sentry:fingerprinting_rules", "type:DatabaseUnavailable -> db")
+    config = get_fingerprinting_config_for_project(default_project)
+    assert config.to_json() == {
+        "version": 1,
+        "rules": [{"matchers": [["type", "DatabaseUnavailable"]], "fingerprint": ["db"]}],
+    }
+
+    with patch("sentry.utils.cache.cache.get") as mock_get:
+        assert get_fingerprinting_config_for_project(default_project) is config
+    assert not mock_get.called
+
+    default_project.update_option("sentry:fingerprinting_rules", "type:Timeout -> timeout")
+    assert get_fingerprinting_config_for_project(default_project) is not config
@@ -4,7 +4,7 @@ from __future__ import absolute_import, print_function
 
 import six
 
-from sentry.grouping.enhancer import Enhancements
+from sentry.grouping.enhancer import Enhancements, _matchers
 
 
 def dump_obj(obj):
@@ -199,3 +199,26 @@ def test_package_matching():
     assert not bool(
         bundled_rule.get_matching_frame_actions({"package": "/usr/lib/linux-gate.so"}, "native")
     )
+
+
+def test_rules_applied_in_order():
+    enhancement = Enhancements.from_config_string(
+        """
+        function:foo                                +app
+        app:yes module:bar                          -app
+        family:javascript function:foo              -app
+    """
+    )
+
+    frames = [
+        {"function": "foo", "module": "bar"},
+        {"function": "foo", "module": "baz"},
+        {"function": "foo", "module": "bar"},
+    ]
+    enhancement.apply_modifications_to_frame(frames, "native")
+
+    # The second rule only sees the in-app flag set by the first one.
+    assert [frame["in_app"] for frame in frames] == [False, True, False]
+
+    # Identical frames are only matched against the rules once.
+    assert len(_matchers[enhancement]._match_cache) == 2
@@ -1,11 +1,14 @@
 from __future__ import absolute_import
 
+import functools
+import pickle
 import uuid
 import pytest
 import time
 
 from sentry.utils import json
 from sentry.ingest.ingest_consumer import (
+    _call_with_projects,
     process_event,
     process_attachment_chunk,
     process_individual_attachment,
@@ -321,3 +324,27 @@ def test_individual_attachments_missing_chunks(default_project, factories, monke
     )
 
     assert not attachments
+
+
+@pytest.mark.django_db
+def test_call_with_projects_is_picklable(default_project, preprocess_event):
+    """
+    The process pool of the ingest consumer pickles the callable and its
+    arguments, make sure the dispatch helper survives the round-trip.
+    """
+    payload = get_normalized_event({"message": "hello world"}, default_project)
+    call = functools.partial(_call_with_projects, projects={default_project.id: default_project})
+    message = {
+        "payload": json.dumps(payload),
+        "start_time": time.time() - 3600,
+        "event_id": payload["event_id"],
+        "project_id": default_project.id,
+        "remote_addr": "127.0.0.1",
+    }
+
+    call, args = pickle.loads(pickle.dumps((call, (process_event, message))))
+    call(args)
+
+    kwargs, = preprocess_event
+    assert kwargs["event_id"] == payload["event_id"]
+    assert kwargs["project"] == default_project
@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+import msgpack
+
+from sentry.ingest.benchmark import generate_messages, run_benchmark
+from sentry.utils import metrics
+from sentry.utils.batching_kafka_consumer import AbstractBatchWorker
+
+
+class CountingWorker(AbstractBatchWorker):
+    def __init__(self):
+        self.batches = []
+
+    def process_message(self, message):
+        return msgpack.unpackb(message.value(), use_list=False)
+
+    def flush_batch(self, batch):
+        metrics.timing("benchmark.batch-size", len(batch))
+        with metrics.timer("benchmark.flush"):
+            self.batches.append(batch)
+
+    def shutdown(self):
+        pass
+
+
+def test_generate_messages():
+    messages = generate_messages(
+        50, [1, 2], mix={"attachment": 1, "event": 1, "user_report": 1}, seed=42
+    )
+    assert [m.offset() for m in messages] == list(range(len(messages)))
+
+    types = set(msgpack.unpackb(m.value())["type"] for m in messages)
+    assert types == {"attachment", "attachment_chunk", "event", "user_report"}
+
+    # The same seed generates the same messages
+    def get_event_ids(messages):
+        return [msgpack.unpackb(m.value())["event_id"] for m in messages]
+
+    assert get_event_ids(generate_messages(5, [1], seed=1)) == get_event_ids(
+        generate_messages(5, [1], seed=1)
+    )
+
+
+def test_run_benchmark():
+    messages = generate_messages(25, [1], mix={"event": 1}, seed=42)
+    worker = CountingWorker()
+
+    result = run_benchmark(messages, worker, max_batch_size=10)
+
+    assert [len(batch) for batch in worker.batches] == [10, 10, 5]
+    assert result.messages == 25
+    assert result.batches == 3
+    assert result.flush_p50 is not None
+    assert result.timings["benchmark.flush"].count == 3
+    assert result.timings["benchmark.flush"].unit == "ms"
+    # Values that are not durations are recorded unchanged.
+    assert result.timings["benchmark.batch-size"].total == 25
+    assert result.timings["benchmark.batch-size"].unit is None
+    assert result.timings["consumer.process_message"].count == 25
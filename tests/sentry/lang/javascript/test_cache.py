@@ -1,6 +1,6 @@
 from __future__ import absolute_import
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import SourceCache, SourceMapViewCache
 from unittest import TestCase
 
 
@@ -38,3 +38,26 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == u"foobar"
+
+
+class SourceMapViewCacheTest(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = SourceMapViewCache(max_size=10)
+        a, b, c = object(), object(), object()
+
+        cache.set("a", a, 5)
+        cache.set("b", b, 5)
+        assert cache.get("a") is a
+        cache.set("c", c, 5)
+
+        assert cache.get("a") is a
+        assert cache.get("b") is None
+        assert cache.get("c") is c
+        assert cache.size == 10
+
+    def test_skips_oversized_items(self):
+        cache = SourceMapViewCache(max_size=10)
+        cache.set("a", object(), 11)
+
+        assert cache.get("a") is None
+        assert cache.size == 0
@@ -25,6 +25,7 @@ from sentry.lang.javascript.processor import (
     CACHE_CONTROL_MAX,
     CACHE_CONTROL_MIN,
 )
+from sentry.lang.javascript.cache import SourceMapViewCache
 from sentry.lang.javascript.errormapping import rewrite_exception, REACT_MAPPING_URL
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
@@ -563,6 +564,17 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap("data:application/json;base64,xxx")
 
+    def test_view_cache(self):
+        view_cache = SourceMapViewCache(max_size=1024 * 1024)
+        with patch(
+            "sentry.lang.javascript.processor.get_sourcemap_view_cache", return_value=view_cache
+        ):
+            smap_view = fetch_sourcemap(base64_sourcemap)
+            assert fetch_sourcemap(base64_sourcemap) is smap_view
+            assert fetch_sourcemap(base64_sourcemap.rstrip("=")) is smap_view
+
+        assert len(view_cache._items) == 1
+
     @responses.activate
     def test_garbage_json(self):
         responses.add(
@@ -2,9 +2,12 @@
 
 from __future__ import absolute_import
 
+import pytest
+
 from datetime import timedelta
 from django.utils import timezone
 
+from sentry.nodestore.codecs import get_header, has_zstandard
 from sentry.nodestore.django.models import Node
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.testutils import TestCase
@@ -50,6 +53,17 @@ class DjangoNodeStorageTest(TestCase):
         node_id = self.ns.create({"foo": "bar"})
         assert Node.objects.get(id=node_id).data == {"foo": "bar"}
 
+    @pytest.mark.skipif(not has_zstandard, reason="requires zstandard")
+    def test_set_with_codec(self):
+        ns = DjangoNodeStorage(codec="zstd")
+        ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
+
+        value = Node.objects.filter(id="d2502ebbd7df41ceba8d3275595cac33").values_list(
+            "data", flat=True
+        )[0]
+        assert get_header(value) == ("zstd1", "")
+        assert Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data == {"foo": "bar"}
+
     def test_delete(self):
         node = Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data={"foo": "bar"})
 
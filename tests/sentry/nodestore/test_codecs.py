@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+import pytest
+
+from sentry.nodestore.codecs import (
+    HEADER_MARKER,
+    ZlibCodec,
+    decode,
+    get_codec,
+    get_header,
+    has_zstandard,
+)
+from sentry.utils.compat import pickle
+from sentry.utils.strings import compress
+
+
+DATA = {"platform": "python", "message": "hello world", "tags": [["foo", "bar"]]}
+
+
+def test_zlib_writes_legacy_format():
+    value = get_codec("zlib").encode(DATA)
+
+    assert value == compress(pickle.dumps(DATA))
+    assert get_header(value) == (ZlibCodec.id, u"")
+    assert decode(value) == DATA
+
+
+def test_decode_unknown_codec():
+    with pytest.raises(ValueError):
+        decode(u"{0}foo{0}{0}bar".format(HEADER_MARKER))
+
+
+@pytest.mark.skipif(not has_zstandard, reason="requires zstandard")
+def test_zstd_roundtrip():
+    value = get_codec("zstd").encode(DATA)
+
+    assert value.startswith(HEADER_MARKER)
+    assert get_header(value) == (u"zstd1", u"")
+    assert decode(value) == DATA
+
+
+@pytest.mark.skipif(not has_zstandard, reason="requires zstandard")
+def test_zstd_dictionary(tmpdir):
+    import zstandard
+
+    samples = [
+        pickle.dumps(dict(DATA, message="hello world %d" % i), pickle.HIGHEST_PROTOCOL)
+        for i in range(1000)
+    ]
+    path = tmpdir.join("python.dict")
+    path.write_binary(zstandard.train_dictionary(1024, samples).as_bytes())
+
+    codec = get_codec("zstd", dictionaries={"python": str(path)})
+    value = codec.encode(DATA)
+    dictionary_id = codec.dictionaries["python"].dict_id()
+
+    assert get_header(value) == (u"zstd1", u"%s" % dictionary_id)
+    assert decode(value) == DATA
+
+    # Nodes of other platforms are compressed without a dictionary.
+    other = dict(DATA, platform="javascript")
+    assert get_header(codec.encode(other)) == (u"zstd1", u"")
@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+
+from sentry.nodestore.localcache import LocalNodeCache
+from sentry.utils.compat import mock
+from sentry.utils.compat import pickle
+from sentry.testutils import TestCase
+
+
+def payload_size(data):
+    return len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+
+class LocalNodeCacheTest(TestCase):
+    def test_get_set(self):
+        cache = LocalNodeCache(max_size=1024, ttl=60)
+        cache.set("a", {"foo": "bar"})
+
+        assert cache.get("a") == {"foo": "bar"}
+        assert cache.get("b") is None
+        assert cache.get_many(["a", "b"]) == {"a": {"foo": "bar"}}
+
+    def test_returns_copies(self):
+        cache = LocalNodeCache(max_size=1024, ttl=60)
+        cache.set("a", {"foo": "bar"})
+
+        cache.get("a")["foo"] = "baz"
+        assert cache.get("a") == {"foo": "bar"}
+
+    def test_evicts_least_recently_used(self):
+        data = {"foo": "bar"}
+        cache = LocalNodeCache(max_size=payload_size(data) * 2, ttl=60)
+        cache.set("a", data)
+        cache.set("b", data)
+        cache.get("a")
+        cache.set("c", data)
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": data, "c": data}
+        assert cache.size == payload_size(data) * 2
+
+    def test_skips_oversized_items(self):
+        cache = LocalNodeCache(max_size=10, ttl=60)
+        cache.set("a", {"foo": "x" * 100})
+
+        assert cache.get("a") is None
+        assert cache.size == 0
+
+    def test_expires(self):
+        cache = LocalNodeCache(max_size=1024, ttl=60)
+
+        with mock.patch("time.time", return_value=1000):
+            cache.set("a", {"foo": "bar"})
+
+        with mock.patch("time.time", return_value=1030):
+            assert cache.get("a") == {"foo": "bar"}
+
+        with mock.patch("time.time", return_value=1061):
+            assert cache.get("a") is None
+
+        assert cache.size == 0
+
+    def test_delete(self):
+        cache = LocalNodeCache(max_size=1024, ttl=60)
+        cache.set_many({"a": {"foo": "bar"}, "b": {"foo": "baz"}, "c": None})
+        cache.delete("a")
+        cache.delete_many(["b"])
+
+        assert cache.get_many(["a", "b", "c"]) == {}
+        assert cache.size == 0
@@ -1,6 +1,15 @@
 from __future__ import absolute_import
 
-from sentry.ownership.grammar import Rule, Matcher, Owner, parse_rules, dump_schema, load_schema
+from sentry.ownership.grammar import (
+    Rule,
+    Matcher,
+    Owner,
+    RuleIndex,
+    parse_rules,
+    dump_schema,
+    load_schema,
+    load_compiled_schema,
+)
 
 fixture_data = """
 # cool stuff comment
@@ -102,3 +111,58 @@ def test_matcher_test_stacktrace():
     assert not Matcher("path", "*.jsx").test(data)
     assert not Matcher("url", "*.py").test(data)
     assert not Matcher("path", "*.py").test({})
+
+
+def test_rule_index():
+    rules = [
+        Rule(Matcher("path", "*.py"), [Owner("team", "python")]),
+        Rule(Matcher("path", "SRC/Sentry/*"), [Owner("team", "sentry")]),
+        Rule(Matcher("path", "src/sentry/api/*"), [Owner("team", "api")]),
+        Rule(Matcher("path", "src/other/*"), [Owner("team", "other")]),
+        Rule(Matcher("path", "C:\\src\\*.py"), [Owner("team", "windows")]),
+        Rule(Matcher("url", "http://example.com/*"), [Owner("team", "example")]),
+        Rule(Matcher("url", "http://other.com/*"), [Owner("team", "other")]),
+    ]
+    data = {
+        "request": {"url": "http://example.com/foo"},
+        "exception": {
+            "values": [
+                {
+                    "stacktrace": {
+                        "frames": [
+                            {"filename": "src/sentry/api/base.py"},
+                            {"abs_path": "C:\\src\\app.py"},
+                            {"filename": "src/sentry/api/base.py"},
+                        ]
+                    }
+                }
+            ]
+        },
+    }
+
+    expected = [rule for rule in rules if rule.test(data)]
+    assert [rule.owners[0].identifier for rule in expected] == [
+        "python",
+        "sentry",
+        "api",
+        "windows",
+        "example",
+    ]
+    assert RuleIndex(rules).test(data) == expected
+    assert RuleIndex(rules).test({}) == []
+
+
+def test_load_compiled_schema():
+    schema = dump_schema(parse_rules(fixture_data))
+    index = load_compiled_schema(schema)
+    assert index.rules == load_schema(schema)
+    assert load_compiled_schema(schema) is index
+    assert load_compiled_schema(dump_schema(parse_rules("*.py #python"))) is not index
+
+
+def test_load_compiled_schema_version():
+    schema = dump_schema(parse_rules(fixture_data))
+    index = load_compiled_schema(schema, version=(1, 1))
+    assert load_compiled_schema(schema, version=(1, 1)) is index
+    assert load_compiled_schema(schema, version=(1, 2)) is not index
+    assert load_compiled_schema(schema) is not index
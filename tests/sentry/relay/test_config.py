@@ -2,8 +2,9 @@ from __future__ import absolute_import
 
 import pytest
 
+from sentry.constants import ObjectStatus
 from sentry.models import ProjectKey
-from sentry.relay.config import get_project_config
+from sentry.relay.config import get_project_config, get_project_configs_bulk
 
 PII_CONFIG = """
 {
@@ -49,3 +50,33 @@ def test_get_project_config(default_project, insta_snapshot, full):
     assert cfg.pop("organizationId") == default_project.organization.id
 
     insta_snapshot(cfg)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("full", [False, True])
+def test_get_project_configs_bulk(default_project, factories, full):
+    default_project.update_option("sentry:relay_pii_config", PII_CONFIG)
+    default_project.organization.update_option("sentry:relay_pii_config", PII_CONFIG)
+    other_project = factories.create_project(organization=default_project.organization)
+    projects = [default_project, other_project]
+
+    configs = get_project_configs_bulk(projects, full_config=full)
+
+    assert sorted(configs) == sorted(p.id for p in projects)
+    for project in projects:
+        keys = ProjectKey.objects.filter(project=project)
+        expected = get_project_config(project, full_config=full, project_keys=keys).to_dict()
+        cfg = configs[project.id].to_dict()
+        for key in ("lastChange", "lastFetch", "rev"):
+            expected.pop(key)
+            cfg.pop(key)
+        assert cfg == expected
+
+
+@pytest.mark.django_db
+def test_get_project_configs_bulk_disabled(default_project):
+    default_project.update(status=ObjectStatus.PENDING_DELETION)
+
+    configs = get_project_configs_bulk([default_project])
+
+    assert configs[default_project.id].to_dict() == {"disabled": True}
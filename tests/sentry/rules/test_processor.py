@@ -3,12 +3,24 @@
 from __future__ import absolute_import
 
 from datetime import timedelta
+from django.core.cache import cache
 from django.utils import timezone
 
 from sentry.models import GroupRuleStatus, Rule
 from sentry.plugins.base import plugins
 from sentry.testutils import TestCase
+from sentry.rules.conditions.event_frequency import EventFrequencyCondition
 from sentry.rules.processor import RuleProcessor
+from sentry.utils.compat.mock import patch
+
+EVERY_EVENT_CONDITION = {"id": "sentry.rules.conditions.every_event.EveryEventCondition"}
+FIRST_SEEN_CONDITION = {"id": "sentry.rules.conditions.first_seen_event.FirstSeenEventCondition"}
+FREQUENCY_CONDITION = {
+    "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+    "interval": "1h",
+    "value": 10,
+}
+NOTIFY_ACTION = {"id": "sentry.rules.actions.notify_event.NotifyEventAction"}
 
 
 class RuleProcessorTest(TestCase):
@@ -50,3 +62,67 @@ class RuleProcessorTest(TestCase):
 
         results = list(rp.apply())
         assert len(results) == 1
+
+    def create_rules(self, project, conditions_list, action_match="all"):
+        Rule.objects.filter(project=project).delete()
+        return [
+            Rule.objects.create(
+                project=project,
+                data={
+                    "conditions": conditions,
+                    "actions": [NOTIFY_ACTION],
+                    "action_match": action_match,
+                },
+            )
+            for conditions in conditions_list
+        ]
+
+    def get_processor(self, event, is_new=True):
+        return RuleProcessor(
+            event,
+            is_new=is_new,
+            is_regression=False,
+            is_new_group_environment=is_new,
+            has_reappeared=False,
+        )
+
+    def test_rule_statuses_loaded_in_bulk(self):
+        event = self.store_event(data={}, project_id=self.project.id)
+        rules = self.create_rules(event.project, [[EVERY_EVENT_CONDITION]] * 3)
+        GroupRuleStatus.objects.create(rule=rules[0], group=event.group, project=event.project)
+
+        rp = self.get_processor(event)
+        assert len(list(rp.apply())) == 1
+        assert GroupRuleStatus.objects.filter(group=event.group).count() == 3
+
+        with patch.object(cache, "get_many", return_value={}), patch.object(
+            GroupRuleStatus.objects, "get_or_create"
+        ) as get_or_create:
+            statuses = rp.get_rule_statuses(rules)
+        assert not get_or_create.called
+        assert sorted(statuses) == sorted(rule.id for rule in rules)
+
+        with patch.object(GroupRuleStatus.objects, "filter") as filter:
+            assert rp.get_rule_statuses(rules) == statuses
+        assert not filter.called
+
+    @patch.object(EventFrequencyCondition, "query_hook", return_value=20)
+    def test_frequency_queried_once(self, query_hook):
+        event = self.store_event(data={}, project_id=self.project.id)
+        self.create_rules(event.project, [[FREQUENCY_CONDITION]] * 2)
+
+        results = list(self.get_processor(event).apply())
+        assert len(results) == 1
+        assert len(results[0][1]) == 2
+        assert query_hook.call_count == 1
+
+    @patch.object(EventFrequencyCondition, "query_hook", return_value=20)
+    def test_expensive_conditions_evaluated_last(self, query_hook):
+        event = self.store_event(data={}, project_id=self.project.id)
+        self.create_rules(event.project, [[FREQUENCY_CONDITION, FIRST_SEEN_CONDITION]])
+
+        assert list(self.get_processor(event, is_new=False).apply()) == []
+        assert not query_hook.called
+
+        assert len(list(self.get_processor(event, is_new=True).apply())) == 1
+        assert query_hook.call_count == 1
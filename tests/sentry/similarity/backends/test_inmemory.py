@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+
+import msgpack
+from exam import fixture
+
+from sentry.similarity.backends.inmemory import InMemoryMinHashIndexBackend
+from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.testutils import TestCase
+
+from .base import MinHashIndexBackendTestMixin
+
+signature_builder = MinHashSignatureBuilder(32, 0xFFFF)
+
+
+class InMemoryMinHashIndexBackendTestCase(MinHashIndexBackendTestMixin, TestCase):
+    @fixture
+    def index(self):
+        return InMemoryMinHashIndexBackend(signature_builder, 16, 60 * 60, 12, 10)
+
+    def test_export_import(self):
+        self.index.record("example", "1", [("index", "hello world")])
+
+        timestamp = int(time.time())
+        result = self.index.export("example", [("index", "1")], timestamp=timestamp)
+        assert len(result) == 1
+
+        # Copy the data from key 1 to key 2.
+        self.index.import_("example", [("index", "2", result[0])], timestamp=timestamp)
+
+        r1 = msgpack.unpackb(self.index.export("example", [("index", "1")], timestamp=timestamp)[0])
+        r2 = msgpack.unpackb(self.index.export("example", [("index", "2")], timestamp=timestamp)[0])
+        assert r1 == r2
+        assert r1[1] == timestamp + 60 * 60 * 12
+
+        # Missing keys are exported as an empty list, same as the redis backend.
+        assert self.index.export("example", [("index", "3")], timestamp=timestamp) == [
+            msgpack.packb([])
+        ]
+
+    def test_classify_many(self):
+        self.index.record("example", "1", [("index", "hello world")])
+        self.index.record("example", "2", [("index", "pizza world")])
+
+        results = self.index.classify_many(
+            "example", [[("index", self.index.bands, "hello world")], [("index", 0, "")]]
+        )
+        assert results == [[("1", [1.0])], []]
+
+    def test_expiry(self):
+        timestamp = int(time.time())
+        self.index.record("example", "1", [("index", "hello world")], timestamp=timestamp)
+
+        expired = timestamp + 60 * 60 * 13
+        assert (
+            self.index.classify("example", [("index", 0, "hello world")], timestamp=expired) == []
+        )
+
+    def test_snapshot(self):
+        path = os.path.join(tempfile.mkdtemp(), "similarity.snapshot")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+
+        index = InMemoryMinHashIndexBackend(
+            signature_builder, 16, 60 * 60, 12, 10, snapshot_path=path
+        )
+        index.record("example", "1", [("index", "hello world")])
+        index.snapshot()
+
+        restored = InMemoryMinHashIndexBackend(
+            signature_builder, 16, 60 * 60, 12, 10, snapshot_path=path
+        )
+        assert restored.classify("example", [("index", 0, "hello world")]) == [("1", [1.0])]
@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+from sentry.stacktraces.cache import MISSING, FrameCache, LocalFrameCache
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+
+
+class LocalFrameCacheTest(TestCase):
+    def test_lru(self):
+        local_cache = LocalFrameCache(2)
+        local_cache.set_many({"a": 1, "b": 2})
+        assert local_cache.get_many(["a"]) == {"a": 1}
+
+        # "b" is the least recently used key now.
+        local_cache.set_many({"c": 3})
+        assert local_cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+    def test_expiry(self):
+        local_cache = LocalFrameCache(10, timeout=-1, negative_timeout=-1)
+        local_cache.set_many({"a": 1})
+        local_cache.set_missing(["b"])
+        assert local_cache.get_many(["a", "b"]) == {}
+
+    def test_missing(self):
+        local_cache = LocalFrameCache(10)
+        local_cache.set_missing(["a"])
+        assert local_cache.get_many(["a"]) == {"a": MISSING}
+
+
+class FrameCacheTest(TestCase):
+    def test_get_many(self):
+        cache.set("pf:a", [1], 60)
+        assert FrameCache().get_many(["pf:a", "pf:b"]) == {"pf:a": [1]}
+
+    def test_writes_are_buffered(self):
+        frame_cache = FrameCache()
+        frame_cache.set("pf:a", [1])
+        assert cache.get("pf:a") is None
+
+        frame_cache.flush()
+        assert cache.get("pf:a") == [1]
+        assert frame_cache.pending == {}
+
+    def test_local_cache(self):
+        local_cache = LocalFrameCache(10)
+        cache.set("pf:a", [1], 60)
+
+        assert FrameCache(local_cache).get_many(["pf:a", "pf:b"]) == {"pf:a": [1]}
+        assert local_cache.get_many(["pf:a", "pf:b"]) == {"pf:a": [1], "pf:b": MISSING}
+
+        # Known keys are answered from the local cache, including misses.
+        cache.set("pf:b", [2], 60)
+        cache.delete("pf:a")
+        assert FrameCache(local_cache).get_many(["pf:a", "pf:b"]) == {"pf:a": [1]}
+
+        # Writes replace negative entries.
+        frame_cache = FrameCache(local_cache)
+        frame_cache.set("pf:b", [3])
+        assert FrameCache(local_cache).get_many(["pf:b"]) == {"pf:b": [3]}
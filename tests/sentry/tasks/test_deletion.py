@@ -6,9 +6,10 @@ from uuid import uuid4
 
 import pytest
 
-from sentry import nodestore
+from sentry import deletions, nodestore
 from sentry.constants import ObjectStatus
 from sentry.eventstore.models import Event
+from sentry.deletions import scheduler
 from sentry.exceptions import DeleteAborted
 from sentry.models import (
     ApiApplication,
@@ -47,6 +48,8 @@ from sentry.tasks.deletion import (
     delete_team,
     generic_delete,
     revoke_api_tokens,
+    run_deletion_shard,
+    run_sharded_deletion,
 )
 from sentry.testutils import TestCase
 from sentry.testutils.helpers.datetime import iso_format, before_now
@@ -176,6 +179,142 @@ class DeleteProjectTest(TestCase):
         assert Project.objects.filter(id=project.id).exists()
 
 
+class ShardedDeletionTest(TestCase):
+    def get_group_stage(self, project):
+        task = deletions.get(model=Project, query={"id": project.id})
+        relations = scheduler.get_child_relations(task, project)
+        plan = scheduler.get_deletion_plan(deletions.default_manager, relations, num_shards=2)
+        for index, stage in enumerate(plan):
+            if relations[stage[0][0]].params["model"] is Group:
+                return index, stage
+
+    def test_deletes_shards(self):
+        project = self.create_project(name="test", status=ProjectStatus.PENDING_DELETION)
+        groups = [self.create_group(project=project) for _ in range(5)]
+
+        with self.settings(SENTRY_DELETIONS_NUM_SHARDS=2), self.tasks():
+            delete_project(object_id=project.id)
+
+        assert not Project.objects.filter(id=project.id).exists()
+        assert not Group.objects.filter(id__in=[g.id for g in groups]).exists()
+        assert scheduler.get_checkpoint("sentry", "Project", project.id) is None
+
+    def test_resumes_pending_shards(self):
+        project = self.create_project(name="test", status=ProjectStatus.PENDING_DELETION)
+        stage, shards = self.get_group_stage(project)
+        relation_index, _ = shards[0]
+        scheduler.save_checkpoint(
+            "sentry",
+            "Project",
+            project.id,
+            {
+                "num_shards": 2,
+                "stage": stage,
+                "pending": [scheduler.get_shard_key(relation_index, 1)],
+            },
+        )
+
+        with patch.object(run_deletion_shard, "delay") as mock_delay:
+            run_sharded_deletion(
+                app_label="sentry", model_name="Project", object_id=project.id, transaction_id="a"
+            )
+
+        mock_delay.assert_called_once_with(
+            app_label="sentry",
+            model_name="Project",
+            object_id=project.id,
+            stage=stage,
+            relation_index=relation_index,
+            shard_id=1,
+            num_shards=2,
+            transaction_id="a",
+            actor_id=None,
+        )
+
+    def test_skips_finished_shard(self):
+        project = self.create_project(name="test", status=ProjectStatus.PENDING_DELETION)
+        group = self.create_group(project=project)
+        stage, shards = self.get_group_stage(project)
+        relation_index, _ = shards[0]
+        scheduler.save_checkpoint(
+            "sentry", "Project", project.id, {"num_shards": 2, "stage": stage + 1, "pending": []}
+        )
+
+        run_deletion_shard(
+            app_label="sentry",
+            model_name="Project",
+            object_id=project.id,
+            stage=stage,
+            relation_index=relation_index,
+            shard_id=group.id % 2,
+            num_shards=2,
+        )
+
+        assert Group.objects.filter(id=group.id).exists()
+
+    def test_restarts_without_checkpoint(self):
+        project = self.create_project(name="test", status=ProjectStatus.PENDING_DELETION)
+        group = self.create_group(project=project)
+        stage, shards = self.get_group_stage(project)
+        relation_index, _ = shards[0]
+
+        with patch.object(run_sharded_deletion, "apply_async") as mock_apply_async:
+            run_deletion_shard(
+                app_label="sentry",
+                model_name="Project",
+                object_id=project.id,
+                stage=stage,
+                relation_index=relation_index,
+                shard_id=group.id % 2,
+                num_shards=2,
+            )
+
+        # A lost checkpoint starts the deletion over instead of ending it.
+        assert Group.objects.filter(id=group.id).exists()
+        assert mock_apply_async.call_count == 1
+        assert mock_apply_async.call_args[1]["kwargs"]["object_id"] == project.id
+
+    def test_throttled_shard(self):
+        project = self.create_project(name="test", status=ProjectStatus.PENDING_DELETION)
+        group = self.create_group(project=project)
+        stage, shards = self.get_group_stage(project)
+        relation_index, _ = shards[0]
+        scheduler.save_checkpoint(
+            "sentry",
+            "Project",
+            project.id,
+            {
+                "num_shards": 2,
+                "stage": stage,
+                "pending": [scheduler.get_shard_key(*shard) for shard in shards],
+            },
+        )
+
+        with patch.object(scheduler, "get_throttle_delay", return_value=30), patch.object(
+            run_deletion_shard, "apply_async"
+        ) as mock_apply_async:
+            run_deletion_shard(
+                app_label="sentry",
+                model_name="Project",
+                object_id=project.id,
+                stage=stage,
+                relation_index=relation_index,
+                shard_id=group.id % 2,
+                num_shards=2,
+            )
+
+        assert Group.objects.filter(id=group.id).exists()
+        assert mock_apply_async.call_count == 1
+        assert mock_apply_async.call_args[1]["countdown"] == 30
+
+    def test_cancels_visible(self):
+        project = self.create_project(name="test", status=ProjectStatus.VISIBLE)
+        with self.assertRaises(DeleteAborted):
+            run_sharded_deletion(app_label="sentry", model_name="Project", object_id=project.id)
+
+        assert Project.objects.filter(id=project.id).exists()
+
+
 class DeleteGroupTest(TestCase):
     def test_simple(self):
         event_id = "a" * 32
@@ -2,8 +2,24 @@ from __future__ import absolute_import
 
 from sentry.utils.compat.mock import patch
 
-from sentry.tasks.merge import merge_groups
-from sentry.models import Group, GroupEnvironment, GroupMeta, GroupRedirect, UserReport
+from sentry.tasks.merge import (
+    MAX_BATCH_SIZE,
+    MIN_BATCH_SIZE,
+    dispatch_merge_plan,
+    get_merge_models,
+    get_merge_plan,
+    get_next_batch_size,
+    merge_group_relation,
+    merge_groups,
+)
+from sentry.models import (
+    Group,
+    GroupEnvironment,
+    GroupHash,
+    GroupMeta,
+    GroupRedirect,
+    UserReport,
+)
 from sentry.similarity import _make_index_backend
 from sentry.testutils import TestCase
 from sentry.utils import redis
@@ -186,3 +202,82 @@ class MergeGroupTest(TestCase):
         assert not Group.objects.filter(id=group1.id).exists()
 
         assert UserReport.objects.get(id=ur.id).group_id == group2.id
+
+    def test_merge_plan(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+        GroupEnvironment.objects.create(group_id=group1.id, environment_id=1)
+        for i in range(3):
+            GroupHash.objects.create(project=self.project, group=group1, hash="%032x" % i)
+
+        assert get_merge_plan(get_merge_models(), group1) == {
+            ("sentry", "groupenvironment"): 1,
+            ("sentry", "grouphash"): 3,
+        }
+        assert get_merge_plan(get_merge_models(), group2) == {}
+
+    def test_merge_relation_in_batches(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+        for i in range(5):
+            GroupHash.objects.create(project=self.project, group=group1, hash="%032x" % i)
+
+        with patch("sentry.tasks.merge.merge_group_relation"):
+            dispatch_merge_plan({("sentry", "grouphash"): 5}, [group1.id], group2, None, None)
+
+        with self.tasks(), patch("sentry.tasks.merge.merge_groups") as mock_merge_groups:
+            merge_group_relation(
+                app_label="sentry",
+                model_name="grouphash",
+                from_object_ids=[group1.id],
+                to_object_id=group2.id,
+                batch_size=2,
+                total=5,
+            )
+
+        assert GroupHash.objects.filter(group_id=group2.id).count() == 5
+        assert not GroupHash.objects.filter(group_id=group1.id).exists()
+        # The last relation to finish continues the merge of the group.
+        assert mock_merge_groups.delay.call_count == 1
+        assert mock_merge_groups.delay.call_args[1]["relations_merged"] is True
+
+    def test_merge_relation_without_state(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+        GroupHash.objects.create(project=self.project, group=group1, hash="a" * 32)
+
+        with self.tasks(), patch("sentry.tasks.merge.merge_groups") as mock_merge_groups:
+            merge_group_relation(
+                app_label="sentry",
+                model_name="grouphash",
+                from_object_ids=[group1.id],
+                to_object_id=group2.id,
+            )
+
+        # Without the state, the merge is planned again instead of finished.
+        assert mock_merge_groups.delay.call_count == 1
+        assert mock_merge_groups.delay.call_args[1]["relations_merged"] is False
+
+    def test_merge_many_relations(self):
+        group1 = self.create_group(self.project)
+        group2 = self.create_group(self.project)
+        GroupEnvironment.objects.create(group_id=group1.id, environment_id=1)
+        for i in range(3):
+            GroupHash.objects.create(project=self.project, group=group1, hash="%032x" % i)
+
+        with self.tasks():
+            merge_groups([group1.id], group2.id)
+
+        assert not Group.objects.filter(id=group1.id).exists()
+        assert GroupHash.objects.filter(group_id=group2.id).count() == 3
+        assert GroupEnvironment.objects.filter(group_id=group2.id).count() == 1
+
+
+def test_get_next_batch_size():
+    # Batches that are too slow shrink, fast ones grow, by at most 2x.
+    assert get_next_batch_size(1000, 1.0) == 500
+    assert get_next_batch_size(1000, 0.4) == 1250
+    assert get_next_batch_size(1000, 0.01) == 2000
+    assert get_next_batch_size(1000, 0) == 2000
+    assert get_next_batch_size(MIN_BATCH_SIZE, 10) == MIN_BATCH_SIZE
+    assert get_next_batch_size(MAX_BATCH_SIZE, 0.01) == MAX_BATCH_SIZE
@@ -140,3 +140,27 @@ def test_project_reload_cache(default_project, task_runner, redis_cache):
         )
 
     assert redis_cache.get(default_project.id) is None
+
+
+@pytest.mark.django_db
+def test_generate_chunks(
+    monkeypatch, default_project, default_organization, factories, task_runner, redis_cache
+):
+    monkeypatch.setattr("sentry.tasks.relay.CONFIG_CHUNK_SIZE", 2)
+    monkeypatch.setattr("sentry.relay.projectconfig_cache.redis.PIPELINE_CHUNK_SIZE", 2)
+    projects = [default_project] + [
+        factories.create_project(organization=default_organization) for _ in range(4)
+    ]
+
+    with task_runner():
+        schedule_update_config_cache(generate=True, organization_id=default_organization.id)
+
+    for project in projects:
+        cfg = redis_cache.get(project.id)
+        assert cfg["projectId"] == project.id
+        assert cfg["organizationId"] == default_organization.id
+
+    redis_cache.delete_many([project.id for project in projects])
+
+    for project in projects:
+        assert redis_cache.get(project.id) is None
@@ -14,6 +14,7 @@ from sentry.app import tsdb
 from sentry.models import Project, UserOption, GroupStatus
 from sentry.tasks.reports import (
     DISABLED_ORGANIZATIONS_USER_OPTION_KEY,
+    RedisReportBackend,
     Report,
     Skipped,
     change,
@@ -32,12 +33,15 @@ from sentry.tasks.reports import (
     safe_add,
     user_subscribed_to_organization_reports,
     prepare_project_issue_summaries,
+    prepare_project_report,
+    prepare_project_report_many,
     prepare_project_series,
 )
 from sentry.testutils.cases import TestCase, SnubaTestCase
 from sentry.testutils.factories import DEFAULT_EVENT_DATA
 from sentry.utils.dates import to_datetime, to_timestamp, floor_to_utc_day
 from sentry.testutils.helpers.datetime import iso_format
+from sentry.utils import redis
 
 from six.moves import xrange
 from sentry.utils.compat import map
@@ -346,3 +350,39 @@ class ReportTestCase(TestCase, SnubaTestCase):
         assert any(
             map(lambda x: x[1] == (2, 0), response)
         ), "must show two issues resolved in one rollup window"
+
+    def test_prepare_project_report_many(self):
+        now = floor_to_utc_day(timezone.now())
+        projects = [self.project, self.create_project(organization=self.organization)]
+
+        for i, project in enumerate(projects):
+            self.store_event(
+                data={
+                    "message": "message",
+                    "timestamp": iso_format(now - timedelta(days=1)),
+                    "fingerprint": ["group-%s" % i],
+                },
+                project_id=project.id,
+            )
+
+        interval = (now - timedelta(days=7), now)
+        reports = prepare_project_report_many(interval, projects)
+
+        assert sorted(reports) == sorted(project.id for project in projects)
+        for project in projects:
+            assert reports[project.id] == prepare_project_report(interval, project)
+            assert reports[project.id].issue_summaries == [1, 0, 0]
+
+    def test_redis_backend_keeps_prepared_reports(self):
+        backend = RedisReportBackend(redis.clusters.get("default"), 60)
+        timestamp = to_timestamp(floor_to_utc_day(timezone.now()))
+        duration = 60 * 60 * 24 * 7
+        projects = [self.project, self.create_project(organization=self.organization)]
+
+        with mock.patch.object(backend, "build_many", wraps=backend.build_many) as build_many:
+            backend.prepare(timestamp, duration, self.organization)
+            backend.prepare(timestamp, duration, self.organization)
+
+        assert build_many.call_count == 1
+        reports = backend.fetch(timestamp, duration, self.organization, projects)
+        assert [type(report) for report in reports] == [Report, Report]
@@ -9,7 +9,14 @@ from time import time
 from sentry import quotas
 from sentry.event_manager import EventManager, HashDiscarded
 from sentry.plugins.base.v2 import Plugin2
-from sentry.tasks.store import preprocess_event, process_event, save_event, symbolicate_event
+from sentry.models import Group
+from sentry.tasks.store import (
+    preprocess_event,
+    process_event,
+    save_event,
+    save_events,
+    symbolicate_event,
+)
 from sentry.testutils.helpers.features import Feature
 
 EVENT_ID = "cc3e6c2bb6b6498097f336d1e6979f4b"
@@ -321,6 +328,73 @@ def test_hash_discarded_raised(default_project, mock_refund, register_plugin):
         # should be caught
 
 
+@pytest.mark.django_db
+def test_save_events(default_project, mock_default_cache):
+    def make_data(fingerprint):
+        manager = EventManager(
+            {"logentry": {"formatted": "test"}, "fingerprint": [fingerprint]},
+            project=default_project,
+        )
+        manager.normalize()
+        return dict(manager.get_data(), project=default_project.id)
+
+    now = time()
+    events = [
+        {"cache_key": "e:1", "data": make_data("a"), "start_time": now},
+        {"cache_key": "e:2", "data": make_data("a"), "start_time": now},
+        {"cache_key": "e:3", "data": make_data("b"), "start_time": now},
+    ]
+
+    save_events(events)
+
+    assert Group.objects.filter(project=default_project).count() == 2
+    assert sorted(call[1][0] for call in mock_default_cache.delete.mock_calls) == [
+        "e:1",
+        "e:2",
+        "e:3",
+    ]
+
+
+@pytest.mark.django_db
+def test_save_events_falls_back_to_single_events(default_project, mock_default_cache):
+    from sentry import event_manager
+
+    def make_data(fingerprint):
+        manager = EventManager(
+            {"logentry": {"formatted": "test"}, "fingerprint": [fingerprint]},
+            project=default_project,
+        )
+        manager.normalize()
+        return dict(manager.get_data(), project=default_project.id)
+
+    materialize_metadata_many = event_manager._materialize_metadata_many
+
+    def fail_on_bad_event(jobs):
+        if any(job["data"]["fingerprint"] == ["bad"] for job in jobs):
+            raise ValueError("bad event")
+        return materialize_metadata_many(jobs)
+
+    now = time()
+    events = [
+        {"cache_key": "e:1", "data": make_data("a"), "start_time": now},
+        {"cache_key": "e:2", "data": make_data("bad"), "start_time": now},
+        {"cache_key": "e:3", "data": make_data("b"), "start_time": now},
+    ]
+
+    with mock.patch(
+        "sentry.event_manager._materialize_metadata_many", side_effect=fail_on_bad_event
+    ):
+        save_events(events)
+
+    # Only the bad event is lost.
+    assert Group.objects.filter(project=default_project).count() == 2
+    assert sorted(call[1][0] for call in mock_default_cache.delete.mock_calls) == [
+        "e:1",
+        "e:2",
+        "e:3",
+    ]
+
+
 @pytest.fixture(params=["org", "project"])
 def options_model(request, default_organization, default_project):
     if request.param == "org":
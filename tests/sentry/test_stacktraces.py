@@ -7,8 +7,11 @@ from sentry.stacktraces.processing import (
     find_stacktraces_in_data,
     normalize_stacktraces_for_grouping,
     get_crash_frame_from_event_data,
+    process_stacktraces,
+    StacktraceProcessor,
 )
 from sentry.testutils import TestCase
+from sentry.utils.compat import mock
 
 
 class FindStacktracesTest(TestCase):
@@ -360,3 +363,42 @@ class NormalizeInApptest(TestCase):
 )
 def test_get_crash_frame(event):
     assert get_crash_frame_from_event_data(event)["marco"] == "polo"
+
+
+class CachingProcessor(StacktraceProcessor):
+    def handles_frame(self, frame, stacktrace_info):
+        return True
+
+    def preprocess_frame(self, processable_frame):
+        processable_frame.set_cache_key_from_values([processable_frame["function"]])
+
+    def process_frame(self, processable_frame, processing_task):
+        if processable_frame.cache_value is None:
+            processable_frame.set_cache_value(processable_frame["function"].upper())
+            return
+
+        new_frame = dict(processable_frame.frame, function=processable_frame.cache_value)
+        return [new_frame], None, None
+
+
+class ProcessStacktracesTest(TestCase):
+    def make_data(self):
+        return {
+            "project": self.project.id,
+            "platform": "python",
+            "stacktrace": {
+                "frames": [{"function": "foo"}, {"function": "bar"}, {"function": "foo"}]
+            },
+        }
+
+    def test_frame_cache(self):
+        def make_processors(data, infos):
+            return [CachingProcessor(data, infos, self.project)]
+
+        with mock.patch("sentry.stacktraces.cache.cache.get_many", return_value={}) as get_many:
+            assert process_stacktraces(self.make_data(), make_processors=make_processors) is None
+        assert get_many.call_count == 1
+
+        data = process_stacktraces(self.make_data(), make_processors=make_processors)
+        functions = [frame["function"] for frame in data["stacktrace"]["frames"]]
+        assert functions == ["FOO", "BAR", "FOO"]
@@ -178,6 +178,28 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_get_range_downsampling(self):
+        now = int(to_timestamp(datetime.utcnow().replace(tzinfo=pytz.UTC))) - ONE_HOUR
+        epoch = now - (now % 120)
+
+        self.db.incr(TSDBModel.project, 1, to_datetime(epoch))
+        self.db.incr(TSDBModel.project, 1, to_datetime(epoch + 60), count=2)
+        self.db.incr(TSDBModel.project, 1, to_datetime(epoch + 120), count=3)
+        self.db.incr(TSDBModel.project, "foo", to_datetime(epoch + 180), count=4)
+
+        start, end = to_datetime(epoch), to_datetime(epoch + 120)
+
+        assert self.db.get_storage_rollup(120) == ONE_MINUTE
+        assert self.db.get_range(TSDBModel.project, [1, "foo", 2], start, end, rollup=120) == {
+            1: [(epoch, 3), (epoch + 120, 3)],
+            "foo": [(epoch, 0), (epoch + 120, 4)],
+            2: [(epoch, 0), (epoch + 120, 0)],
+        }
+        assert self.db.get_sums(TSDBModel.project, [1, "foo"], start, end, rollup=120) == {
+            1: 6,
+            "foo": 4,
+        }
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
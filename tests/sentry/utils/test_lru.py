@@ -0,0 +1,50 @@
+from __future__ import absolute_import
+
+import time
+
+from sentry.utils.compat.mock import patch
+from sentry.utils.lru import LRUCache
+
+
+def test_lru_eviction():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    assert cache.set("c", 3) == 1
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert len(cache) == 2
+
+    cache.delete("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == cache.size == 0
+
+
+def test_lru_expiry():
+    cache = LRUCache(10, ttl=10)
+    now = time.time()
+    with patch("time.time", return_value=now):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+
+    with patch("time.time", return_value=now + 30):
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+    assert cache.size == 1
+
+
+def test_lru_get_size():
+    cache = LRUCache(10, get_size=len)
+    cache.set_many({"a": "x" * 4, "b": "x" * 4})
+    assert cache.size == 8
+
+    # Values that don't fit replace the previous one without being stored.
+    cache.set("a", "x" * 11)
+    assert cache.get("a") is None
+    assert cache.size == 4
+
+    assert cache.set("c", "x" * 8) == 1
+    assert cache.get_many(["a", "b", "c"]) == {"c": "x" * 8}
+    assert cache.size == 8
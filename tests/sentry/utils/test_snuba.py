@@ -3,15 +3,27 @@ from __future__ import absolute_import
 from datetime import datetime
 import pytest
 import pytz
+import time
+import urllib3
 
 from sentry.models import GroupRelease, Release
 from sentry.testutils import TestCase
+from sentry.utils import json
+from sentry.utils.compat.mock import Mock, patch
 from sentry.utils.snuba import (
+    _bulk_snuba_query,
     _prepare_query_params,
+    _split_time_range,
+    bulk_raw_query,
+    CachedQuery,
+    get_cached_query,
     get_snuba_translators,
     get_json_type,
+    get_request_deadline,
     get_snuba_column_name,
     Dataset,
+    QueryDeadlineExceeded,
+    ResultCachePolicy,
     SnubaQueryParams,
     UnqualifiedQueryError,
 )
@@ -198,3 +210,169 @@ class PrepareQueryParamsTest(TestCase):
 
         with pytest.raises(UnqualifiedQueryError):
             _prepare_query_params(query_params)
+
+
+class CachedQueryTest(TestCase):
+    def setUp(self):
+        self.policy = ResultCachePolicy(segment_size=3600, ttl=60, live_ttl=0, settle_time=0)
+        self.kwargs = {
+            "from_date": "2020-01-01T00:30:00",
+            "to_date": "2020-01-01T03:00:00",
+            "granularity": 600,
+            "groupby": ["time"],
+        }
+
+    def get_body(self, *times):
+        return {
+            "meta": [{"name": "time"}],
+            "data": [{"time": u"2020-01-01T{}:00+00:00".format(t), "count": 1} for t in times],
+        }
+
+    def test_split_time_range(self):
+        assert _split_time_range(datetime(2020, 1, 1, 0, 30), datetime(2020, 1, 1, 2, 0), 3600) == [
+            (datetime(2020, 1, 1, 0, 30), datetime(2020, 1, 1, 1, 0)),
+            (datetime(2020, 1, 1, 1, 0), datetime(2020, 1, 1, 2, 0)),
+        ]
+
+    def test_missing_runs(self):
+        query = CachedQuery(self.kwargs, self.policy, 3600)
+        assert len(query.segments) == 3
+        query.load({query.keys[1]: self.get_body("01:10")})
+        assert query.get_missing_runs() == [(0, 0), (2, 2)]
+        assert query.get_run_kwargs((2, 2))["from_date"] == "2020-01-01T02:00:00"
+        assert query.get_run_kwargs((2, 2))["to_date"] == "2020-01-01T03:00:00"
+
+    def test_stitch(self):
+        query = CachedQuery(self.kwargs, self.policy, 3600)
+        now = datetime(2020, 1, 1, 2, 30)
+        writes = query.set_run((0, 2), self.get_body("00:30", "01:00", "02:10"), now=now)
+        # The live segment is not cached.
+        assert [key for key, _, _ in writes] == query.keys[:2]
+        assert [len(body["data"]) for body in query.bodies] == [1, 1, 1]
+
+        body = query.get_body()
+        assert body["meta"] == [{"name": "time"}]
+        assert [row["time"][11:16] for row in body["data"]] == ["00:30", "01:00", "02:10"]
+
+        query = CachedQuery(self.kwargs, self.policy, 3600, descending=True)
+        query.set_run((0, 2), self.get_body("02:10", "01:00", "00:30"), now=now)
+        assert [row["time"][11:16] for row in query.get_body()["data"]] == [
+            "02:10",
+            "01:00",
+            "00:30",
+        ]
+
+    def test_truncated(self):
+        self.kwargs["limit"] = 2
+        query = CachedQuery(self.kwargs, self.policy, 3600)
+        query.load({query.keys[0]: self.get_body("00:30")})
+        assert query.set_run((1, 2), self.get_body("01:00", "02:10")) == []
+        assert query.get_body() is None
+
+        query = CachedQuery(self.kwargs, self.policy, 3600)
+        body = self.get_body("01:00", "02:10")
+        assert query.set_run((0, 2), body) == []
+        assert query.get_body() is body
+
+    def test_empty_time_range(self):
+        query = CachedQuery(dict(self.kwargs, to_date=self.kwargs["from_date"]), self.policy, 3600)
+        assert query.segments == []
+        assert query.get_body() is None
+
+    def test_get_cached_query(self):
+        snuba_params = SnubaQueryParams(
+            groupby=["time"], rollup=600, cache_policy=self.policy, orderby="-time"
+        )
+        with self.settings(SENTRY_SNUBA_RESULT_CACHE=True):
+            query = get_cached_query(snuba_params, dict(self.kwargs, orderby="-time"))
+            assert query.descending
+            assert get_cached_query(snuba_params, dict(self.kwargs, totals=True)) is None
+            assert get_cached_query(snuba_params, dict(self.kwargs, orderby="count")) is None
+            # Empty time ranges have no segments to cache.
+            empty = dict(self.kwargs, to_date=self.kwargs["from_date"])
+            assert get_cached_query(snuba_params, empty) is None
+            snuba_params.groupby = ["project_id"]
+            assert get_cached_query(snuba_params, self.kwargs) is None
+        snuba_params.groupby = ["time"]
+        assert get_cached_query(snuba_params, self.kwargs) is None
+
+    @patch("sentry.utils.snuba._bulk_snuba_query")
+    def test_bulk_raw_query(self, mock_query):
+        start = datetime(2020, 1, 1, 0, 0)
+        end = datetime(2020, 1, 1, 2, 0)
+        snuba_params = SnubaQueryParams(
+            start=start,
+            end=end,
+            groupby=["time"],
+            rollup=600,
+            filter_keys={"project_id": [self.project.id]},
+            cache_policy=self.policy,
+        )
+        mock_query.side_effect = lambda query_list, headers, deadline, allow_partial: [
+            self.get_body("00:10", "01:10") for _ in query_list
+        ]
+
+        with self.settings(SENTRY_SNUBA_RESULT_CACHE=True), patch(
+            "sentry.utils.snuba.quotas.get_event_retention", return_value=None
+        ):
+            first = bulk_raw_query([snuba_params])[0]
+            assert mock_query.call_count == 1
+            (queries, _, _, _), _ = mock_query.call_args
+            assert queries[0]["from_date"] == "2020-01-01T00:00:00"
+            assert queries[0]["to_date"] == "2020-01-01T02:00:00"
+
+            second = bulk_raw_query([snuba_params])[0]
+            assert mock_query.call_count == 1
+            assert second["data"] == first["data"]
+            assert [row["time"] for row in second["data"]] == [1577837400, 1577841000]
+
+
+class BulkSnubaQueryDeadlineTest(TestCase):
+    def get_response(self):
+        return Mock(status=200, data=json.dumps({"data": [], "meta": []}))
+
+    @patch("sentry.utils.snuba._snuba_pool")
+    def test_timeout(self, mock_pool):
+        mock_pool.urlopen.return_value = self.get_response()
+        _bulk_snuba_query([{}], {}, deadline=time.time() + 10)
+        assert 0 < mock_pool.urlopen.call_args[1]["timeout"] <= 10
+
+    @patch("sentry.utils.snuba._snuba_pool")
+    def test_deadline_exceeded(self, mock_pool):
+        mock_pool.urlopen.return_value = self.get_response()
+        with pytest.raises(QueryDeadlineExceeded):
+            _bulk_snuba_query([{}, {}], {}, deadline=time.time() - 1)
+        assert not mock_pool.urlopen.called
+
+    @patch("sentry.utils.snuba._snuba_pool")
+    def test_partial(self, mock_pool):
+        def urlopen(method, path, body=None, headers=None, timeout=None):
+            if json.loads(body).get("slow"):
+                time.sleep(timeout + 0.1)
+                raise urllib3.exceptions.ReadTimeoutError(None, path, "timed out")
+            return self.get_response()
+
+        mock_pool.urlopen.side_effect = urlopen
+        results = _bulk_snuba_query(
+            [{}, {"slow": True}], {}, deadline=time.time() + 0.2, allow_partial=True
+        )
+        assert results[0] == {"data": [], "meta": []}
+        assert results[1]["timed_out"]
+
+        with pytest.raises(QueryDeadlineExceeded):
+            _bulk_snuba_query([{}, {"slow": True}], {}, deadline=time.time() + 0.2)
+
+    def test_request_deadline(self):
+        request = self.make_request()
+        request._request_start_time = time.time() - 15
+
+        with self.settings(SENTRY_SNUBA_REQUEST_TIMEOUT=20):
+            # Time already spent serving the request counts against the deadline.
+            assert get_request_deadline(request) == request._request_start_time + 20
+            assert get_request_deadline(request) == get_request_deadline(request)
+
+            with patch("sentry.app.env.request", request):
+                assert get_request_deadline() == request._request_start_time + 20
+
+        with self.settings(SENTRY_SNUBA_REQUEST_TIMEOUT=0):
+            assert get_request_deadline(request) is None
@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 from sentry.utils.compat import mock
 import six
+import time
 
 from datetime import timedelta
 
@@ -347,6 +348,31 @@ class GroupSerializerSnubaTest(APITestCase, SnubaTestCase):
         assert iso_format(result["lastSeen"]) == iso_format(self.week_ago)
         assert iso_format(result["firstSeen"]) == iso_format(group_env.first_seen)
         assert result["count"] == "1"
+        assert "statsTimedOut" not in result
+
+    def test_seen_stats_timed_out(self):
+        environment = self.create_environment(project=self.project)
+        event = self.store_event(
+            data={
+                "fingerprint": ["put-me-in-group1"],
+                "timestamp": iso_format(self.min_ago),
+                "environment": environment.name,
+                "user": {"id": 1},
+            },
+            project_id=self.project.id,
+        )
+
+        result = serialize(
+            event.group,
+            serializer=GroupSerializerSnuba(
+                environment_ids=[environment.id], deadline=time.time() - 1
+            ),
+        )
+        # Stats that are not ready by the deadline are flagged rather than
+        # passed off as zeros.
+        assert result["statsTimedOut"] is True
+        assert result["count"] == "0"
+        assert result["userCount"] == 0
 
 
 class StreamGroupSerializerTestCase(APITestCase, SnubaTestCase):
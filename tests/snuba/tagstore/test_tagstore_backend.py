@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 
 import calendar
+import time
 from datetime import timedelta, datetime
 import json
 import pytest
@@ -602,6 +603,28 @@ class TagStorageTest(TestCase, SnubaTestCase):
             == {}
         )
 
+    def test_get_groups_seen_stats(self):
+        seen_values, user_counts, timed_out = self.ts.get_groups_seen_stats(
+            [self.proj1.id], [self.proj1group1.id, self.proj1group2.id], [self.proj1env1.id]
+        )
+        assert not timed_out
+        assert seen_values == self.ts.get_group_seen_values_for_environments(
+            [self.proj1.id], [self.proj1group1.id, self.proj1group2.id], [self.proj1env1.id]
+        )
+        assert user_counts == {self.proj1group1.id: 2, self.proj1group2.id: 1}
+
+    def test_get_groups_seen_stats_deadline_exceeded(self):
+        # Stats that are not ready by the deadline are left out.
+        seen_values, user_counts, timed_out = self.ts.get_groups_seen_stats(
+            [self.proj1.id],
+            [self.proj1group1.id, self.proj1group2.id],
+            [self.proj1env1.id],
+            deadline=time.time() - 1,
+        )
+        assert timed_out
+        assert seen_values == {}
+        assert user_counts == {}
+
     def test_cache_suffix_time(self):
         starting_key = cache_suffix_time(self.now, 0)
         finishing_key = cache_suffix_time(self.now + timedelta(seconds=300), 0)
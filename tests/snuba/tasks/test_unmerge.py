@@ -7,6 +7,7 @@ import logging
 import uuid
 from collections import OrderedDict
 from datetime import datetime, timedelta
+import pytest
 import pytz
 
 from sentry.utils.compat.mock import patch
@@ -17,11 +18,14 @@ from sentry.app import tsdb
 from sentry.models import Environment, Group, GroupHash, GroupRelease, Release, UserReport
 from sentry.similarity import features, _make_index_backend
 from sentry.tasks.unmerge import (
+    DenormalizationAggregates,
     get_caches,
     get_event_user_from_interface,
     get_fingerprint,
     get_group_backfill_attributes,
     get_group_creation_attributes,
+    estimate_unmerge,
+    migrate_events,
     unmerge,
 )
 from sentry.testutils import SnubaTestCase, TestCase
@@ -170,6 +174,12 @@ class UnmergeTestCase(TestCase, SnubaTestCase):
         }
 
     def test_unmerge(self):
+        self.run_unmerge()
+
+    def test_unmerge_one_batch_per_task(self):
+        self.run_unmerge(batches_per_task=1)
+
+    def run_unmerge(self, **unmerge_kwargs):
         now = before_now(minutes=5).replace(microsecond=0, tzinfo=pytz.utc)
 
         def time_from_now(offset=0):
@@ -286,7 +296,13 @@ class UnmergeTestCase(TestCase, SnubaTestCase):
                 project.id, [events.keys()[0]], source.id, destination.id
             )
             unmerge.delay(
-                project.id, source.id, destination.id, [events.keys()[0]], None, batch_size=5
+                project.id,
+                source.id,
+                destination.id,
+                [events.keys()[0]],
+                None,
+                batch_size=5,
+                **unmerge_kwargs
             )
             eventstream.end_unmerge(eventstream_state)
 
@@ -598,3 +614,68 @@ class UnmergeTestCase(TestCase, SnubaTestCase):
         )
         assert destination_similar_items[1][0] == source.id
         assert destination_similar_items[1][1]["message:message:character-shingles"] < 1.0
+
+    def test_unmerge_failure_repairs_migrated_batches(self):
+        project = self.create_project()
+        for i in xrange(2):
+            event = self.store_event(
+                data={
+                    "message": "message %s" % i,
+                    "fingerprint": ["group1"],
+                    "timestamp": iso_format(before_now(seconds=i + 1)),
+                },
+                project_id=project.id,
+            )
+        group = event.group
+        fingerprint = get_fingerprint(event)
+
+        calls = []
+
+        def fail_second_batch(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                raise ValueError("second batch")
+            return migrate_events(*args)
+
+        flushed = []
+
+        def record_flush(aggregates):
+            flushed.append(aggregates.events)
+
+        with patch(
+            "sentry.tasks.unmerge.migrate_events", side_effect=fail_second_batch
+        ), patch.object(
+            DenormalizationAggregates, "flush", autospec=True, side_effect=record_flush
+        ), pytest.raises(
+            ValueError
+        ):
+            unmerge(project.id, group.id, None, [fingerprint], None, batch_size=1)
+
+        # The first batch was migrated, so its denormalizations are repaired.
+        assert flushed == [1]
+
+    def test_estimate_unmerge(self):
+        project = self.create_project()
+        for i in xrange(2):
+            event = self.store_event(
+                data={
+                    "message": "message %s" % i,
+                    "fingerprint": ["group1"],
+                    "timestamp": iso_format(before_now(seconds=i + 1)),
+                },
+                project_id=project.id,
+            )
+        group = event.group
+        fingerprint = get_fingerprint(event)
+
+        estimate = estimate_unmerge(project.id, group.id, [fingerprint], batch_size=2)
+        assert estimate.events == 2
+        assert estimate.migrated_events == 2
+        assert estimate.batches == 2
+        assert estimate.tasks == 1
+
+        with self.tasks():
+            assert unmerge(project.id, group.id, None, [fingerprint], None, dry_run=True) == (
+                estimate_unmerge(project.id, group.id, [fingerprint])
+            )
+        assert GroupHash.objects.get(project=project, hash=fingerprint).group_id == group.id